@@ -0,0 +1,173 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+import statistics
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import common.jsonIr_parser as ir_parser
+import common.gen_cache as gen_cache
+import cpp_with_ndk_gen.cpp_gen as cpp_ndk_gen
+import cpp_with_ndk_gen.cpp_gen_protocol as cpp_gen_protocol
+import synth_ir
+
+# bump when the layout or the meaning of the results file changes. 2: every generator run gets
+# a fresh type resolver, 1 timed them against the warm snippet cache of the first run
+kResultsFormatVersion = 2
+kDefaultThreshold = 0.2
+# slowdowns below this are timer noise on the small stages
+kMinRegressionSeconds = 0.001
+
+
+# setup() runs before every call of func, untimed, and its result is passed to func
+def _timed(func, repeat, setup=None):
+    times = []
+    result = None
+    for i in range(repeat):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        result = func(*args)
+        times.append(time.perf_counter() - start)
+    return result, {"min": min(times), "median": statistics.median(times)}
+
+
+def _peakBytes(func, setup=None):
+    args = () if setup is None else (setup(),)
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def runWorkload(name, params, repeat, work_dir):
+    ir_path = os.path.join(work_dir, name + ".json")
+    with open(ir_path, 'w') as f:
+        json.dump(synth_ir.IRSynthesizer(params).build(), f)
+
+    result = {"params": params.toDict(), "ir_bytes": os.path.getsize(ir_path), "phases": {}, "generators": {}}
+
+    def parse():
+        ret, module = ir_parser.JsonIRParser(ir_path).parse()
+        if ret < 0:
+            raise RuntimeError("failed to parse synthetic ir " + ir_path)
+        return module
+
+    module, result["phases"]["parse"] = _timed(parse, repeat)
+    result["phases"]["parse"]["peak_bytes"] = _peakBytes(parse)
+
+    def resolveTypes():
+        return cpp_gen_protocol.CppGeneratorProtocol.newTypeResolver(module)
+
+    type_resolver, result["phases"]["resolve_types"] = _timed(resolveTypes, repeat)
+
+    dst_path = os.path.join(work_dir, name)
+    for generator_class in cpp_ndk_gen.kGeneratorClasses:
+        # a resolver also caches the snippets its generators render, every run starts with a
+        # fresh one as a generation does
+        def gen(type_resolver):
+            generator = generator_class(dst_path, name, module, type_resolver)
+            generator.gen()
+            return generator.fileName()
+
+        # the generators report progress on stdout
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            file_name, stats = _timed(gen, repeat, resolveTypes)
+            stats["peak_bytes"] = _peakBytes(gen, resolveTypes)
+        stats["output_bytes"] = os.path.getsize(os.path.join(dst_path, file_name))
+        result["generators"][generator_class.__name__] = stats
+
+    result["total_median"] = sum(item["median"] for item in result["phases"].values()) \
+                            + sum(item["median"] for item in result["generators"].values())
+    return result
+
+
+# returns the list of (workload, stage, baseline seconds, current seconds) slower than threshold
+def compareResults(baseline, current, threshold):
+    regressions = []
+    for name, workload in current["workloads"].items():
+        base_workload = baseline.get("workloads", {}).get(name)
+        if base_workload is None:
+            continue
+        stages = dict(workload["phases"])
+        stages.update(workload["generators"])
+        base_stages = dict(base_workload["phases"])
+        base_stages.update(base_workload["generators"])
+        for stage, stats in stages.items():
+            if not stage in base_stages:
+                continue
+            base_time = base_stages[stage]["median"]
+            if stats["median"] > base_time * (1 + threshold) \
+                and stats["median"] - base_time > kMinRegressionSeconds:
+                regressions.append((name, stage, base_time, stats["median"]))
+    return regressions
+
+
+def printResults(results):
+    for name, workload in results["workloads"].items():
+        print("%s (ir %d bytes, total %.3fs)" % (name, workload["ir_bytes"], workload["total_median"]))
+        stages = dict(workload["phases"])
+        stages.update(workload["generators"])
+        for stage, stats in stages.items():
+            peak = stats.get("peak_bytes")
+            print("    %-28s %9.4fs %12s" % (stage, stats["median"],
+                                             "" if peak is None else "%d KB" % (peak // 1024)))
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="benchmark the ndk_cpp generators on synthetic ir")
+    arg_parser.add_argument("-w", "--workload", action="append", choices=sorted(synth_ir.kWorkloads),
+                            help="workload to run, may be repeated, default all")
+    arg_parser.add_argument("-r", "--repeat", type=int, default=3, help="timed runs per stage, default 3")
+    arg_parser.add_argument("-o", "--output", help="write the results as json to this file")
+    arg_parser.add_argument("-b", "--baseline", help="results json to compare against")
+    arg_parser.add_argument("-t", "--threshold", type=float, default=kDefaultThreshold,
+                            help="allowed relative slowdown against the baseline, default 0.2")
+    args = arg_parser.parse_args(argv)
+
+    names = args.workload if args.workload else list(synth_ir.kWorkloads)
+    results = {
+        "format": kResultsFormatVersion,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "source_version": gen_cache.sourceVersion(),
+        "created": time.time(),
+        "repeat": args.repeat,
+        "workloads": {},
+    }
+
+    work_dir = tempfile.mkdtemp(prefix="codegen_bench.")
+    try:
+        for name in names:
+            results["workloads"][name] = runWorkload(name, synth_ir.kWorkloads[name], args.repeat, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    printResults(results)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("format") != kResultsFormatVersion:
+            print("baseline has results format %s, this run %d, not compared" % (baseline.get("format"),
+                                                                              kResultsFormatVersion))
+            return 0
+        regressions = compareResults(baseline, results, args.threshold)
+        for name, stage, base_time, current_time in regressions:
+            print("REGRESSION %s %s: %.4fs -> %.4fs" % (name, stage, base_time, current_time))
+        if len(regressions) > 0:
+            return 1
+    return 0
+
+
+if __name__=="__main__":
+    sys.exit(main(sys.argv[1:]))
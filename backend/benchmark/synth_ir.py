@@ -0,0 +1,130 @@
+import random
+import sys
+sys.path.append("..")
+import common.jsonIr_parser as ir_parser
+
+# synthetic json ir in the schema the frontend emits, for benchmarking the generators
+
+kPrimitiveTypes = ["boolean", "int8", "uint8", "short", "long", "long long", "unsigned short",
+                   "unsigned long", "unsigned long long", "float", "double", "string"]
+
+
+class WorkloadParams:
+    def __init__(self, interfaces=1, methods=4, events=2, params=2, structs=4, struct_width=4,
+                 sequence_depth=1, unions=1, union_width=4, enums=1, enum_width=4, seed=1):
+        self.interfaces = interfaces
+        self.methods = methods
+        self.events = events
+        self.params = params
+        self.structs = structs
+        self.struct_width = struct_width
+        self.sequence_depth = sequence_depth
+        self.unions = unions
+        self.union_width = union_width
+        self.enums = enums
+        self.enum_width = enum_width
+        self.seed = seed
+
+    def toDict(self):
+        return dict(self.__dict__)
+
+
+# named workloads of the suite, each stresses one dimension of the ir
+kWorkloads = {
+    "small": WorkloadParams(),
+    "many_interfaces": WorkloadParams(interfaces=200, methods=8, events=4, structs=20),
+    "many_methods": WorkloadParams(interfaces=4, methods=500, events=100, params=4, structs=20),
+    "deep_sequences": WorkloadParams(interfaces=10, methods=20, structs=50, sequence_depth=6),
+    "wide_structs": WorkloadParams(interfaces=2, structs=200, struct_width=200),
+    "large_unions": WorkloadParams(interfaces=2, structs=20, unions=100, union_width=200),
+}
+
+
+class IRSynthesizer:
+    def __init__(self, params):
+        self._params = params
+        self._random = random.Random(params.seed)
+        self._user_types = []
+
+    def build(self):
+        params = self._params
+        ir_dict = {
+            ir_parser.kVersion: "0.0.1",
+            ir_parser.kModule: ["bench", "synth"],
+            ir_parser.kConstDeclarations: [],
+            ir_parser.kEnumDeclarations: [],
+            ir_parser.kStructDeclarations: [],
+            ir_parser.kUnionDeclarations: [],
+            ir_parser.kInterfaceDeclarations: [],
+            ir_parser.kDeclarationsOrder: [],
+        }
+
+        for i in range(params.enums):
+            self.__add(ir_dict, ir_parser.kEnum, self.__enum("Enum%d" % (i)))
+        # structs and unions only refer to types declared before them
+        for i in range(params.structs):
+            self.__add(ir_dict, ir_parser.kStruct, self.__struct("Struct%d" % (i)))
+        for i in range(params.unions):
+            self.__add(ir_dict, ir_parser.kUnion, self.__union("Union%d" % (i)))
+        for i in range(params.interfaces):
+            self.__add(ir_dict, ir_parser.kInterface, self.__interface("Interface%d" % (i)))
+        return ir_dict
+
+    def __add(self, ir_dict, category, declaration):
+        ir_dict[ir_parser.kCategoryDeclarations[category]].append(declaration)
+        ir_dict[ir_parser.kDeclarationsOrder].append({ir_parser.kName: declaration[ir_parser.kName],
+                                                      ir_parser.kCategory: category})
+        if category != ir_parser.kInterface:
+            self._user_types.append(declaration[ir_parser.kName])
+
+    def __leafType(self):
+        if len(self._user_types) > 0 and self._random.random() < 0.3:
+            return self._random.choice(self._user_types)
+        return self._random.choice(kPrimitiveTypes)
+
+    def __type(self):
+        type_info = {ir_parser.kTypeName: self.__leafType().split(" ")}
+        # up to sequence_depth vectors or arrays, the innermost one is the leaf's own sequence_size
+        depth = self._random.randint(0, self._params.sequence_depth)
+        for i in range(depth):
+            size = -1 if self._random.random() < 0.7 else self._random.randint(1, 16)
+            if i > 0:
+                type_info = {ir_parser.kTypeName: type_info}
+            type_info[ir_parser.kSequenceSize] = size
+        return type_info
+
+    def __args(self, count, prefix):
+        return [{ir_parser.kName: "%s%d" % (prefix, i), ir_parser.kType: self.__type()}
+                for i in range(count)]
+
+    def __enum(self, name):
+        return {ir_parser.kName: name,
+                ir_parser.kMembers: [{ir_parser.kName: "%s_V%d" % (name.upper(), i), ir_parser.kValue: i}
+                                     for i in range(self._params.enum_width)]}
+
+    def __struct(self, name):
+        return {ir_parser.kName: name,
+                ir_parser.kMembers: self.__args(self._params.struct_width, "field")}
+
+    def __union(self, name):
+        members = self.__args(self._params.union_width, "case")
+        for i, member in enumerate(members):
+            member[ir_parser.kCaseValue] = i + 1
+        return {ir_parser.kName: name, ir_parser.kSelectType: ["long"], ir_parser.kMembers: members}
+
+    def __interface(self, name):
+        methods = []
+        for i in range(self._params.methods):
+            if self._random.random() < 0.3:
+                returns = [{ir_parser.kType: {ir_parser.kTypeName: ["void"]}}]
+            else:
+                returns = [{ir_parser.kType: self.__type()}]
+            methods.append({ir_parser.kMethodName: "Method%d" % (i),
+                            ir_parser.kMethodReturn: returns,
+                            ir_parser.kMethodParameter: self.__args(self._random.randint(0, self._params.params), "arg")})
+
+        events = [{ir_parser.kEventName: "Event%d" % (i),
+                   ir_parser.kMembers: self.__args(self._random.randint(1, max(1, self._params.params)), "value")}
+                  for i in range(self._params.events)]
+        return {ir_parser.kName: name, ir_parser.kAttribute: "service",
+                ir_parser.kMethodList: methods, ir_parser.kEventList: events}
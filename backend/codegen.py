@@ -1,14 +1,123 @@
-
 import sys
+import copy
+import time
 import logging
 sys.path.append("..")
-import common.jsonIr_parser as ir_parser
 import common.utils as utils
-import cpp_with_ndk_gen.cpp_gen as cpp_ndk_gen
+import common.backend_registry as backend_registry
+
+# the other modules are imported where they are used, so -h, --list-backends and the
+# modes not taken do not pay for them, and only the backends of -t are ever loaded
+
+
+# depfile and output manifest of a successful generation, when asked for
+def _writeBuildDeps(options, backends, file_names):
+    if options.depfile_path is None and options.manifest_path is None:
+        return
+    import os
+    import common.depfile as depfile
+    # absolute like the sources, make and ninja resolve relative entries against the build
+    # directory, which need not be the directory codegen ran in
+    outputs = [os.path.abspath(utils.Utils.getGenFileName(options.dst_path, name)) for name in file_names]
+    inputs = [os.path.abspath(options.ir_path)] + depfile.sourceFiles(backends)
+    stamp_path = None
+    if options.depfile_path is not None:
+        # unchanged outputs keep their old mtime, so the target the build checks against the
+        # inputs is a stamp touched by every run. make matches targets by name, it is written
+        # as -d names it
+        stamp_path = depfile.stampPath(options.depfile_path)
+        depfile.touchStamp(stamp_path)
+        depfile.writeDepfile(options.depfile_path, [stamp_path], inputs)
+    if options.manifest_path is not None:
+        depfile.writeManifest(options.manifest_path, options, outputs, inputs,
+                              None if stamp_path is None else os.path.abspath(stamp_path))
+
+
+# generate the files of one ir, returns ret, file_names
+def genFiles(options):
+    import common.jsonIr_parser as ir_parser
+
+    registry = backend_registry.defaultRegistry()
+    backends = []
+    for gen_type in options.gen_types:
+        backend_class = registry.load(gen_type)
+        if backend_class is None:
+            return -1, []
+        backends.append(backend_class)
+
+    cache = None
+    if options.cache_dir is not None:
+        import common.gen_cache as gen_cache
+        cache = gen_cache.GenCache(options.cache_dir, options.cache_size)
+        cache_key = cache.makeKey(options.ir_path, options.gen_types, options.base_name,
+                                  gen_cache.outputSettings(options))
+        file_names = cache.restore(cache_key, options.dst_path)
+        if file_names is not None:
+            _writeBuildDeps(options, backends, file_names)
+            return 0, file_names
+
+    ir = ir_parser.JsonIRParser(options.ir_path)
+    ret, module = ir.parse()
+
+    if ret < 0:
+        logging.error("JsonIRParser failed")
+        return -1, []
+
+    file_names = []
+    try:
+        for backend_class in backends:
+            file_names += backend_class(options).gen(options.dst_path, options.base_name, module, options.jobs)
+    except ValueError as e:
+        # the ir can not be generated by a backend, e.g. two method names with the same hash
+        logging.error("%s: %s" % (options.ir_path, e))
+        return -1, []
+
+    if cache is not None:
+        cache.store(cache_key, options.dst_path, file_names)
+    _writeBuildDeps(options, backends, file_names)
+    return 0, file_names
+
+
+# library entry: render the files of an already loaded ir (a common.ir_model.Module or the raw
+# ir dict) without writing them, returns ret, {file name: content}. options are the
+# utils.CommandOptions backends are constructed with, defaults when None. backends providing
+# render(base_name, module, jobs, on_chunk) render in memory, the others are generated into a
+# temporary directory that is read back
+def renderFiles(module, base_name, gen_types, options=None, on_chunk=None):
+    import common.ir_model as ir_model
+
+    if options is None:
+        options = utils.CommandOptions()
+    if isinstance(module, dict):
+        module = ir_model.Module.fromDict(module)
+
+    registry = backend_registry.defaultRegistry()
+    files = {}
+    for gen_type in gen_types:
+        backend_class = registry.load(gen_type)
+        if backend_class is None:
+            return -1, {}
+        backend = backend_class(options)
+        if hasattr(backend, "render"):
+            try:
+                files.update(backend.render(base_name, module, options.jobs, on_chunk))
+            except ValueError as e:
+                logging.error("%s: %s" % (base_name, e))
+                return -1, {}
+            continue
+
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_path:
+            for file_name in backend.gen(tmp_path, base_name, module, options.jobs):
+                with open(utils.Utils.getGenFileName(tmp_path, file_name)) as f:
+                    files[file_name] = f.read()
+                if on_chunk is not None:
+                    on_chunk(file_name, files[file_name])
+    return 0, files
 
 
 if __name__=="__main__":
-    ret, ir_path, dst_path, base_name, gen_types = utils.Utils.parserCommand(sys.argv)
+    ret, options = utils.Utils.parserCommand(sys.argv)
 
     if ret > 0:
         sys.exit(0)
@@ -17,16 +126,52 @@ if __name__=="__main__":
         logging.error("parserCommand failed")
         sys.exit(0)
 
-    ir = ir_parser.JsonIRParser(ir_path)
-    ret, ir_dict = ir.parse()
+    if options.list_backends:
+        for gen_type in backend_registry.defaultRegistry().types():
+            print(gen_type)
+        sys.exit(0)
 
-    if ret < 0:
-        logging.error("JsonIRParser failed")
+    if options.cache_command is not None:
+        import common.gen_cache as gen_cache
+        cache = gen_cache.GenCache(options.cache_dir, options.cache_size)
+        if options.cache_command == "info":
+            cache.printInfo()
+        elif options.cache_command == "prune":
+            cache.prune()
         sys.exit(0)
 
-    for gen_type in gen_types:
-        if gen_type == "ndk_cpp":
-            cpp_ndk_gen.CppGenerator().gen(dst_path, base_name, ir_dict)
+    if options.batch_path is not None:
+        import common.batch as batch
+        ret, jobs = batch.loadManifest(options.batch_path)
+        if ret < 0:
+            sys.exit(1)
 
+        start = time.perf_counter()
+        results = batch.runBatch(jobs, options, genFiles, options.jobs)
+        failed = batch.writeBundles(results)
+        if batch.printReport(results, time.perf_counter() - start) + failed > 0:
+            sys.exit(1)
+        sys.exit(0)
 
+    if options.daemon_path is not None:
+        import common.daemon as daemon
+        codegen_daemon = daemon.CodegenDaemon(options.daemon_path, options, genFiles, options.poll_interval)
+        # an ir given on the command line is watched from the start
+        if options.base_name != "" and len(options.gen_types) > 0:
+            codegen_daemon.watch(copy.copy(options))
+        if codegen_daemon.run() < 0:
+            sys.exit(1)
+        sys.exit(0)
 
+    import common.profiler as profiler
+    if options.profile_path is not None:
+        profiler.enable()
+
+    with profiler.span("codegen " + options.base_name):
+        ret, file_names = genFiles(options)
+
+    if options.profile_path is not None:
+        profiler.current().printSummary()
+        profiler.current().writeTrace(options.profile_path)
+    if ret < 0:
+        sys.exit(1)
@@ -0,0 +1,138 @@
+import os
+import sys
+import logging
+import importlib
+import importlib.util
+
+# maps every -t type to a backend class, imported only when that type is generated.
+# a backend class is constructed with the utils.CommandOptions of the run and provides
+#   gen(dst_path, base_name, module, jobs) -> list of generated file names
+# where module is a common.ir_model.Module.
+#
+# besides the built-in backends, plugins are found
+#   - in the directories of $IDL_CODEGEN_PLUGIN_PATH (os.pathsep separated), as files
+#     <type>_backend.py defining a class Backend
+#   - as python entry points of the group idl_codegen.backends, named by type,
+#     for example: ndk_rust = my_package.rust_gen:RustGenerator
+
+kEntryPointGroup = "idl_codegen.backends"
+kPluginPathEnv = "IDL_CODEGEN_PLUGIN_PATH"
+kPluginFileSuffix = "_backend.py"
+kPluginClassName = "Backend"
+
+kBuiltinBackends = {
+    "ndk_cpp": "cpp_with_ndk_gen.cpp_gen:CppGenerator",
+}
+
+
+class BackendRegistry:
+    def __init__(self, plugin_dirs=None):
+        if plugin_dirs is None:
+            plugin_dirs = [item for item in os.environ.get(kPluginPathEnv, "").split(os.pathsep) if item != ""]
+        self._plugin_dirs = plugin_dirs
+        # type -> (module name or plugin file path, attribute name)
+        self._specs = {}
+        self._loaded = {}
+        self._discovered = False
+        for gen_type, spec in kBuiltinBackends.items():
+            self.register(gen_type, spec)
+
+    # spec is "module:attribute" or "/path/to/file.py:attribute", the first registration of a type wins
+    def register(self, gen_type, spec):
+        if gen_type in self._specs:
+            logging.warning("backend %s is already registered, ignore %s" % (gen_type, spec))
+            return
+        module_name, sep, attribute = spec.rpartition(":")
+        if sep == "" or module_name == "" or attribute == "":
+            logging.error("invalid backend spec %s for %s" % (spec, gen_type))
+            return
+        self._specs[gen_type] = (module_name, attribute)
+
+    def has(self, gen_type):
+        if gen_type in self._specs:
+            return True
+        self.__discover()
+        return gen_type in self._specs
+
+    def types(self):
+        self.__discover()
+        return sorted(self._specs)
+
+    # plugin files of the plugin dirs, the generation cache keys on their content too
+    def pluginFiles(self):
+        files = []
+        for plugin_dir in self._plugin_dirs:
+            if os.path.isdir(plugin_dir):
+                files += [os.path.join(os.path.abspath(plugin_dir), name) for name in sorted(os.listdir(plugin_dir))
+                          if name.endswith(kPluginFileSuffix)]
+        return files
+
+    # backend class of gen_type, or None when there is no such backend or it fails to import
+    def load(self, gen_type):
+        if gen_type in self._loaded:
+            return self._loaded[gen_type]
+        if not self.has(gen_type):
+            logging.error("unknown backend %s" % (gen_type))
+            return None
+
+        module_name, attribute = self._specs[gen_type]
+        try:
+            if module_name.endswith(".py"):
+                module = self.__importFile(gen_type, module_name)
+            else:
+                module = importlib.import_module(module_name)
+            backend_class = getattr(module, attribute)
+        except (ImportError, AttributeError, OSError, SyntaxError) as e:
+            logging.error("failed to load backend %s from %s: %s" % (gen_type, module_name, e))
+            backend_class = None
+
+        self._loaded[gen_type] = backend_class
+        return backend_class
+
+    def __importFile(self, gen_type, file_path):
+        module_name = "idl_codegen_plugin_" + gen_type
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+        return module
+
+    # plugins are only looked for once a type is not built in, so the common case never scans
+    def __discover(self):
+        if self._discovered:
+            return
+        self._discovered = True
+
+        for plugin_dir in self._plugin_dirs:
+            if not os.path.isdir(plugin_dir):
+                logging.warning("backend plugin dir %s does not exist" % (plugin_dir))
+        for file_path in self.pluginFiles():
+            self.register(os.path.basename(file_path)[:-len(kPluginFileSuffix)], file_path + ":" + kPluginClassName)
+
+        try:
+            import importlib.metadata as metadata
+        except ImportError:
+            return
+        entry_points = metadata.entry_points()
+        if hasattr(entry_points, "select"):
+            group = entry_points.select(group=kEntryPointGroup)
+        else:
+            group = entry_points.get(kEntryPointGroup, [])
+        for entry_point in group:
+            self.register(entry_point.name, entry_point.value)
+
+
+_default_registry = None
+
+
+def defaultRegistry():
+    global _default_registry
+    if _default_registry is None:
+        _default_registry = BackendRegistry()
+    return _default_registry
@@ -0,0 +1,160 @@
+import os
+import copy
+import json
+import time
+import logging
+import traceback
+import concurrent.futures
+import common.utils as utils
+import common.output_sink as output_sink
+
+# manifest keys of one job
+kJobIrPath = "ir_path"
+kJobBaseName = "base_name"
+kJobDstPath = "dst_path"
+kJobGenTypes = "gen_types"
+kJobDepfile = "depfile"
+kJobManifest = "manifest"
+kJobUnityBundle = "unity_bundle"
+
+
+class BatchJob:
+    def __init__(self, ir_path, base_name, dst_path, gen_types, depfile_path=None, manifest_path=None,
+                 unity_bundle=None):
+        self.ir_path = ir_path
+        self.base_name = base_name
+        self.dst_path = dst_path
+        self.gen_types = gen_types
+        self.depfile_path = depfile_path
+        self.manifest_path = manifest_path
+        self.unity_bundle = unity_bundle
+
+    # options of a single codegen run, other settings are inherited from base_options
+    def toOptions(self, base_options):
+        options = copy.copy(base_options)
+        options.ir_path = self.ir_path
+        options.base_name = self.base_name
+        options.dst_path = self.dst_path
+        options.gen_types = list(self.gen_types)
+        options.jobs = 1
+        options.batch_path = None
+        # a depfile or manifest of the command line would be overwritten by every job
+        options.depfile_path = self.depfile_path
+        options.manifest_path = self.manifest_path
+        if self.unity_bundle is not None:
+            options.unity = True
+            options.shard = None
+        return options
+
+
+class BatchResult:
+    def __init__(self, job, ret, elapsed, file_names, error=None):
+        self.job = job
+        self.ret = ret
+        self.elapsed = elapsed
+        self.file_names = file_names
+        self.error = error
+
+
+# manifest is a json list of {"ir_path", "base_name", "dst_path", "gen_types"} objects, optionally
+# with "depfile" and "manifest" outputs of the job and the "unity_bundle" it is part of.
+# relative paths are taken relative to the manifest, gen_types may be a list or a single type.
+# returns ret, jobs
+def loadManifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        logging.error("failed to read batch manifest %s: %s" % (manifest_path, e))
+        return -1, []
+
+    if not isinstance(manifest, list):
+        logging.error("batch manifest %s is not a list of jobs" % (manifest_path))
+        return -1, []
+
+    manifest_dir = os.path.dirname(os.path.abspath(manifest_path))
+    jobs = []
+    for i, item in enumerate(manifest):
+        if not isinstance(item, dict) or not kJobIrPath in item or not kJobBaseName in item \
+            or not kJobGenTypes in item:
+            logging.error("batch job %d needs %s, %s and %s" % (i, kJobIrPath, kJobBaseName, kJobGenTypes))
+            return -1, []
+
+        gen_types = item[kJobGenTypes]
+        if isinstance(gen_types, str):
+            gen_types = [gen_types]
+
+        depfile_path, manifest_path, unity_bundle = [os.path.normpath(os.path.join(manifest_dir, item[key]))
+                                                     if key in item else None
+                                                     for key in (kJobDepfile, kJobManifest, kJobUnityBundle)]
+        jobs.append(BatchJob(os.path.normpath(os.path.join(manifest_dir, item[kJobIrPath])),
+                             item[kJobBaseName],
+                             os.path.normpath(os.path.join(manifest_dir, item.get(kJobDstPath, "."))),
+                             gen_types, depfile_path, manifest_path, unity_bundle))
+    return 0, jobs
+
+
+# gen_func(options) returns ret, file_names. an exception only fails its own job
+def _runJob(gen_func, job, options):
+    start = time.perf_counter()
+    try:
+        ret, file_names = gen_func(options)
+        error = None if ret >= 0 else "generation failed"
+    except Exception:
+        ret, file_names = -1, []
+        error = traceback.format_exc().strip().splitlines()[-1]
+    return BatchResult(job, ret, time.perf_counter() - start, file_names, error)
+
+
+# run all jobs in this interpreter, in a pool of worker processes when workers > 1.
+# results are in the order of jobs
+def runBatch(jobs, base_options, gen_func, workers=1):
+    if workers <= 1 or len(jobs) <= 1:
+        return [_runJob(gen_func, job, job.toOptions(base_options)) for job in jobs]
+
+    workers = min(workers, len(jobs))
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_runJob, gen_func, job, job.toOptions(base_options)) for job in jobs]
+        return [future.result() for future in futures]
+
+
+# write every unity bundle as one .cpp including the generated .cpp files of its jobs, in
+# manifest order. a bundle with a failed job is left alone, returns the number of those
+def writeBundles(results):
+    bundles = {}
+    for result in results:
+        if result.job.unity_bundle is not None:
+            bundles.setdefault(result.job.unity_bundle, []).append(result)
+
+    failed = 0
+    for bundle_path, bundle_results in bundles.items():
+        if any(result.ret < 0 for result in bundle_results):
+            logging.error("unity bundle %s not written, one of its jobs failed" % (bundle_path))
+            failed += 1
+            continue
+
+        bundle_dir = os.path.dirname(os.path.abspath(bundle_path))
+        lines = ["// unity bundle generated by codegen.py, do not edit\n"]
+        for result in bundle_results:
+            for name in result.file_names:
+                if name.endswith(".cpp"):
+                    full_name = os.path.abspath(utils.Utils.getGenFileName(result.job.dst_path, name))
+                    lines.append('#include "%s"\n' % (os.path.relpath(full_name, bundle_dir).replace(os.sep, "/")))
+        output_sink.writeIfChanged(bundle_path, "".join(lines))
+    return failed
+
+
+# print one status line per job and a summary, returns the number of failed jobs
+def printReport(results, elapsed):
+    failed = 0
+    for result in results:
+        if result.ret < 0:
+            failed += 1
+            utils.ColorsPrint.PrintE("[FAIL] %-24s %8.3fs  %s (%s)" % (result.job.base_name,
+                                        result.elapsed, result.job.ir_path, result.error))
+        else:
+            print("[ OK ] %-24s %8.3fs  %d files" % (result.job.base_name,
+                                        result.elapsed, len(result.file_names)))
+
+    print("batch: %d jobs, %d failed, %.3fs" % (len(results), failed, elapsed))
+    return failed
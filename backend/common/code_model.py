@@ -0,0 +1,98 @@
+# lightweight tree of generated code. generators append text and child nodes in output
+# order, render() then walks the tree once and joins all pieces, so building a file is
+# linear in its size instead of re-copying a growing string for every +=
+
+
+class Fragment:
+    __slots__ = ("_parts",)
+
+    def __init__(self, *parts):
+        self._parts = list(parts)
+
+    # text or a child node, returns it so a child can be filled after adding
+    def add(self, part):
+        self._parts.append(part)
+        return part
+
+    def addf(self, fmt, *args):
+        self._parts.append(fmt % args)
+
+    # items separated by separator, like separator.join(items)
+    def addJoined(self, items, separator):
+        first = True
+        for item in items:
+            if not first:
+                self._parts.append(separator)
+            self._parts.append(item)
+            first = False
+
+    def isEmpty(self):
+        for part in self._parts:
+            if isinstance(part, Fragment):
+                if not part.isEmpty():
+                    return False
+            elif part != "":
+                return False
+        return True
+
+    def render(self):
+        pieces = []
+        self._renderInto(pieces)
+        return "".join(pieces)
+
+    def _renderInto(self, pieces):
+        for part in self._parts:
+            if isinstance(part, Fragment):
+                part._renderInto(pieces)
+            else:
+                pieces.append(part)
+
+
+# fragment between a fixed opening and closing text, for example a class body
+class Scope(Fragment):
+    __slots__ = ("_begin", "_end")
+
+    def __init__(self, begin, end):
+        super(Scope, self).__init__()
+        self._begin = begin
+        self._end = end
+
+    def _renderInto(self, pieces):
+        pieces.append(self._begin)
+        super(Scope, self)._renderInto(pieces)
+        pieces.append(self._end)
+
+
+# nested c++ namespaces of module_names, in the layout every generated file uses
+class Namespace(Scope):
+    __slots__ = ()
+
+    def __init__(self, module_names):
+        begin = "".join(["\nnamespace %s {" % (name) for name in module_names]) + "\n"
+        end = "".join(["\n}  // namespace %s" % (name) for name in module_names]) + "\n"
+        super(Namespace, self).__init__(begin, end)
+
+    def beginText(self):
+        return self._begin
+
+    def endText(self):
+        return self._end
+
+
+# rendered snippets keyed by the ir nodes they come from, so files generated from the same
+# module reuse a snippet instead of rendering it again. the nodes are kept alive with the
+# entry, which keeps their ids unique for the lifetime of the cache
+class SnippetCache:
+    def __init__(self):
+        self._snippets = {}
+
+    def get(self, node, key, factory):
+        full_key = (id(node), key)
+        entry = self._snippets.get(full_key)
+        if entry is None:
+            entry = (node, factory())
+            self._snippets[full_key] = entry
+        return entry[1]
+
+    def size(self):
+        return len(self._snippets)
@@ -0,0 +1,266 @@
+import os
+import copy
+import json
+import time
+import socket
+import hashlib
+import logging
+import threading
+import socketserver
+import common.backend_registry as backend_registry
+
+# requests are one json object per line, every request gets one json line back:
+#   {"command": "gen", "ir_path": ..., "base_name": ..., "dst_path": ..., "gen_types": [...],
+#    "depfile": ..., "manifest": ..., "cwd": ...}
+#       generate now if the ir changed since the last run and keep watching it
+#   {"command": "unwatch", "ir_path": ..., "base_name": ..., "dst_path": ..., "cwd": ...}
+#   {"command": "status"}
+#   {"command": "shutdown"}
+# replies carry "ret" (0 ok, -1 failed) and command specific fields
+# the daemon runs in its own directory, relative paths of a request are joined to its absolute
+# "cwd" and a request with relative paths but no "cwd" is refused
+kCommandGen = "gen"
+kCommandUnwatch = "unwatch"
+kCommandStatus = "status"
+kCommandShutdown = "shutdown"
+
+kDefaultPollInterval = 1.0
+
+
+def _fileDigest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class WatchedJob:
+    def __init__(self, options):
+        self.options = options
+        self.stamp = None
+        self.digest = None
+        self.file_names = []
+        self.last_ret = None
+        self.last_elapsed = 0.0
+        self.gen_count = 0
+
+    def outputsPresent(self):
+        for name in self.file_names:
+            if not os.path.isfile(os.path.join(self.options.dst_path, name)):
+                return False
+        return True
+
+    @staticmethod
+    def makeKey(ir_path, base_name, dst_path):
+        return (os.path.abspath(ir_path), base_name, os.path.abspath(dst_path))
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if line.strip() == b"":
+                continue
+            try:
+                request = json.loads(line)
+                if not isinstance(request, dict):
+                    raise ValueError("request is not an object")
+                reply = self.server.codegen_daemon.handleRequest(request)
+            except ValueError as e:
+                reply = {"ret": -1, "error": "invalid request: %s" % (e)}
+            self.wfile.write((json.dumps(reply) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            # handler threads are daemon threads, the server only stops once the reply is out
+            if self.server.codegen_daemon.stopping():
+                self.server.codegen_daemon.shutdown()
+                return
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+# keeps the generators loaded, polls the mtime of every watched ir and
+# regenerates only the jobs whose ir content changed
+class CodegenDaemon:
+    def __init__(self, socket_path, base_options, gen_func, poll_interval=kDefaultPollInterval):
+        self._socket_path = socket_path
+        self._base_options = base_options
+        self._gen_func = gen_func
+        self._poll_interval = poll_interval
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._server = None
+
+    def watch(self, options):
+        with self._lock:
+            key = WatchedJob.makeKey(options.ir_path, options.base_name, options.dst_path)
+            job = self._jobs.get(key)
+            if job is None or job.options.gen_types != options.gen_types \
+                or job.options.depfile_path != options.depfile_path \
+                or job.options.manifest_path != options.manifest_path:
+                job = WatchedJob(options)
+                self._jobs[key] = job
+            self.__update(job)
+            return job
+
+    def handleRequest(self, request):
+        command = request.get("command")
+        if command == kCommandGen:
+            if not "ir_path" in request or not "base_name" in request or not "gen_types" in request:
+                return {"ret": -1, "error": "gen needs ir_path, base_name and gen_types"}
+            options = self.__makeOptions(request)
+            # a bad request must not replace a working watched job
+            for gen_type in options.gen_types:
+                if backend_registry.defaultRegistry().load(gen_type) is None:
+                    return {"ret": -1, "error": "unknown backend %s" % (gen_type)}
+            job = self.watch(options)
+            return {"ret": job.last_ret, "files": job.file_names, "elapsed": job.last_elapsed,
+                    "gen_count": job.gen_count}
+
+        if command == kCommandUnwatch:
+            key = WatchedJob.makeKey(self.__requestPath(request, request.get("ir_path", "")),
+                                     request.get("base_name", ""),
+                                     self.__requestPath(request, request.get("dst_path", ".")))
+            with self._lock:
+                removed = self._jobs.pop(key, None)
+            return {"ret": 0 if removed is not None else -1}
+
+        if command == kCommandStatus:
+            with self._lock:
+                jobs = [{"ir_path": job.options.ir_path, "base_name": job.options.base_name,
+                         "dst_path": job.options.dst_path, "ret": job.last_ret,
+                         "elapsed": job.last_elapsed, "gen_count": job.gen_count}
+                        for job in self._jobs.values()]
+            return {"ret": 0, "jobs": jobs}
+
+        if command == kCommandShutdown:
+            # the server is shut down by the handler, after it sent this reply
+            self._stop.set()
+            return {"ret": 0}
+
+        return {"ret": -1, "error": "unknown command %s" % (command)}
+
+    def stopping(self):
+        return self._stop.is_set()
+
+    # stops serve_forever, which waits for this to return when called from its own thread
+    def shutdown(self):
+        threading.Thread(target=self._server.shutdown, daemon=True).start()
+
+    # serve until a shutdown request or KeyboardInterrupt, returns ret
+    def run(self):
+        if not hasattr(socket, "AF_UNIX"):
+            logging.error("daemon mode needs unix domain sockets")
+            return -1
+
+        if os.path.exists(self._socket_path):
+            # a socket nobody answers on is left over from a crashed daemon
+            if self.__isAlive():
+                logging.error("daemon already running on %s" % (self._socket_path))
+                return -1
+            os.remove(self._socket_path)
+
+        self._server = _UnixServer(self._socket_path, _RequestHandler)
+        self._server.codegen_daemon = self
+        poller = threading.Thread(target=self.__pollLoop, daemon=True)
+        poller.start()
+        logging.info("daemon listening on %s" % (self._socket_path))
+
+        try:
+            self._server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self._stop.set()
+            self._server.server_close()
+            if os.path.exists(self._socket_path):
+                os.remove(self._socket_path)
+        return 0
+
+    def __makeOptions(self, request):
+        options = copy.copy(self._base_options)
+        options.ir_path = self.__requestPath(request, request["ir_path"])
+        options.base_name = request["base_name"]
+        options.dst_path = self.__requestPath(request, request.get("dst_path", "."))
+        gen_types = request["gen_types"]
+        options.gen_types = [gen_types] if isinstance(gen_types, str) else list(gen_types)
+        options.daemon_path = None
+        options.depfile_path = self.__requestPath(request, request.get("depfile"))
+        options.manifest_path = self.__requestPath(request, request.get("manifest"))
+        return options
+
+    # path of a request as an absolute path, raises ValueError when it can not be resolved
+    def __requestPath(self, request, path):
+        if path is None:
+            return None
+        if not isinstance(path, str):
+            raise ValueError("path %s is not a string" % (path))
+        if os.path.isabs(path):
+            return path
+        cwd = request.get("cwd")
+        if not isinstance(cwd, str) or not os.path.isabs(cwd):
+            raise ValueError("relative path %s needs an absolute cwd" % (path))
+        return os.path.join(cwd, path)
+
+    def __pollLoop(self):
+        while not self._stop.wait(self._poll_interval):
+            with self._lock:
+                for job in list(self._jobs.values()):
+                    self.__update(job)
+
+    # regenerate job when its ir changed, must be called with self._lock held
+    def __update(self, job):
+        try:
+            st = os.stat(job.options.ir_path)
+        except OSError as e:
+            if job.last_ret != -1:
+                logging.error("can not stat %s: %s" % (job.options.ir_path, e))
+            job.stamp = None
+            job.last_ret = -1
+            return
+
+        # outputs deleted behind our back are regenerated as well
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == job.stamp and job.outputsPresent():
+            return
+        job.stamp = stamp
+
+        # an editor touching the file without changing it should not regenerate
+        digest = _fileDigest(job.options.ir_path)
+        if digest == job.digest and job.last_ret == 0 and job.outputsPresent():
+            return
+
+        start = time.perf_counter()
+        try:
+            ret, file_names = self._gen_func(job.options)
+        except Exception:
+            logging.exception("generation of %s failed" % (job.options.ir_path))
+            ret, file_names = -1, []
+        job.last_elapsed = time.perf_counter() - start
+        job.last_ret = ret
+        job.file_names = file_names
+        job.digest = digest if ret >= 0 else None
+        job.gen_count += 1
+        logging.info("regenerated %s in %.3fs, ret %d" % (job.options.ir_path, job.last_elapsed, ret))
+
+    def __isAlive(self):
+        try:
+            reply = request(self._socket_path, {"command": kCommandStatus}, timeout=1.0)
+        except OSError:
+            return False
+        return reply is not None
+
+
+# send one request to a running daemon and return its reply
+def request(socket_path, request_dict, timeout=None):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        sock.sendall((json.dumps(request_dict) + "\n").encode("utf-8"))
+        with sock.makefile('rb') as f:
+            line = f.readline()
+    if line == b"":
+        return None
+    return json.loads(line)
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import common.output_sink as output_sink
+import common.backend_registry as backend_registry
+
+# build system integration. a depfile (make syntax, read by make, ninja and cmake's DEPFILE)
+# names a stamp file as the target depending on the ir and on the python sources of the
+# generator, the output manifest lists the generated files, inputs and stamp in json for tools
+# that want it parsed. the generated files are not the target: an output whose content did not
+# change keeps its old mtime (see output_sink.replaceIfChanged), it would stay older than the
+# inputs and make would rerun codegen on every build. the build lists them as byproducts
+
+# bump when the layout of the output manifest changes
+kManifestFormatVersion = 2
+
+_backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# parts of the backend tree no generation runs
+kSkippedDirs = ("benchmark", "tests")
+
+
+# python sources a generation depends on: the backend tree, which is also what the generation
+# cache keys on, the plugin files, and the modules of backends living outside of both
+def sourceFiles(backend_classes=()):
+    files = []
+    for root, dirs, names in os.walk(_backend_dir):
+        dirs[:] = sorted(item for item in dirs if not item.startswith(".") and item != "__pycache__"
+                         and not (root == _backend_dir and item in kSkippedDirs))
+        files += [os.path.join(root, name) for name in sorted(names) if name.endswith(".py")]
+    files += backend_registry.defaultRegistry().pluginFiles()
+
+    for backend_class in backend_classes:
+        module = sys.modules.get(backend_class.__module__)
+        file_path = getattr(module, "__file__", None)
+        if file_path is not None and not os.path.abspath(file_path) in files:
+            files.append(os.path.abspath(file_path))
+    return files
+
+
+# the stamp of depfile_path: the same path with the extension .stamp
+def stampPath(depfile_path):
+    return os.path.splitext(depfile_path)[0] + ".stamp"
+
+
+# create stamp_path or set its mtime to now
+def touchStamp(stamp_path):
+    os.makedirs(os.path.dirname(os.path.abspath(stamp_path)), exist_ok=True)
+    with open(stamp_path, 'a'):
+        pass
+    os.utime(stamp_path)
+
+
+def _escape(path):
+    return path.replace("$", "$$").replace("#", "\\#").replace(" ", "\\ ")
+
+
+def writeDepfile(depfile_path, outputs, inputs):
+    lines = [" \\\n  ".join(_escape(item) for item in outputs) + ":"]
+    lines += ["  " + _escape(item) for item in inputs]
+    output_sink.writeIfChanged(depfile_path, " \\\n".join(lines) + "\n")
+
+
+# stamp_path is None when no depfile was written
+def writeManifest(manifest_path, options, outputs, inputs, stamp_path=None):
+    manifest = {
+        "format": kManifestFormatVersion,
+        "ir_path": os.path.abspath(options.ir_path),
+        "base_name": options.base_name,
+        "gen_types": list(options.gen_types),
+        "outputs": list(outputs),
+        "inputs": list(inputs),
+        "stamp": stamp_path,
+    }
+    output_sink.writeIfChanged(manifest_path, json.dumps(manifest, indent=2) + "\n")
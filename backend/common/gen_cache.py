@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import common.utils as utils
+import common.output_sink as output_sink
+import common.depfile as depfile
+
+# bump when the layout of a cache entry changes
+kCacheFormatVersion = "1"
+kDefaultCacheSize = 256 * 1024 * 1024
+kManifestName = "manifest.json"
+
+_source_version = None
+
+
+# hash of the backend's own python sources and of the plugin files, so editing a generator
+# invalidates its cached outputs
+def sourceVersion():
+    global _source_version
+    if _source_version is not None:
+        return _source_version
+
+    backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for full_name in depfile.sourceFiles():
+        digest.update(os.path.relpath(full_name, backend_dir).encode("utf-8"))
+        with open(full_name, 'rb') as f:
+            digest.update(f.read())
+
+    _source_version = digest.hexdigest()
+    return _source_version
+
+
+# the options of a run that change what is generated, as part of its cache key
+def outputSettings(options):
+    return "shard=%s unity=%s views=%s" % (options.shard, options.unity, options.views)
+
+
+class GenCache:
+    def __init__(self, cache_dir, max_size=kDefaultCacheSize):
+        self._cache_dir = cache_dir
+        self._max_size = max_size
+
+    # settings are the options that change the generated files besides the ir, see outputSettings
+    def makeKey(self, ir_path, gen_types, base_name, settings=""):
+        digest = hashlib.sha256()
+        digest.update(("%s\0%s\0%s\0%s\0%s\0" % (kCacheFormatVersion, sourceVersion(),
+                        ",".join(sorted(gen_types)), base_name, settings)).encode("utf-8"))
+        with open(ir_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    # copy the files of a cached generation into dst_path, returns the restored file names or None on miss
+    def restore(self, key, dst_path):
+        entry_dir = self.__entryDir(key)
+        manifest = self.__readManifest(entry_dir)
+        if manifest is None:
+            return None
+
+        if os.path.exists(dst_path) == False:
+            os.makedirs(dst_path, exist_ok=True)
+
+        for name in manifest["files"]:
+            fd, tmp_name = tempfile.mkstemp(prefix="." + name + ".", suffix=".tmp", dir=dst_path)
+            os.close(fd)
+            try:
+                shutil.copyfile(os.path.join(entry_dir, name), tmp_name)
+            except OSError as e:
+                # a concurrent prune removed the entry after its manifest was read
+                os.remove(tmp_name)
+                logging.info("cache entry %s went away during restore: %s" % (key, e))
+                return None
+            output_sink.replaceIfChanged(tmp_name, utils.Utils.getGenFileName(dst_path, name))
+
+        # mark as recently used for lru eviction, the entry may be pruned by now
+        try:
+            os.utime(os.path.join(entry_dir, kManifestName))
+        except OSError:
+            pass
+        logging.info("cache hit %s, restored %d files" % (key, len(manifest["files"])))
+        return manifest["files"]
+
+    def store(self, key, dst_path, file_names):
+        entry_dir = self.__entryDir(key)
+        if os.path.isdir(entry_dir):
+            return
+
+        parent_dir = os.path.dirname(entry_dir)
+        os.makedirs(parent_dir, exist_ok=True)
+
+        # fill a private directory first and rename it, so a reader never sees a partial entry
+        tmp_dir = tempfile.mkdtemp(prefix="." + key + ".", dir=parent_dir)
+        try:
+            for name in file_names:
+                shutil.copyfile(utils.Utils.getGenFileName(dst_path, name), os.path.join(tmp_dir, name))
+            with open(os.path.join(tmp_dir, kManifestName), 'w') as f:
+                json.dump({"files": list(file_names), "created": time.time()}, f)
+            os.rename(tmp_dir, entry_dir)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(entry_dir):
+                logging.warning("failed to store cache entry %s: %s" % (key, e))
+                return
+
+        self.prune()
+
+    # cached entries as (key, size in bytes, last used time), least recently used first
+    def entries(self):
+        result = []
+        if not os.path.isdir(self._cache_dir):
+            return result
+
+        for prefix in os.listdir(self._cache_dir):
+            prefix_dir = os.path.join(self._cache_dir, prefix)
+            if not os.path.isdir(prefix_dir):
+                continue
+            for key in os.listdir(prefix_dir):
+                if key.startswith("."):
+                    continue
+                entry_dir = os.path.join(prefix_dir, key)
+                manifest_name = os.path.join(entry_dir, kManifestName)
+                if not os.path.isfile(manifest_name):
+                    continue
+                size = 0
+                for name in os.listdir(entry_dir):
+                    size += os.path.getsize(os.path.join(entry_dir, name))
+                result.append((key, size, os.path.getmtime(manifest_name)))
+
+        result.sort(key=lambda item: item[2])
+        return result
+
+    # evict least recently used entries until the cache fits in max_size, returns the evicted count
+    def prune(self, max_size=None):
+        if max_size is None:
+            max_size = self._max_size
+
+        entries = self.entries()
+        total = sum(item[1] for item in entries)
+        evicted = 0
+        for key, size, last_used in entries:
+            if total <= max_size:
+                break
+            shutil.rmtree(self.__entryDir(key), ignore_errors=True)
+            total -= size
+            evicted += 1
+
+        if evicted > 0:
+            logging.info("cache evicted %d entries" % (evicted))
+        return evicted
+
+    def printInfo(self):
+        entries = self.entries()
+        total = sum(item[1] for item in entries)
+        print("cache dir: %s" % (self._cache_dir))
+        print("entries: %d, size: %d bytes, limit: %d bytes" % (len(entries), total, self._max_size))
+        for key, size, last_used in reversed(entries):
+            print("  %s  %10d  %s" % (key, size, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(last_used))))
+
+    def __entryDir(self, key):
+        return os.path.join(self._cache_dir, key[0:2], key)
+
+    def __readManifest(self, entry_dir):
+        manifest_name = os.path.join(entry_dir, kManifestName)
+        if not os.path.isfile(manifest_name):
+            return None
+
+        try:
+            with open(manifest_name) as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        for name in manifest["files"]:
+            if not os.path.isfile(os.path.join(entry_dir, name)):
+                return None
+        return manifest
@@ -0,0 +1,346 @@
+import mmap
+import struct
+import common.jsonIr_parser as ir_parser
+import common.ir_model as ir_model
+
+# compact binary encoding of the json ir, written by idlc --binary (frontend/include/binary_writer.h)
+# and by ir_convert.py. it holds the same value tree as the json, so either decodes to the same
+# ir_model.Module. all integers are little endian, varints are unsigned LEB128.
+#
+#   header   "IDLB", u16 format version, u16 flags (0), u32 offset of the string table,
+#            u32 offset of the value table, u32 value index of the root object
+#   tables   u32 count, u32 offsets[count + 1] relative to the first byte after them, the entries.
+#            an entry is as long as the difference of its two offsets
+#   strings  utf-8 bytes
+#   values   every array and object, each distinct one once: its tag, varint count, then per item
+#              (an object member starts with the varint string index of its key)
+#              kTagNull, kTagFalse, kTagTrue    the tag only
+#              kTagInt                          tag, zigzag varint
+#              kTagFloat                        tag, f64
+#              kTagString                       tag, varint string index
+#              kTagRef                          tag, varint value index of an array or object
+#
+# an ir repeats the same small objects all the time, types and parameters above all. writing every
+# distinct container once keeps the file small and lets a reader decode each of them only once,
+# the file is mapped and only the parts asked for are decoded
+
+kMagic = b"IDLB"
+kFormatVersion = 1
+kHeader = struct.Struct("<4sHHIII")
+
+kTagNull = 0
+kTagFalse = 1
+kTagTrue = 2
+kTagInt = 3
+kTagFloat = 4
+kTagString = 5
+kTagArray = 6
+kTagObject = 7
+kTagRef = 8
+
+_float = struct.Struct("<d")
+_u32 = struct.Struct("<I")
+
+
+def isBinaryIR(ir_path):
+    try:
+        with open(ir_path, 'rb') as f:
+            return f.read(len(kMagic)) == kMagic
+    except OSError:
+        return False
+
+
+def _putVarint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+# entries of a string or value table, each distinct entry gets one index
+class _Table:
+    def __init__(self):
+        self._index = {}
+        self._entries = []
+
+    def add(self, entry):
+        index = self._index.get(entry)
+        if index is None:
+            index = len(self._entries)
+            self._index[entry] = index
+            self._entries.append(entry)
+        return index
+
+    def toBytes(self):
+        table = bytearray(_u32.pack(len(self._entries)))
+        offset = 0
+        for entry in self._entries:
+            table += _u32.pack(offset)
+            offset += len(entry)
+        table += _u32.pack(offset)
+        return bytes(table) + b"".join(self._entries)
+
+
+class _Encoder:
+    def __init__(self):
+        self.strings = _Table()
+        self.values = _Table()
+
+    def __string(self, value):
+        return self.strings.add(value.encode("utf-8"))
+
+    # appends the item encoding of value to out
+    def encodeItem(self, value, out):
+        if value is None:
+            out.append(kTagNull)
+        elif value is True:
+            out.append(kTagTrue)
+        elif value is False:
+            out.append(kTagFalse)
+        elif isinstance(value, int):
+            out.append(kTagInt)
+            _putVarint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+        elif isinstance(value, float):
+            out.append(kTagFloat)
+            out += _float.pack(value)
+        elif isinstance(value, str):
+            out.append(kTagString)
+            _putVarint(out, self.__string(value))
+        else:
+            out.append(kTagRef)
+            _putVarint(out, self.encodeContainer(value))
+
+    # value index of the array or object value
+    def encodeContainer(self, value):
+        entry = bytearray()
+        if isinstance(value, (list, tuple)):
+            entry.append(kTagArray)
+            _putVarint(entry, len(value))
+            for item in value:
+                self.encodeItem(item, entry)
+        elif isinstance(value, dict):
+            entry.append(kTagObject)
+            _putVarint(entry, len(value))
+            for key, item in value.items():
+                _putVarint(entry, self.__string(key))
+                self.encodeItem(item, entry)
+        else:
+            raise TypeError("can not encode %s in a binary ir" % (type(value).__name__))
+        return self.values.add(bytes(entry))
+
+
+# binary ir of a json value tree, usually the dict json.load returns for an ir
+def encode(value):
+    if not isinstance(value, dict):
+        raise TypeError("the root of an ir is an object")
+    encoder = _Encoder()
+    root = encoder.encodeContainer(value)
+    strings = encoder.strings.toBytes()
+    values = encoder.values.toBytes()
+    return kHeader.pack(kMagic, kFormatVersion, 0, kHeader.size, kHeader.size + len(strings), root) \
+        + strings + values
+
+
+class BinaryIRReader:
+    def __init__(self, ir_path):
+        self._file = open(ir_path, 'rb')
+        try:
+            self._data = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # an empty file can not be mapped, it fails the header check below
+            self._data = b""
+        try:
+            if len(self._data) < kHeader.size:
+                raise ValueError("%s is too short for a binary ir" % (ir_path))
+            magic, version, flags, strings_offset, values_offset, self._root = kHeader.unpack_from(self._data, 0)
+            if magic != kMagic:
+                raise ValueError("%s is not a binary ir" % (ir_path))
+            if version != kFormatVersion:
+                raise ValueError("%s has binary ir format %d, supported is %d" % (ir_path, version, kFormatVersion))
+            self._string_offsets, self._strings_base = self.__table(strings_offset)
+            self._value_offsets, self._values_base = self.__table(values_offset)
+        except (ValueError, struct.error):
+            self.close()
+            raise
+        self._strings = [None] * (len(self._string_offsets) - 1)
+        # every container is decoded once, later references share the result
+        self._values = [None] * (len(self._value_offsets) - 1)
+
+    def __table(self, offset):
+        count = _u32.unpack_from(self._data, offset)[0]
+        offsets = struct.unpack_from("<%dI" % (count + 1), self._data, offset + 4)
+        return offsets, offset + 4 + 4 * (count + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        if isinstance(self._data, mmap.mmap):
+            self._data.close()
+        self._data = b""
+        self._file.close()
+
+    # the top level ir object
+    def root(self):
+        return LazyObject(self, self._root)
+
+    # the whole ir decoded, as json.load would give it
+    def value(self):
+        return self.container(self._root)
+
+    def string(self, index):
+        value = self._strings[index]
+        if value is None:
+            base = self._strings_base
+            value = str(self._data[base + self._string_offsets[index]:base + self._string_offsets[index + 1]], "utf-8")
+            self._strings[index] = value
+        return value
+
+    def varint(self, pos):
+        data = self._data
+        value = 0
+        shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7f) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+
+    # (tag, count, position of the first item) of the value entry index
+    def entry(self, index):
+        pos = self._values_base + self._value_offsets[index]
+        tag = self._data[pos]
+        count, pos = self.varint(pos + 1)
+        return tag, count, pos
+
+    # the array or object index as plain python values, like json.load gives them. the
+    # result is shared by every reference to the same value, so it must not be changed
+    def container(self, index):
+        value = self._values[index]
+        if value is not None:
+            return value
+
+        tag, count, pos = self.entry(index)
+        if tag == kTagObject:
+            value = {}
+            for i in range(count):
+                key, pos = self.varint(pos)
+                value[self.string(key)], pos = self.item(pos)
+        elif tag == kTagArray:
+            value = [None] * count
+            for i in range(count):
+                value[i], pos = self.item(pos)
+        else:
+            raise ValueError("invalid value entry %d" % (index))
+        self._values[index] = value
+        return value
+
+    def tag(self, pos):
+        return self._data[pos]
+
+    # end of the item at pos, without decoding it
+    def skip(self, pos):
+        tag = self._data[pos]
+        if tag == kTagFloat:
+            return pos + 1 + _float.size
+        if tag in (kTagInt, kTagString, kTagRef):
+            return self.varint(pos + 1)[1]
+        return pos + 1
+
+    # value and end of the item at pos
+    def item(self, pos):
+        data = self._data
+        tag = data[pos]
+        pos += 1
+        if tag == kTagRef or tag == kTagString:
+            byte = data[pos]
+            if byte < 0x80:
+                index = byte
+                pos += 1
+            else:
+                index, pos = self.varint(pos)
+            if tag == kTagRef:
+                value = self._values[index]
+                return (self.container(index) if value is None else value), pos
+            value = self._strings[index]
+            return (self.string(index) if value is None else value), pos
+        if tag == kTagInt:
+            value, pos = self.varint(pos)
+            return ((value >> 1) if not value & 1 else -((value + 1) >> 1)), pos
+        if tag == kTagTrue:
+            return True, pos
+        if tag == kTagFalse:
+            return False, pos
+        if tag == kTagNull:
+            return None, pos
+        if tag == kTagFloat:
+            return _float.unpack_from(data, pos)[0], pos + _float.size
+        raise ValueError("invalid tag %d at offset %d" % (tag, pos - 1))
+
+
+# object of a binary ir, its members are only located when first asked for and only
+# decoded when read
+class LazyObject:
+    def __init__(self, reader, index):
+        self._reader = reader
+        self._index = index
+        self._members = None
+
+    def __members(self):
+        if self._members is None:
+            reader = self._reader
+            tag, count, pos = reader.entry(self._index)
+            if tag != kTagObject:
+                raise ValueError("object expected in value entry %d" % (self._index))
+            self._members = {}
+            for i in range(count):
+                key, pos = reader.varint(pos)
+                self._members[reader.string(key)] = pos
+                pos = reader.skip(pos)
+        return self._members
+
+    def keys(self):
+        return self.__members().keys()
+
+    def __contains__(self, key):
+        return key in self.__members()
+
+    def __getitem__(self, key):
+        return self._reader.item(self.__members()[key])[0]
+
+    def get(self, key, default=None):
+        pos = self.__members().get(key)
+        return default if pos is None else self._reader.item(pos)[0]
+
+    # the decoded elements of the array member key one by one, nothing when there is no such member
+    def iterArray(self, key):
+        pos = self.__members().get(key)
+        if pos is None:
+            return
+        reader = self._reader
+        if reader.tag(pos) != kTagRef:
+            raise ValueError("%s is not an array" % (key))
+        tag, count, pos = reader.entry(reader.varint(pos + 1)[0])
+        if tag != kTagArray:
+            raise ValueError("%s is not an array" % (key))
+        for i in range(count):
+            item, pos = reader.item(pos)
+            yield item
+
+
+# load a binary ir into an ir_model.Module, decoding one declaration at a time
+def loadModule(ir_path):
+    with BinaryIRReader(ir_path) as reader:
+        root = reader.root()
+        module = ir_model.Module(root.get(ir_parser.kVersion), root.get(ir_parser.kModule, []))
+        for category, declarations_key in ir_parser.kCategoryDeclarations.items():
+            for item in root.iterArray(declarations_key):
+                module.addDeclaration(ir_model.kCategoryClasses[category].fromDict(item))
+        for order_item in root.iterArray(ir_parser.kDeclarationsOrder):
+            module.addOrder(order_item[ir_parser.kCategory], order_item[ir_parser.kName])
+    return module
@@ -0,0 +1,240 @@
+import common.jsonIr_parser as ir_parser
+
+# Typed view of the json ir. Every node uses __slots__ and optional fields are
+# normalized once here, so generators read plain attributes instead of probing dicts.
+
+
+class TypeRef:
+    __slots__ = ("name", "element", "sequence_size")
+
+    # name is the space-joined idl type of a leaf, element the nested TypeRef of a sequence of sequences
+    def __init__(self, name, element=None, sequence_size=0):
+        self.name = name
+        self.element = element
+        self.sequence_size = sequence_size
+
+    @staticmethod
+    def fromDict(type_info):
+        # a bare list of type components, for example union select_type
+        if isinstance(type_info, list):
+            return TypeRef(" ".join(type_info))
+
+        if not ir_parser.kTypeName in type_info:
+            raise ValueError("invalid type format: %s" % (type_info))
+
+        sequence_size = type_info.get(ir_parser.kSequenceSize, 0)
+        type_name = type_info[ir_parser.kTypeName]
+        if isinstance(type_name, list):
+            return TypeRef(" ".join(type_name), None, sequence_size)
+        return TypeRef(None, TypeRef.fromDict(type_name), sequence_size)
+
+
+class Param:
+    __slots__ = ("name", "type")
+
+    # name is None when the ir does not provide one
+    def __init__(self, name, type):
+        self.name = name
+        self.type = type
+
+    @staticmethod
+    def fromDict(info):
+        type_info = info.get(ir_parser.kType)
+        return Param(info.get(ir_parser.kName),
+                     None if type_info is None else TypeRef.fromDict(type_info))
+
+
+class Field:
+    __slots__ = ("name", "type", "case_value")
+
+    def __init__(self, name, type, case_value=None):
+        self.name = name
+        self.type = type
+        self.case_value = case_value
+
+    @staticmethod
+    def fromDict(info):
+        return Field(info[ir_parser.kName], TypeRef.fromDict(info[ir_parser.kType]),
+                     info.get(ir_parser.kCaseValue))
+
+
+class EnumMember:
+    __slots__ = ("name", "value")
+
+    def __init__(self, name, value=None):
+        self.name = name
+        self.value = value
+
+
+class Enum:
+    __slots__ = ("name", "members")
+    category = ir_parser.kEnum
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = members
+
+    @staticmethod
+    def fromDict(info):
+        return Enum(info[ir_parser.kName],
+                    [EnumMember(item[ir_parser.kName], item.get(ir_parser.kValue))
+                        for item in info.get(ir_parser.kMembers, [])])
+
+
+class Const:
+    __slots__ = ("name", "type", "value")
+    category = ir_parser.kConst
+
+    def __init__(self, name, type, value):
+        self.name = name
+        self.type = type
+        self.value = value
+
+    @staticmethod
+    def fromDict(info):
+        return Const(info[ir_parser.kName], TypeRef.fromDict(info[ir_parser.kType]),
+                     info.get(ir_parser.kValue))
+
+
+class Struct:
+    __slots__ = ("name", "members")
+    category = ir_parser.kStruct
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = members
+
+    @staticmethod
+    def fromDict(info):
+        return Struct(info[ir_parser.kName],
+                      [Field.fromDict(item) for item in info.get(ir_parser.kMembers, [])])
+
+
+class Union:
+    __slots__ = ("name", "select_type", "members")
+    category = ir_parser.kUnion
+
+    def __init__(self, name, select_type, members):
+        self.name = name
+        self.select_type = select_type
+        self.members = members
+
+    @staticmethod
+    def fromDict(info):
+        select_type = info.get(ir_parser.kSelectType)
+        return Union(info[ir_parser.kName],
+                     None if select_type is None else TypeRef.fromDict(select_type),
+                     [Field.fromDict(item) for item in info.get(ir_parser.kMembers, [])])
+
+
+class Method:
+    __slots__ = ("name", "returns", "params")
+
+    def __init__(self, name, returns, params):
+        self.name = name
+        self.returns = returns
+        self.params = params
+
+    @staticmethod
+    def fromDict(info):
+        return Method(info[ir_parser.kMethodName],
+                      [Param.fromDict(item) for item in info.get(ir_parser.kMethodReturn, [])],
+                      [Param.fromDict(item) for item in info.get(ir_parser.kMethodParameter, [])])
+
+
+class Event:
+    __slots__ = ("name", "members")
+
+    def __init__(self, name, members):
+        self.name = name
+        self.members = members
+
+    @staticmethod
+    def fromDict(info):
+        return Event(info[ir_parser.kEventName],
+                     [Param.fromDict(item) for item in info.get(ir_parser.kMembers, [])])
+
+
+class Interface:
+    __slots__ = ("name", "attribute", "methods", "events")
+    category = ir_parser.kInterface
+
+    def __init__(self, name, attribute, methods, events):
+        self.name = name
+        self.attribute = attribute
+        self.methods = methods
+        self.events = events
+
+    @staticmethod
+    def fromDict(info):
+        return Interface(info[ir_parser.kName], info.get(ir_parser.kAttribute),
+                         [Method.fromDict(item) for item in info.get(ir_parser.kMethodList, [])],
+                         [Event.fromDict(item) for item in info.get(ir_parser.kEventList, [])])
+
+
+kCategoryClasses = {
+    ir_parser.kEnum: Enum,
+    ir_parser.kConst: Const,
+    ir_parser.kStruct: Struct,
+    ir_parser.kUnion: Union,
+    ir_parser.kInterface: Interface,
+}
+
+
+class Module:
+    __slots__ = ("version", "module_name", "enums", "consts", "structs", "unions",
+                 "interfaces", "declarations_order", "_index")
+
+    def __init__(self, version, module_name):
+        self.version = version
+        self.module_name = module_name
+        self.enums = []
+        self.consts = []
+        self.structs = []
+        self.unions = []
+        self.interfaces = []
+        # declarations in source order, resolved to their nodes
+        self.declarations_order = []
+        self._index = {}
+        for category in kCategoryClasses:
+            self._index[category] = {}
+
+    def declarations(self, category):
+        if category == ir_parser.kEnum:
+            return self.enums
+        if category == ir_parser.kConst:
+            return self.consts
+        if category == ir_parser.kStruct:
+            return self.structs
+        if category == ir_parser.kUnion:
+            return self.unions
+        if category == ir_parser.kInterface:
+            return self.interfaces
+        return []
+
+    def addDeclaration(self, declaration):
+        self.declarations(declaration.category).append(declaration)
+        table = self._index[declaration.category]
+        if not declaration.name in table:
+            table[declaration.name] = declaration
+
+    def addOrder(self, category, name):
+        declaration = self.findDeclaration(category, name)
+        if declaration is not None:
+            self.declarations_order.append(declaration)
+
+    def findDeclaration(self, category, name):
+        if not category in self._index:
+            return None
+        return self._index[category].get(name)
+
+    @staticmethod
+    def fromDict(ir_dict):
+        module = Module(ir_dict.get(ir_parser.kVersion), ir_dict.get(ir_parser.kModule, []))
+        for category, declarations_key in ir_parser.kCategoryDeclarations.items():
+            for item in ir_dict.get(declarations_key, []):
+                module.addDeclaration(kCategoryClasses[category].fromDict(item))
+
+        for order_item in ir_dict.get(ir_parser.kDeclarationsOrder, []):
+            module.addOrder(order_item[ir_parser.kCategory], order_item[ir_parser.kName])
+        return module
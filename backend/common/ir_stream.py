@@ -0,0 +1,145 @@
+import json
+import common.jsonIr_parser as ir_parser
+import common.ir_model as ir_model
+
+# characters read from the ir file per refill of the decode buffer
+kDefaultChunkSize = 1024 * 1024
+
+# keys whose list is decoded element by element instead of as one value
+kCategoryOfList = {declarations_key: category
+                   for category, declarations_key in ir_parser.kCategoryDeclarations.items()}
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+
+
+# incremental reader of the top level json ir object. only the declaration currently
+# being decoded is held as dicts, everything before it is already a compact ir_model node
+class IRStreamReader:
+    def __init__(self, ir_path, chunk_size=kDefaultChunkSize):
+        self._ir_path = ir_path
+        self._chunk_size = chunk_size
+        self._file = None
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    # yields (key, value, False) for every top level non list value and
+    # (key, element, True) for every element of a top level list
+    def items(self):
+        with open(self._ir_path) as self._file:
+            self.__expect("{")
+            if self.__peek() == "}":
+                return
+
+            while True:
+                key = self.__decodeValue()
+                if not isinstance(key, str):
+                    raise ValueError("object key expected at offset %d" % (self.__offset()))
+                self.__expect(":")
+
+                if self.__peek() == "[":
+                    self._pos += 1
+                    if self.__peek() == "]":
+                        self._pos += 1
+                    else:
+                        while True:
+                            yield key, self.__decodeValue(), True
+                            if self.__next(",]") == "]":
+                                break
+                else:
+                    yield key, self.__decodeValue(), False
+
+                if self.__next(",}") == "}":
+                    return
+
+    def __fill(self):
+        if self._eof:
+            return False
+        # drop the consumed prefix so the buffer only holds the pending declaration
+        if self._pos > 0:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        chunk = self._file.read(self._chunk_size)
+        if chunk == "":
+            self._eof = True
+            return False
+        self._buffer += chunk
+        return True
+
+    def __offset(self):
+        return self._file.tell() - len(self._buffer) + self._pos
+
+    def __skipWhitespace(self):
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _whitespace:
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self.__fill():
+                return
+
+    def __peek(self):
+        self.__skipWhitespace()
+        if self._pos >= len(self._buffer):
+            raise ValueError("unexpected end of ir")
+        return self._buffer[self._pos]
+
+    def __next(self, expected):
+        char = self.__peek()
+        if not char in expected:
+            raise ValueError("expected one of '%s' at offset %d" % (expected, self.__offset()))
+        self._pos += 1
+        return char
+
+    def __expect(self, char):
+        self.__next(char)
+
+    def __decodeValue(self):
+        self.__skipWhitespace()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self._buffer, self._pos)
+                # a number may continue in the next chunk, so a value ending at the
+                # end of the buffer is only accepted at end of file
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # after the last fill the loop decodes once more against the complete buffer
+            self.__fill()
+
+
+# yields (category, node) for every declaration and (ir_parser.kDeclarationsOrder, order_item)
+# for every entry of the declaration order, both in file order. other top level values go to header
+def iterDeclarations(ir_path, header, chunk_size=kDefaultChunkSize):
+    for key, value, is_element in IRStreamReader(ir_path, chunk_size).items():
+        if not is_element:
+            header[key] = value
+        elif key in kCategoryOfList:
+            category = kCategoryOfList[key]
+            yield category, ir_model.kCategoryClasses[category].fromDict(value)
+        elif key == ir_parser.kDeclarationsOrder:
+            yield key, value
+        else:
+            # other lists such as module_name are small and kept whole
+            header.setdefault(key, []).append(value)
+
+
+# load ir_path into an ir_model.Module without building the whole json document first
+def loadModule(ir_path, chunk_size=kDefaultChunkSize):
+    header = {}
+    order = []
+    module = ir_model.Module(None, [])
+    for category, item in iterDeclarations(ir_path, header, chunk_size):
+        if category == ir_parser.kDeclarationsOrder:
+            order.append(item)
+        else:
+            module.addDeclaration(item)
+
+    module.version = header.get(ir_parser.kVersion)
+    module.module_name = header.get(ir_parser.kModule, [])
+    # declarations_order may come before the declarations it names
+    for order_item in order:
+        module.addOrder(order_item[ir_parser.kCategory], order_item[ir_parser.kName])
+    return module
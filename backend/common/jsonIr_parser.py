@@ -1,6 +1,9 @@
 
+import os
 import logging
 import json
+import struct
+import common.profiler as profiler
 
 kVersion = "version"
 kModule = "module_name"
@@ -30,16 +33,46 @@ kMethodName= "method_name"
 kEventName= "event_name"
 kMethodReturn= "method_return"
 kMethodParameter= "method_parameter"
+kSelectType = "select_type"
+kAttribute = "attribute"
+
+# declaration list of every category in declarations_order
+kCategoryDeclarations = {
+    kEnum: kEnumDeclarations,
+    kConst: kConstDeclarations,
+    kStruct: kStructDeclarations,
+    kUnion: kUnionDeclarations,
+    kInterface: kInterfaceDeclarations,
+}
+
+# irs from this size on are decoded one declaration at a time, see common.ir_stream
+kStreamThreshold = 32 * 1024 * 1024
 
 class JsonIRParser:
-    def __init__(self, ir_path):
+    def __init__(self, ir_path, stream_threshold=kStreamThreshold):
         self.__ir_path = ir_path
+        self.__stream_threshold = stream_threshold
 
+    # returns the ir as a common.ir_model.Module. a binary ir (see common.ir_binary) is
+    # recognized by its magic, json is the fallback
     def parse(self):
-        ir_dict = {}
+        import common.ir_model as ir_model
+        import common.ir_stream as ir_stream
+        import common.ir_binary as ir_binary
 
-        with open(self.__ir_path) as f:
-            ir_dict = json.load(f)
+        try:
+            with profiler.span("parse " + os.path.basename(self.__ir_path), track_peak=True):
+                if ir_binary.isBinaryIR(self.__ir_path):
+                    module = ir_binary.loadModule(self.__ir_path)
+                elif os.path.getsize(self.__ir_path) >= self.__stream_threshold:
+                    module = ir_stream.loadModule(self.__ir_path)
+                else:
+                    with open(self.__ir_path) as f:
+                        ir_dict = json.load(f)
+                    module = ir_model.Module.fromDict(ir_dict)
+        except (KeyError, TypeError, ValueError, IndexError, struct.error) as e:
+            logging.error("invalid ir %s: %s" % (self.__ir_path, e))
+            return -1, None
 
-        return 0, ir_dict
+        return 0, module
 
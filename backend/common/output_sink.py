@@ -0,0 +1,150 @@
+import os
+import stat
+import shutil
+import filecmp
+import tempfile
+import logging
+import common.utils as utils
+import common.profiler as profiler
+
+# fragments are kept in memory until this many characters, then spilled to a temp file
+kDefaultSpillSize = 8 * 1024 * 1024
+
+# mode of newly created files, read once here since os.umask() can only be queried by setting it
+_umask = os.umask(0)
+os.umask(_umask)
+kNewFileMode = 0o666 & ~_umask
+
+
+# move a fully written temp file over full_name, unless full_name already has the same content.
+# returns True when full_name was replaced
+def replaceIfChanged(tmp_name, full_name):
+    if os.path.isfile(full_name):
+        if filecmp.cmp(tmp_name, full_name, shallow=False):
+            os.remove(tmp_name)
+            return False
+        os.chmod(tmp_name, stat.S_IMODE(os.stat(full_name).st_mode))
+    else:
+        os.chmod(tmp_name, kNewFileMode)
+
+    os.replace(tmp_name, full_name)
+    return True
+
+
+# write a small file in one go, with the same keep-if-unchanged rule as FileSink.
+# content is text or bytes
+def writeIfChanged(full_name, content):
+    dir_path = os.path.dirname(os.path.abspath(full_name))
+    os.makedirs(dir_path, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(prefix="." + os.path.basename(full_name) + ".", suffix=".tmp", dir=dir_path)
+    with os.fdopen(fd, 'wb' if isinstance(content, bytes) else 'w') as f:
+        f.write(content)
+    return replaceIfChanged(tmp_name, full_name)
+
+
+class FileSink:
+    def __init__(self, path, filename, spill_size=kDefaultSpillSize):
+        self._path = path
+        self._filename = filename
+        self._spill_size = spill_size
+        self._fragments = []
+        self._size = 0
+        self._fragment_count = 0
+        self._spill_file = None
+
+    def write(self, content):
+        if content == "":
+            return
+
+        self._fragment_count += 1
+        self._size += len(content)
+
+        if self._spill_file is not None:
+            self._spill_file.write(content)
+            return
+
+        self._fragments.append(content)
+        if self._size > self._spill_size:
+            self.__spill()
+
+    def size(self):
+        return self._size
+
+    def fragmentCount(self):
+        return self._fragment_count
+
+    def close(self):
+        if os.path.exists(self._path) == False:
+            os.makedirs(self._path, exist_ok=True)
+
+        with profiler.span("write " + self._filename, "write", chars=self._size,
+                            fragments=self._fragment_count) as args:
+            changed = self.__render()
+            args["changed"] = changed
+        if profiler.enabled():
+            profiler.current().addFile(self._filename, self._size, self._fragment_count, changed)
+
+        logging.debug("%s %s, %d chars in %d fragments" % ("write" if changed else "keep",
+                        self._filename, self._size, self._fragment_count))
+        return changed
+
+    def __render(self):
+        full_name = utils.Utils.getGenFileName(self._path, self._filename)
+
+        # render next to the target so the final rename stays on one file system
+        fd, tmp_name = tempfile.mkstemp(prefix="." + self._filename + ".", suffix=".tmp", dir=self._path)
+        try:
+            with os.fdopen(fd, 'w') as f:
+                if self._spill_file is None:
+                    f.write("".join(self._fragments))
+                else:
+                    self._spill_file.seek(0)
+                    shutil.copyfileobj(self._spill_file, f, 1024 * 1024)
+            return replaceIfChanged(tmp_name, full_name)
+        except BaseException:
+            if os.path.exists(tmp_name):
+                os.remove(tmp_name)
+            raise
+        finally:
+            if self._spill_file is not None:
+                self._spill_file.close()
+                self._spill_file = None
+            self._fragments = []
+
+    def __spill(self):
+        self._spill_file = tempfile.TemporaryFile(mode='w+', newline='')
+        self._spill_file.write("".join(self._fragments))
+        self._fragments = []
+
+
+# keeps a generated file in memory instead of writing it, for callers using the generators as a
+# library. close() puts the content into files[filename], on_chunk(filename, content) sees every
+# fragment as it is written
+class MemorySink:
+    def __init__(self, filename, files, on_chunk=None):
+        self._filename = filename
+        self._files = files
+        self._on_chunk = on_chunk
+        self._fragments = []
+        self._size = 0
+
+    def write(self, content):
+        if content == "":
+            return
+
+        self._size += len(content)
+        self._fragments.append(content)
+        if self._on_chunk is not None:
+            self._on_chunk(self._filename, content)
+
+    def size(self):
+        return self._size
+
+    def fragmentCount(self):
+        return len(self._fragments)
+
+    def close(self):
+        self._files[self._filename] = "".join(self._fragments)
+        self._fragments = []
+        logging.debug("render %s, %d chars" % (self._filename, self._size))
+        return True
@@ -0,0 +1,133 @@
+import os
+import sys
+import json
+import time
+import threading
+import contextlib
+import tracemalloc
+
+# phase timing of a codegen run, reported as a summary and as a chrome trace-event file
+# (load it in chrome://tracing or https://ui.perfetto.dev). disabled unless enable() is called,
+# spans are then no-ops
+
+_profiler = None
+
+
+class Profiler:
+    def __init__(self):
+        self._events = []
+        self._files = []
+        # highest peak seen by span(track_peak=True), which resets the tracemalloc peak
+        self._peak = 0
+        self._origin = time.perf_counter()
+        # wall clock of the origin, so events of worker processes line up with ours
+        self._origin_wall = time.time()
+        self._lock = threading.Lock()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def now(self):
+        return (time.perf_counter() - self._origin) * 1e6 + self._origin_wall * 1e6
+
+    def addEvent(self, name, category, start, duration, args):
+        event = {"name": name, "cat": category, "ph": "X", "ts": start, "dur": duration,
+                 "pid": os.getpid(), "tid": threading.get_ident(), "args": args}
+        with self._lock:
+            self._events.append(event)
+
+    def notePeak(self, peak):
+        self._peak = max(self._peak, peak)
+
+    def peak(self):
+        return max(self._peak, tracemalloc.get_traced_memory()[1])
+
+    # chars is the length of the file's text, not its encoded size
+    def addFile(self, name, chars, fragments, changed):
+        with self._lock:
+            self._files.append({"name": name, "chars": chars, "fragments": fragments, "changed": changed})
+
+    # events and files recorded so far, taken out of this profiler, for moving them across processes
+    def takeRecords(self):
+        with self._lock:
+            records = (self._events, self._files)
+            self._events = []
+            self._files = []
+        return records
+
+    def addRecords(self, records):
+        events, files = records
+        with self._lock:
+            self._events.extend(events)
+            self._files.extend(files)
+        for event in events:
+            self.notePeak(event["args"].get("peak_bytes", 0))
+
+    def writeTrace(self, trace_path):
+        with self._lock:
+            events = list(self._events)
+        with open(trace_path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def printSummary(self, out=sys.stderr):
+        with self._lock:
+            events = sorted(self._events, key=lambda item: item["ts"])
+            files = list(self._files)
+
+        out.write("profile:\n")
+        for event in events:
+            if event["cat"] == "write":
+                continue
+            peak = event["args"].get("peak_bytes")
+            out.write("    %-36s %9.2f ms %14s\n" % (event["name"], event["dur"] / 1000.0,
+                                                    "" if peak is None else "peak %d KB" % (peak // 1024)))
+
+        write_time = sum(event["dur"] for event in events if event["cat"] == "write")
+        total_chars = sum(item["chars"] for item in files)
+        out.write("    %-36s %9.2f ms\n" % ("write %d files" % (len(files)), write_time / 1000.0))
+        for item in files:
+            out.write("        %-32s %10d chars %6d fragments  %s\n" % (item["name"], item["chars"],
+                        item["fragments"], "written" if item["changed"] else "unchanged"))
+        out.write("    total output %d chars, tracemalloc peak %d KB\n" % (total_chars, self.peak() // 1024))
+
+
+def enable():
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler()
+    return _profiler
+
+
+# drop the profiler, for example the copy a forked worker inherited from its parent
+def disable():
+    global _profiler
+    _profiler = None
+
+
+def enabled():
+    return _profiler is not None
+
+
+def current():
+    return _profiler
+
+
+# time the enclosed block as one trace event. with track_peak the tracemalloc peak
+# of the block is recorded too, which resets the process wide peak
+@contextlib.contextmanager
+def span(name, category="phase", track_peak=False, **args):
+    if _profiler is None:
+        yield args
+        return
+
+    if track_peak and hasattr(tracemalloc, "reset_peak"):
+        tracemalloc.reset_peak()
+    else:
+        track_peak = False
+    start = _profiler.now()
+    try:
+        yield args
+    finally:
+        if track_peak:
+            args["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            _profiler.notePeak(args["peak_bytes"])
+        _profiler.addEvent(name, category, start, _profiler.now() - start, args)
@@ -0,0 +1,57 @@
+import string
+
+# string.Template bodies compiled once per process. a template is turned into a single
+# %-format string, so rendering it is one C level format call instead of a regex scan
+
+
+class CompiledTemplate:
+    __slots__ = ("template", "_format", "_error")
+
+    def __init__(self, template):
+        self.template = template
+        self._error = None
+
+        parts = []
+        last = 0
+        for match in string.Template.pattern.finditer(template):
+            parts.append(template[last:match.start()].replace("%", "%%"))
+            last = match.end()
+            if match.group("escaped") is not None:
+                parts.append("$")
+                continue
+            name = match.group("named") or match.group("braced")
+            if name is None:
+                # string.Template reports invalid placeholders on substitute, so do we
+                self._error = "Invalid placeholder in string: line %d, col %d" % self.__position(match.start("invalid"))
+                break
+            parts.append("%(" + name + ")s")
+        parts.append(template[last:].replace("%", "%%"))
+        self._format = "".join(parts)
+
+    # same result and errors as string.Template(template).substitute(mapping, **kws)
+    def substitute(self, mapping=None, **kws):
+        if self._error is not None:
+            raise ValueError(self._error)
+        if mapping is None:
+            mapping = kws
+        elif kws:
+            mapping = dict(mapping, **kws)
+        return self._format % mapping
+
+    def __position(self, index):
+        lines = self.template[:index].splitlines(keepends=True)
+        if not lines:
+            return 1, 1
+        return len(lines), len(lines[-1])
+
+
+_registry = {}
+
+
+# compiled template of text, the same literal is only compiled on its first use
+def get(template):
+    compiled = _registry.get(template)
+    if compiled is None:
+        compiled = CompiledTemplate(template)
+        _registry[template] = compiled
+    return compiled
@@ -2,6 +2,7 @@ import os
 import sys
 import logging
 import platform
+import common.backend_registry as backend_registry
 
 class ColorsPrint:
     HEADER='\033[95m'
@@ -29,23 +30,76 @@ class ColorsPrint:
     def PrintH(str):
         print(ColorsPrint.OKBLUE + str + ColorsPrint.bcolors.ENDC)
 
+class CommandOptions:
+    def __init__(self):
+        self.dst_path = "."
+        self.ir_path = "."
+        self.log_level = "e"
+        self.base_name = ""
+        self.gen_types = []
+        self.jobs = 1
+        self.cache_dir = None
+        self.cache_size = 256 * 1024 * 1024
+        self.cache_command = None
+        self.batch_path = None
+        self.daemon_path = None
+        self.poll_interval = 1.0
+        self.profile_path = None
+        self.list_backends = False
+        self.depfile_path = None
+        self.manifest_path = None
+        # None does not shard, 0 shards per interface, N packs interfaces up to N methods per shard
+        self.shard = None
+        self.unity = False
+        # strings and byte buffers handlers and callbacks receive are views, see cpp_type_resolver
+        self.views = False
+
 class Utils:
     @staticmethod
     def helpinfo():
         print("""
 codegen.py usage:
     python codegen.py [--help] [-p <dest_path>] [-t <type>] [-b <basename>]
-                      [-i <json_ir_path>] [-l <log_level>]
+                      [-i <json_ir_path>] [-l <log_level>] [-j <jobs>]
+                      [-c <cache_dir>] [--cache-size <MB>] [--cache-info] [--cache-prune]
+                      [--batch <manifest>] [--daemon <socket_path>] [--poll-interval <seconds>]
+                      [--profile <trace_path>] [--list-backends]
+                      [-d <depfile>] [--manifest <output_manifest>] [--shard <interface|N>] [--unity]
+                      [--views]
     param description:
         --help    help information
         -p        path to generated file
-        -t        generated file type, cpp, java, ndk_cpp...
+        -t        generated file type, ndk_cpp or a plugin backend, may be repeated
         -b        base name, it will effect the generated file name
-        -i        file name to json ir file
+        -i        file name to json ir file, or to a binary ir (idlc --binary)
         -l        log level of the tools
+        -j        number of worker processes generating files in parallel, default 1
+        -c        directory of the generation cache, unchanged inputs restore the cached files
+        --cache-size    size limit of the generation cache in MB, default 256
+        --cache-info    list the entries of the generation cache given by -c
+        --cache-prune   evict least recently used cache entries down to --cache-size
+        --batch   json manifest of jobs [{"ir_path", "base_name", "dst_path", "gen_types"}, ...]
+                  run in one process, -j sets the number of jobs run in parallel
+        --daemon  stay loaded and serve generation requests on a unix socket, watched irs
+                  are regenerated when they change, see common/daemon.py for the protocol
+        --poll-interval seconds between two checks of the watched irs, default 1
+        --profile print the time, memory peak and output size of every phase and write them
+                  as a chrome trace-event json to trace_path
+        --list-backends list the generated file types of -t, built in and plugins found through
+                  $IDL_CODEGEN_PLUGIN_PATH (<type>_backend.py files) or idl_codegen.backends entry points
+        -d        write a make/ninja depfile, <depfile>.stamp (its extension replaced) depends on
+                  the ir and the python sources of the generator, the generated files are byproducts
+        --manifest write the ir, generator sources and generated files of the run as json
+        --shard   split XService.cpp and XProxy.cpp into XService_<Interface>.cpp, ... files of one
+                  interface each, or of interfaces packed up to N methods and events, which include
+                  the small XServiceImpl.h / XProxyImpl.h. use -d or --manifest for the file list
+        --unity   write XCommon.cpp, XService.cpp and XProxy.cpp as the single XUnity.cpp, a batch job
+                  may put several of those into one bundle with "unity_bundle": "<file.cpp>"
+        --views   service handlers and event callbacks receive strings as std::string_view and
+                  byte buffers as ByteView, borrowed for the duration of the call. needs c++17
 
     example:
-        python codegen.py -p ./gen -t cpp -i ./test/classinfo.json -b ClassInfo    
+        python codegen.py -p ./gen -t ndk_cpp -i ./test/classinfo.json -b ClassInfo    
 
 """)
 
@@ -79,77 +133,140 @@ codegen.py usage:
  
     @staticmethod
     def parserCommand(args):
-        dst_path = "."
-        ir_path = "."
-        log_level = "e"
-        base_name = ""
-        gen_types = []
+        options = CommandOptions()
         size = len(args)
         for i in range(size):
             if args[i] == "-h" or args[i] == "--h" or args[i] == "--help":
                 Utils.helpinfo()
-                return 1, ir_path, dst_path, base_name, gen_types
+                return 1, options
             if args[i] == "-p":
                 if (i+1) >= size:
                     ColorsPrint.PrintE("error:lack of path")
                     Utils.helpinfo()
-                    return -1, ir_path, dst_path, base_name, gen_types
+                    return -1, options
 
-                dst_path = args[i+1]
+                options.dst_path = args[i+1]
             if args[i] == "-t":
                 if (i+1) >= size:
                     Utils.helpinfo()
-                    return -1, ir_path, dst_path, base_name, gen_types
-                if (args[i+1] == "cpp") or (args[i+1] == "java") or (args[i+1] == "ndk_cpp"):
-                    gen_types.append(args[i+1])
+                    return -1, options
+                registry = backend_registry.defaultRegistry()
+                if not registry.has(args[i+1]):
+                    ColorsPrint.PrintE("error:unknown type %s, available: %s" % (args[i+1], ", ".join(registry.types())))
+                    return -1, options
+                options.gen_types.append(args[i+1])
             if args[i] == "-b":
                 if (i+1) >= size:
                     Utils.helpinfo()
-                    return -1, ir_path, dst_path, base_name, gen_types
-                base_name = args[i+1]
+                    return -1, options
+                options.base_name = args[i+1]
 
             if args[i] == "-i":
                 if (i+1) >= size:
                     Utils.helpinfo()
-                    return -1, ir_path, dst_path, base_name, gen_types
-                ir_path = args[i+1]
+                    return -1, options
+                options.ir_path = args[i+1]
             if args[i] == "-l":
                 if (i+1) >= size:
                     Utils.helpinfo()
-                    return -1, ir_path, dst_path, base_name, gen_types
-                log_level = args[i+1]
-
-        Utils.setLogLevel(log_level)
-        if len(gen_types) == 0 or len(base_name) == 0:
-            return -1, ir_path, dst_path, base_name, gen_types
-        return 0, ir_path, dst_path, base_name, gen_types
-
-    @staticmethod
-    def createGenFile(path, filename):
-        if os.path.exists(path) == False:
-            os.makedirs(path)
-
-        full_name = path
-        if platform.system().lower() == 'windows':
-            full_name += "\\" + filename
-        else:
-            full_name += "/" + filename
+                    return -1, options
+                options.log_level = args[i+1]
+            if args[i] == "-j":
+                if (i+1) >= size or not args[i+1].isdigit() or int(args[i+1]) < 1:
+                    ColorsPrint.PrintE("error:invalid jobs number")
+                    Utils.helpinfo()
+                    return -1, options
+                options.jobs = int(args[i+1])
+            if args[i] == "-c":
+                if (i+1) >= size:
+                    Utils.helpinfo()
+                    return -1, options
+                options.cache_dir = args[i+1]
+            if args[i] == "--cache-size":
+                if (i+1) >= size or not args[i+1].isdigit():
+                    ColorsPrint.PrintE("error:invalid cache size")
+                    Utils.helpinfo()
+                    return -1, options
+                options.cache_size = int(args[i+1]) * 1024 * 1024
+            if args[i] == "--cache-info" or args[i] == "--cache-prune":
+                options.cache_command = args[i][len("--cache-"):]
+            if args[i] == "--batch":
+                if (i+1) >= size:
+                    ColorsPrint.PrintE("error:lack of batch manifest")
+                    Utils.helpinfo()
+                    return -1, options
+                options.batch_path = args[i+1]
+            if args[i] == "--daemon":
+                if (i+1) >= size:
+                    ColorsPrint.PrintE("error:lack of daemon socket path")
+                    Utils.helpinfo()
+                    return -1, options
+                options.daemon_path = args[i+1]
+            if args[i] == "--profile":
+                if (i+1) >= size:
+                    ColorsPrint.PrintE("error:lack of profile trace path")
+                    Utils.helpinfo()
+                    return -1, options
+                options.profile_path = args[i+1]
+            if args[i] == "-d":
+                if (i+1) >= size:
+                    ColorsPrint.PrintE("error:lack of depfile path")
+                    Utils.helpinfo()
+                    return -1, options
+                options.depfile_path = args[i+1]
+            if args[i] == "--manifest":
+                if (i+1) >= size:
+                    ColorsPrint.PrintE("error:lack of output manifest path")
+                    Utils.helpinfo()
+                    return -1, options
+                options.manifest_path = args[i+1]
+            if args[i] == "--shard":
+                if (i+1) < size and args[i+1] == "interface":
+                    options.shard = 0
+                elif (i+1) < size and args[i+1].isdigit() and int(args[i+1]) > 0:
+                    options.shard = int(args[i+1])
+                else:
+                    ColorsPrint.PrintE("error:invalid shard, use interface or a number of methods")
+                    Utils.helpinfo()
+                    return -1, options
+            if args[i] == "--unity":
+                options.unity = True
+            if args[i] == "--views":
+                options.views = True
+            if args[i] == "--list-backends":
+                options.list_backends = True
+            if args[i] == "--poll-interval":
+                try:
+                    options.poll_interval = float(args[i+1])
+                except (IndexError, ValueError):
+                    options.poll_interval = 0
+                if options.poll_interval <= 0:
+                    ColorsPrint.PrintE("error:invalid poll interval")
+                    Utils.helpinfo()
+                    return -1, options
 
-        if os.path.exists(full_name):
-            os.remove(full_name)
-        os.mknod(full_name)
+        Utils.setLogLevel(options.log_level)
+        if options.unity and options.shard is not None:
+            ColorsPrint.PrintE("error:--unity and --shard exclude each other")
+            return -1, options
+        if options.list_backends:
+            return 0, options
+        if options.cache_command is not None:
+            if options.cache_dir is None:
+                ColorsPrint.PrintE("error:lack of cache dir")
+                return -1, options
+            return 0, options
+        if options.batch_path is not None or options.daemon_path is not None:
+            return 0, options
+        if len(options.gen_types) == 0 or len(options.base_name) == 0:
+            return -1, options
+        return 0, options
 
     @staticmethod
-    def writeGenFile(path, filename, content_lines):
-        if os.path.exists(path) == False:
-            os.makedirs(path)
-
+    def getGenFileName(path, filename):
         full_name = path
         if platform.system().lower() == 'windows':
             full_name += "\\" + filename
         else:
             full_name += "/" + filename
-               
-        with open(full_name, 'a+') as f:
-            for item in content_lines:
-                f.writelines(item)
+        return full_name
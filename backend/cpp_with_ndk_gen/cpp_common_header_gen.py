@@ -4,21 +4,23 @@ import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.code_model as code_model
 from . import cpp_gen_protocol
 
 
 class CppCommonHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppCommonHeaderGenerator, self).__init__(path, base_name, base_name + "Common.h", ir_dict)
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppCommonHeaderGenerator, self).__init__(path, base_name, base_name + "Common.h", module, type_resolver)
 
     def gen(self):
-        print("start to gen common header")
+        logging.info("start to gen common header")
         self._genHeadFileStart("COMMON")
         self.__genIncAndTypeDefs()
         self._genNameSpaceStart() 
         self.__genDeclarations()
         self._genNameSpaceEnd()
         self._genHeadFileEnd("COMMON")
+        self._flushGenFile()
 
     def __genIncAndTypeDefs(self):
         content_lines = """
@@ -26,6 +28,8 @@ class CppCommonHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
 #include <string>
 #include <array>
 #include <vector>
+#include <cstring>
+#include <type_traits>
 #include <unordered_map>
 #include "cpolaris.h"
 
@@ -34,24 +38,23 @@ typedef struct PolarisRuntime PolarisRuntime;
 typedef struct PolarisService PolarisService;
 typedef struct PolarisSession PolarisSession;
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        if self._type_resolver.views:
+            content_lines = content_lines.replace("#include <string>\n", "#include <string>\n#include <string_view>\n")
+        self._writeGenFile(content_lines)
 
     def __genDeclarations(self):
         self.__genBytesBuffer()
-        self.__genNameIdMapper()
+        self.__genNameIdTable()
         self.__genMessageReader()
         self.__genMessageWriter()
 
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
-            return
-
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kEnum:
-                self.__genEnumDeclaration(order_item[ir_parser.kName])
-            elif order_item[ir_parser.kCategory] == ir_parser.kStruct:
-                self.__genStructDeclaration(order_item[ir_parser.kName])
-            elif order_item[ir_parser.kCategory] == ir_parser.kUnion:
-                self.__genUnionDeclaration(order_item[ir_parser.kName])
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kEnum:
+                self.__genEnumDeclaration(item)
+            elif item.category == ir_parser.kStruct:
+                self.__genStructDeclaration(item)
+            elif item.category == ir_parser.kUnion:
+                self.__genUnionDeclaration(item)
 
         self.__genDataWrapperStructs()
 
@@ -61,96 +64,141 @@ struct BytesBuffer {
     std::vector<uint8_t> data;
 };
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
-
-    def __genEnumDeclaration(self, name):
-        for item in self._ir_dict[ir_parser.kEnumDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
-            
-            member_str = ""
-            for member_item in item[ir_parser.kMembers]:
-                member_name = member_item[ir_parser.kName]
-
-                if ir_parser.kValue in member_item.keys():
-                    member_str += """\n    %s = %s,""" % (member_name, member_item[ir_parser.kValue])
-                else:
-                    member_str += """\n    %s,""" % (member_name)
-
-            content_lines = """
-enum class %s {%s
+        self._writeGenFile(content_lines)
+        if self._type_resolver.views:
+            self.__genViews()
+
+    # view mode: a handler or callback receives a view of the buffer the runtime read a string
+    # or byte buffer into, which the generated code holds until the handler or callback returns.
+    # a receiver keeping the value past that copies it: std::string(view), view.ToBuffer()
+    def __genViews(self):
+        content_lines = """
+struct ByteView {
+    const uint8_t* data = nullptr;
+    size_t size = 0;
+
+    BytesBuffer ToBuffer() const
+    {
+        BytesBuffer buffer;
+        buffer.data.assign(data, data + size);
+        return buffer;
+    }
+};
+
+class BorrowedString final
+{
+public:
+    BorrowedString() = default;
+    BorrowedString(const BorrowedString&) = delete;
+    BorrowedString& operator=(const BorrowedString&) = delete;
+    ~BorrowedString() { delete [] data_; }
+
+    std::string_view View() const
+    {
+        return data_ == nullptr ? std::string_view() : std::string_view(data_, size_);
+    }
+
+private:
+    friend class MessageReader;
+    const char* data_ = nullptr;
+    uint32_t size_ = 0;
+};
+
+class BorrowedBytes final
+{
+public:
+    BorrowedBytes() = default;
+    BorrowedBytes(const BorrowedBytes&) = delete;
+    BorrowedBytes& operator=(const BorrowedBytes&) = delete;
+    ~BorrowedBytes() { delete [] data_; }
+
+    ByteView View() const
+    {
+        return ByteView{reinterpret_cast<const uint8_t*>(data_), size_};
+    }
+
+private:
+    friend class MessageReader;
+    int8_t* data_ = nullptr;
+    uint32_t size_ = 0;
+};
+"""
+        self._writeGenFile(content_lines)
+
+    def __genEnumDeclaration(self, item):
+        name = item.name
+        enum_scope = code_model.Scope("""
+enum class %s {""" % (name), """
 };
-""" %(name, member_str)
-            utils.Utils.writeGenFile(self._path, self._file, content_lines)
+""")
+        for member_item in item.members:
+            member_name = member_item.name
 
-    def __genStructDeclaration(self, name):
-        for item in self._ir_dict[ir_parser.kStructDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
+            if member_item.value is not None:
+                enum_scope.addf("""\n    %s = %s,""", member_name, member_item.value)
+            else:
+                enum_scope.addf("""\n    %s,""", member_name)
 
-            member_str = ""
-            for member_item in item[ir_parser.kMembers]:
-                member_name = member_item[ir_parser.kName]
-                member_type = self._typeConvert(member_item[ir_parser.kType])
-                member_str += "    %s %s;\n" % (member_type, member_name)
+        self._writeGenFile(enum_scope.render())
 
-            content_lines = """
+    def __genStructDeclaration(self, item):
+        name = item.name
+        struct_scope = code_model.Scope("""
 struct %s final {
-%s
+""" % (name), """
     bool Deserialize(PolarisReadableMessage* message);
     void Serialize(PolarisWritableMessage* message) const;
 };
-""" %(name, member_str)
-            utils.Utils.writeGenFile(self._path, self._file, content_lines)
-
-    def __genUnionDeclaration(self, name):
-        for item in self._ir_dict[ir_parser.kUnionDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
-
-            member_str = ""
-            member_name_list = []
-            case_value_list = []
-            member_type_list = []
-            for member_item in item[ir_parser.kMembers]:
-                member_name_list.append(member_item[ir_parser.kName])
-                case_value_list.append(member_item[ir_parser.kCaseValue])
-                member_type_list.append(self._typeConvert(member_item[ir_parser.kType]))
+""")
+        for member_item in item.members:
+            member_name = member_item.name
+            member_type = self._typeConvert(member_item.type)
+            struct_scope.addf("    %s %s;\n", member_type, member_name)
+
+        self._writeGenFile(struct_scope.render())
+
+    def __genUnionDeclaration(self, item):
+        name = item.name
+        member_name_list = []
+        case_value_list = []
+        member_type_list = []
+        for member_item in item.members:
+            member_name_list.append(member_item.name)
+            case_value_list.append(member_item.case_value)
+            member_type_list.append(self._typeConvert(member_item.type))
 
         # create tag content
-        tag_item = ""
-        for i in range(len(member_name_list)):
-            tag_item += """\n        TYPE_%d = %d,""" % (i+1, i+1)
-        tag_item += """\n        TYPE_RESERVED = %d""" % (len(member_name_list)+1)
-
-        tag_str = """
-    enum Tag : uint32_t {%s
+        tag_str = code_model.Scope("""
+    enum Tag : uint32_t {""", """
     };
-""" % (tag_item)
+""")
+        for i in range(len(member_name_list)):
+            tag_str.addf("""\n        TYPE_%d = %d,""", i+1, i+1)
+        tag_str.addf("""\n        TYPE_RESERVED = %d""", len(member_name_list)+1)
 
         # create constructor content
-        constructor_str = "   Obj() = default;\n"
+        constructor_str = code_model.Fragment("   Obj() = default;\n")
         for i in range(len(member_name_list)):
-            constructor_str += """
+            constructor_str.addf("""
     explicit %s(const %s& value)
             : tag_(TYPE_%d), %s(value) {}
-""" % (name, member_type_list[i], i+1, member_name_list[i])
+""", name, member_type_list[i], i+1, member_name_list[i])
 
         # create SetValue content
-        setvalue_str = ""
+        setvalue_str = code_model.Fragment()
         for i in range(len(member_name_list)):
-            setvalue_str += """
+            setvalue_str.addf("""
     void SetValue(const %s& value)
     {
         tag_ = TYPE_%d;
         %s = value;
     }
-""" % (member_type_list[i], i+1, member_name_list[i])
+""", member_type_list[i], i+1, member_name_list[i])
 
         # create GetValue content
-        getvalue_str = ""
+        getvalue_str = code_model.Fragment()
         for i in range(len(member_name_list)):
-            getvalue_str += """
+            getvalue_str.addf("""
     bool GetValue(%s* value) const
     {
         if (value == nullptr) {
@@ -164,13 +212,13 @@ struct %s final {
         *value = %s;
         return true;
     }
-""" % (member_type_list[i], i+1, member_name_list[i])
+""", member_type_list[i], i+1, member_name_list[i])
 
         # create variable content
-        variable_str = ""
+        variable_str = code_model.Fragment()
         for i in range(len(member_name_list)):
-            variable_str += """
-    %s %s;""" % (member_type_list[i], member_name_list[i])
+            variable_str.addf("""
+    %s %s;""", member_type_list[i], member_name_list[i])
 
         full_str = """
 class %s final
@@ -190,67 +238,93 @@ public:
 private:
     Tag tag_ = Tag::TYPE_RESERVED;%s
 };
-        """ % (name, tag_str, constructor_str, setvalue_str, getvalue_str, variable_str)
-        utils.Utils.writeGenFile(self._path, self._file, full_str)
+        """ % (name, tag_str.render(), constructor_str.render(), setvalue_str.render(),
+                getvalue_str.render(), variable_str.render())
+        self._writeGenFile(full_str)
 
 
-    def __genNameIdMapper(self):
+    # the tables themselves are constant data in XCommon.cpp, see cpp_name_table
+    def __genNameIdTable(self):
         content_lines = """
-class NameIdMapper
+// method and event names of an interface and their ids, computed when generating. FindId
+// is a perfect hash: one pass over the name, then a single compare
+struct NameIdTable
 {
-public:
-    bool FindId(const std::string& name, uint16_t* id) const
+    const char* const* names;
+    const uint32_t* sizes;
+    const uint32_t* displacements;
+    const uint16_t* slots;
+    uint16_t count;
+    uint32_t bucket_count;
+    uint32_t slot_count;
+
+    bool FindId(const char* name, uint16_t* id) const
     {
-        if (id == nullptr) {
+        if (name == nullptr || id == nullptr || count == 0) {
             return false;
         }
 
-        auto iter = name_id_map_.find(name);
+        uint32_t hash = 2166136261u;
+        uint32_t size = 0;
+        for (; name[size] != '\\0'; size++) {
+            hash = (hash ^ static_cast<unsigned char>(name[size])) * 16777619u;
+        }
+
+        uint16_t found = slots[MixHash(hash ^ displacements[hash % bucket_count]) % slot_count];
 
-        if (iter == name_id_map_.end()) {
+        if (sizes[found] != size || memcmp(names[found], name, size) != 0) {
             return false;
         }
 
-        *id = iter->second;
+        *id = found;
         return true;
     }
 
-    bool FindName(const uint16_t id, const char** name, uint32_t* size) const
+    bool FindId(const std::string& name, uint16_t* id) const
     {
-        if (name == nullptr || size == nullptr) {
-            return false;
-        }
-
-        auto iter = id_name_map_.find(id);
+        return FindId(name.c_str(), id);
+    }
 
-        if (iter == id_name_map_.end()) {
+    bool FindName(const uint16_t id, const char** name, uint32_t* size) const
+    {
+        if (name == nullptr || size == nullptr || id >= count) {
             return false;
         }
 
-        *name = iter->second.c_str();
-        *size = iter->second.size();
+        *name = names[id];
+        *size = sizes[id];
         return true;
     }
 
-    void InsertNameId(const std::string& name, uint16_t id)
-    {
-        name_id_map_.emplace(name, id);
-    }
-
-    void InsertIdName(uint16_t id, const std::string& name)
+    static uint32_t MixHash(uint32_t value)
     {
-        id_name_map_.emplace(id, name);
+        value ^= value >> 16;
+        value *= 0x85ebca6bu;
+        value ^= value >> 13;
+        value *= 0xc2b2ae35u;
+        value ^= value >> 16;
+        return value;
     }
-
-private:
-    std::unordered_map<std::string, uint16_t> name_id_map_;
-    std::unordered_map<uint16_t, std::string> id_name_map_;
 };
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
+
+        declarations = code_model.Fragment()
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                declarations.addf("extern const NameIdTable k%sNameIds;\n", item.name)
+        if not declarations.isEmpty():
+            self._writeGenFile("\n" + declarations.render())
 
     def __genMessageReader(self):
         content_lines = """
+// element types a vector or array of is sent as one byte buffer when IDL_BULK_PRIMITIVES is
+// defined. that changes the wire format, both peers have to be built with it and have the
+// same byte order. std::vector<bool> has no contiguous storage, bool stays per element
+template<typename ValueType>
+struct IsBulkPrimitive : std::integral_constant<bool,
+    std::is_arithmetic<ValueType>::value && !std::is_same<ValueType, bool>::value> {};
+
 class MessageReader
 {
 public:
@@ -278,10 +352,13 @@ public:
 
     bool Read(double* value);
 
+    // strings are sent as byte buffers carrying their length when IDL_SIZED_STRINGS is defined,
+    // so the runtime does not scan them again and strings holding NUL bytes arrive whole. that
+    // changes the wire format too, both peers have to be built with it, see Write(std::string)
     bool Read(std::string* value);
 
     bool Read(BytesBuffer* value);
-
+${view_reads}
     template<typename ValueType>
     bool Read(std::vector<ValueType>* value)
     {
@@ -298,20 +375,18 @@ public:
 
         uint32_t count = (uint32_t)size;
 
-        while (count > 0) {
-            count--;
-            ValueType member;
-
-            if (!Read(&member)) {
-                break;
-            }
-
-            value->push_back(std::move(member));
+        // the size comes from the peer, a bogus one must not allocate gigabytes up front
+        std::size_t reserve = count;
+        if (reserve > kMaxReserveBytes / sizeof(ValueType)) {
+            reserve = kMaxReserveBytes / sizeof(ValueType);
         }
+        value->reserve(value->size() + reserve);
+
+        bool items_read = ReadItems(value, count, IsBulkPrimitive<ValueType>());
 
         message_->read_vector_end(message_);
 
-        return true;
+        return items_read;
     }
 
     template<typename ValueType, std::size_t size>
@@ -327,15 +402,11 @@ public:
             return flag;
         }
 
-        for(std::size_t index = 0; index < size; index++) {
-            ValueType member;
-            Read(&member);
-            (*value)[index] = std::move(member);
-        }
+        bool items_read = ReadItems(value, IsBulkPrimitive<ValueType>());
 
         message_->read_array_end(message_);
 
-        return true;
+        return items_read;
     }
 
     template<typename T>
@@ -349,10 +420,97 @@ public:
     }
 
 private:
+    static constexpr std::size_t kMaxReserveBytes = 16 * 1024 * 1024;
+
+    // the element by element reads keep going past a failed element as they always did, the
+    // bulk reads fail when the buffer can not be read or does not hold exactly the elements
+    template<typename ValueType>
+    bool ReadItems(std::vector<ValueType>* value, uint32_t count, std::false_type)
+    {
+        while (count > 0) {
+            count--;
+            ValueType member;
+
+            if (!Read(&member)) {
+                break;
+            }
+
+            value->push_back(std::move(member));
+        }
+        return true;
+    }
+
+    template<typename ValueType>
+    bool ReadItems(std::vector<ValueType>* value, uint32_t count, std::true_type)
+    {
+#ifdef IDL_BULK_PRIMITIVES
+        int8_t* buffer = nullptr;
+        uint32_t size = 0;
+
+        if (!message_->read_byte_buffer(message_, &buffer, &size)) {
+            return false;
+        }
+
+        bool size_matches = size == (uint64_t)count * sizeof(ValueType);
+        if (size_matches) {
+            std::size_t offset = value->size();
+            value->resize(offset + count);
+            memcpy(value->data() + offset, buffer, size);
+        }
+        delete [] buffer;
+        return size_matches;
+#else
+        return ReadItems(value, count, std::false_type());
+#endif
+    }
+
+    template<typename ValueType, std::size_t size>
+    bool ReadItems(std::array<ValueType, size>* value, std::false_type)
+    {
+        for(std::size_t index = 0; index < size; index++) {
+            ValueType member;
+            Read(&member);
+            (*value)[index] = std::move(member);
+        }
+        return true;
+    }
+
+    template<typename ValueType, std::size_t size>
+    bool ReadItems(std::array<ValueType, size>* value, std::true_type)
+    {
+#ifdef IDL_BULK_PRIMITIVES
+        int8_t* buffer = nullptr;
+        uint32_t buffer_size = 0;
+
+        if (!message_->read_byte_buffer(message_, &buffer, &buffer_size)) {
+            return false;
+        }
+
+        bool size_matches = buffer_size == sizeof(ValueType) * size;
+        if (size_matches) {
+            memcpy(value->data(), buffer, buffer_size);
+        }
+        delete [] buffer;
+        return size_matches;
+#else
+        for(std::size_t index = 0; index < size; index++) {
+            Read(&(*value)[index]);
+        }
+        return true;
+#endif
+    }
+
     PolarisReadableMessage* message_;
 };
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        view_reads = ""
+        if self._type_resolver.views:
+            view_reads = """
+    bool Read(BorrowedString* value);
+
+    bool Read(BorrowedBytes* value);
+"""
+        self._writeGenFile(content_lines.replace("${view_reads}\n", view_reads + "\n"))
 
     def __genMessageWriter(self):
         content_lines = """
@@ -384,6 +542,7 @@ public:
 
     void Write(const double& value);
 
+    // a byte buffer with the length under IDL_SIZED_STRINGS, see Read(std::string*)
     void Write(const std::string& value);
 
     void Write(const BytesBuffer& value);
@@ -392,11 +551,7 @@ public:
     void Write(const std::vector<ValueType>& value)
     {
         message_->write_vector_begin(message_, value.size());
-
-        for(const ValueType& item : value) {
-            Write(item);
-        }
-
+        WriteItems(value, IsBulkPrimitive<ValueType>());
         message_->write_vector_end(message_);
     }
 
@@ -404,11 +559,7 @@ public:
     void Write(const std::array<ValueType, size>& value)
     {
         message_->write_array_begin(message_);
-
-        for(std::size_t index = 0; index < size; index++) {
-            Write(value[index]);
-        }
-
+        WriteItems(value, IsBulkPrimitive<ValueType>());
         message_->write_array_end(message_);
     }
 
@@ -419,38 +570,46 @@ public:
     }
 
 private:
+    template<typename Container>
+    void WriteItems(const Container& value, std::false_type)
+    {
+        for(const auto& item : value) {
+            Write(item);
+        }
+    }
+
+    template<typename Container>
+    void WriteItems(const Container& value, std::true_type)
+    {
+#ifdef IDL_BULK_PRIMITIVES
+        message_->write_byte_buffer(message_, reinterpret_cast<const uint8_t*>(value.data()),
+                                    value.size() * sizeof(value[0]));
+#else
+        WriteItems(value, std::false_type());
+#endif
+    }
+
     PolarisWritableMessage* message_;
 };
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genDataWrapperStructs(self):
-        if not ir_parser.kInterfaceDeclarations in self._ir_dict.keys():
-            return
-
-        for interface_item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
+        for interface_item in self._module.interfaces:
             # for method data
-            if ir_parser.kMethodList in interface_item.keys():
-                for method_item in interface_item[ir_parser.kMethodList]:
-                    # for request
-                    if ir_parser.kMethodParameter in method_item.keys(): 
-                        self.__genDataWrapperStructItem(interface_item[ir_parser.kName],
-                                                method_item[ir_parser.kMethodName],
-                                                method_item[ir_parser.kMethodParameter], "request")
-                    # for response
-                    if ir_parser.kMethodReturn in method_item.keys(): 
-                        self.__genDataWrapperStructItem(interface_item[ir_parser.kName],
-                                                method_item[ir_parser.kMethodName],
-                                                method_item[ir_parser.kMethodReturn], "response")
+            for method_item in interface_item.methods:
+                # for request
+                self.__genDataWrapperStructItem(interface_item.name, method_item.name,
+                                                method_item.params, "request")
+                # for response
+                self.__genDataWrapperStructItem(interface_item.name, method_item.name,
+                                                method_item.returns, "response")
 
             # for event data
-            if ir_parser.kEventList in interface_item.keys(): 
-                for event_item in interface_item[ir_parser.kEventList]:
-                    # for notify
-                    if ir_parser.kMembers in event_item.keys(): 
-                        self.__genDataWrapperStructItem(interface_item[ir_parser.kName],
-                                                        event_item[ir_parser.kEventName],
-                                                        event_item[ir_parser.kMembers], "notify")
+            for event_item in interface_item.events:
+                # for notify
+                self.__genDataWrapperStructItem(interface_item.name, event_item.name,
+                                                event_item.members, "notify")
 
     def __genDataWrapperStructItem(self, interface_name, function_name, members, type):
         type_name = "Req"
@@ -459,29 +618,25 @@ private:
         elif type == "notify":
             type_name = "Notify"
 
-        args_str = ""
+        struct_scope = code_model.Scope("""
+struct %s_%s_%s {
+""" % (interface_name, function_name, type_name), """
+};
+""")
         i = 1
         for arg in members:
-            arg_name = ""
-
-            if ir_parser.kName in arg.keys():
-                arg_name = arg[ir_parser.kName]
-            else:
+            arg_name = arg.name
+            if arg_name is None:
                 # if arg name is not provided, use arg name as function_arg_X
                 arg_name = "%s_arg_%d" %(function_name, i)
 
-            arg_type = self._typeConvert(arg[ir_parser.kType])
+            arg_type = self._typeConvert(arg.type)
             if arg_type == "void":
                 return
-            args_str +="    const %s& %s;\n" %(arg_type, arg_name)
+            struct_scope.addf("    const %s& %s;\n", arg_type, arg_name)
             i += 1
 
-        content_lines = """
-struct %s_%s_%s {
-%s
-};
-""" %(interface_name, function_name, type_name, args_str)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(struct_scope.render())
 
 
 
@@ -4,50 +4,78 @@ import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.code_model as code_model
 from . import cpp_gen_protocol
+from . import cpp_name_table
 
 
 class CppCommonImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppCommonImplGenerator, self).__init__(path, base_name, base_name + "Common.cpp", ir_dict)
+    # with unity_sink the implementations are a part of the unity file, see cpp_unity_gen
+    def __init__(self, path, base_name, module, type_resolver=None, unity_sink=None):
+        super(CppCommonImplGenerator, self).__init__(path, base_name, base_name + "Common.cpp", module, type_resolver,
+                                                     unity_sink)
 
     def gen(self):
-        print("start to gen common impl")
-        self.__genIncAndTypeDefs()
+        logging.info("start to gen common impl")
+        if self._owns_sink:
+            self.__genIncAndTypeDefs()
         self._genNameSpaceStart() 
         self.__genImplementations()
         self._genNameSpaceEnd()
+        self._flushGenFile()
 
     def __genIncAndTypeDefs(self):
         content_lines = '''#include "%sCommon.h"\n''' % (self._base_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genImplementations(self):
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
-            return
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                self.__genNameIdTable(item)
 
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kStruct:
-                self.__genStructImplementation(order_item[ir_parser.kName])
-            elif order_item[ir_parser.kCategory] == ir_parser.kUnion:
-                self.__genUnionImplementation(order_item[ir_parser.kName])
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kStruct:
+                self.__genStructImplementation(item)
+            elif item.category == ir_parser.kUnion:
+                self.__genUnionImplementation(item)
 
         self.__genMessageReader()
         self.__genMessageWriter()     
 
-    
-    def __genStructImplementation(self, name):
-        for item in self._ir_dict[ir_parser.kStructDeclarations]:
-            if item[ir_parser.kName] == name:
-                read_member_str = ""
-                write_member_str = ""
-                for member_item in item[ir_parser.kMembers]:
-                    member_name = member_item[ir_parser.kName]
-                    member_type = self._typeConvert(member_item[ir_parser.kType])
-                    read_member_str += "    reader.Read(&(this->%s));\n" % (member_name)
-                    write_member_str += "    writer.Write(this->%s);\n" % (member_name)
-
-                content_lines = """
+
+    def __genNameIdTable(self, interface_info):
+        table = cpp_name_table.NameTable(cpp_name_table.interfaceNames(interface_info), interface_info.name)
+        name = interface_info.name
+        if len(table.names) == 0:
+            self._writeGenFile("""
+constexpr NameIdTable k%sNameIds = {nullptr, nullptr, nullptr, nullptr, 0, 1, 1};
+""" % (name))
+            return
+
+        content_lines = """
+static constexpr const char* k%sNames[] = {%s};
+static constexpr uint32_t k%sNameSizes[] = {%s};
+static constexpr uint32_t k%sNameDisplacements[] = {%s};
+static constexpr uint16_t k%sNameSlots[] = {%s};
+constexpr NameIdTable k%sNameIds = {
+    k%sNames, k%sNameSizes, k%sNameDisplacements, k%sNameSlots, %d, %d, %d};
+""" % (name, ", ".join("\"%s\"" % (item) for item in table.names),
+       name, ", ".join(str(len(item.encode("utf-8"))) for item in table.names),
+       name, ", ".join(str(item) for item in table.displacements),
+       name, ", ".join(str(item) for item in table.slots),
+       name, name, name, name, name, len(table.names), table.bucket_count, table.slot_count)
+        self._writeGenFile(content_lines)
+
+    def __genStructImplementation(self, item):
+        name = item.name
+        read_member_str = code_model.Fragment()
+        write_member_str = code_model.Fragment()
+        for member_item in item.members:
+            member_name = member_item.name
+            read_member_str.addf("    reader.Read(&(this->%s));\n", member_name)
+            write_member_str.addf("    writer.Write(this->%s);\n", member_name)
+
+        content_lines = """
 void %s::Serialize(PolarisWritableMessage* message) const
 {
     if (message == nullptr) {
@@ -75,36 +103,32 @@ bool %s::Deserialize(PolarisReadableMessage* message)
     message->read_struct_end(message);
     return true;
 }
-""" %(name, write_member_str, name, read_member_str)
-                utils.Utils.writeGenFile(self._path, self._file, content_lines)
+""" %(name, write_member_str.render(), name, read_member_str.render())
+        self._writeGenFile(content_lines)
 
-    def __genUnionImplementation(self, name):
-        for item in self._ir_dict[ir_parser.kUnionDeclarations]:
-            if item[ir_parser.kName] == name:
-                read_member_str = ""
-                write_member_str = ""
-                member_name_list = []
- 
-                for member_item in item[ir_parser.kMembers]:
-                    member_name_list.append(member_item[ir_parser.kName])
+    def __genUnionImplementation(self, item):
+        name = item.name
+        member_name_list = []
+        for member_item in item.members:
+            member_name_list.append(member_item.name)
 
         # create write member content
-        write_member_str = ""
+        write_member_str = code_model.Fragment()
         for i in range(len(member_name_list)):
-            write_member_str += """
+            write_member_str.addf("""
     case Tag::TYPE_%d:
         writer.Write(this->%s);
         break;
-        """ % (i+1, member_name_list[i])
+        """, i+1, member_name_list[i])
 
         # create read member content
-        read_member_str = ""
+        read_member_str = code_model.Fragment()
         for i in range(len(member_name_list)):
-            read_member_str += """
+            read_member_str.addf("""
     case Tag::TYPE_%d:
         reader.Read(&(this->%s));
         break;
-        """ % (i+1, member_name_list[i])
+        """, i+1, member_name_list[i])
 
         full_str = """
 void %s::Serialize(PolarisWritableMessage* message) const
@@ -147,8 +171,8 @@ bool %s::Deserialize(PolarisReadableMessage* message)
     message->read_union_end(message);
     return true;
 }
-        """ % (name, write_member_str, name, read_member_str)
-        utils.Utils.writeGenFile(self._path, self._file, full_str) 
+        """ % (name, write_member_str.render(), name, read_member_str.render())
+        self._writeGenFile(full_str) 
 
     def __genMessageReader(self):
         content_lines = """
@@ -216,6 +240,18 @@ bool MessageReader::Read(double* value)
 
 bool MessageReader::Read(std::string* value)
 {
+#ifdef IDL_SIZED_STRINGS
+    int8_t* buffer = nullptr;
+    uint32_t size = 0;
+
+    if(!message_->read_byte_buffer(message_, &buffer, &size)) {
+        return false;
+    }
+
+    value->assign(reinterpret_cast<const char*>(buffer), size);
+    delete [] buffer;
+    return true;
+#else
     const char* str = nullptr;
     uint32_t size = 0;
 
@@ -226,6 +262,7 @@ bool MessageReader::Read(std::string* value)
     *value = str;
     delete [] str;
     return true;
+#endif
 }
 
 bool MessageReader::Read(BytesBuffer* value)
@@ -243,7 +280,58 @@ bool MessageReader::Read(BytesBuffer* value)
     return true;
 }
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
+        if self._type_resolver.views:
+            self.__genViewReads()
+
+    # the buffers are handed over instead of copied, the holders free them
+    def __genViewReads(self):
+        content_lines = """
+bool MessageReader::Read(BorrowedString* value)
+{
+#ifdef IDL_SIZED_STRINGS
+    int8_t* buffer = nullptr;
+    uint32_t size = 0;
+
+    if(!message_->read_byte_buffer(message_, &buffer, &size)) {
+        return false;
+    }
+
+    delete [] value->data_;
+    value->data_ = reinterpret_cast<const char*>(buffer);
+    value->size_ = size;
+    return true;
+#else
+    const char* str = nullptr;
+    uint32_t size = 0;
+
+    if(!message_->read_string(message_, &str, &size)) {
+        return false;
+    }
+
+    delete [] value->data_;
+    value->data_ = str;
+    value->size_ = std::strlen(str);
+    return true;
+#endif
+}
+
+bool MessageReader::Read(BorrowedBytes* value)
+{
+    int8_t* buffer = nullptr;
+    uint32_t size = 0;
+
+    if(!message_->read_byte_buffer(message_, &buffer, &size)) {
+        return false;
+    }
+
+    delete [] value->data_;
+    value->data_ = buffer;
+    value->size_ = size;
+    return true;
+}
+"""
+        self._writeGenFile(content_lines)
 
     def __genMessageWriter(self):
         content_lines = """
@@ -304,7 +392,11 @@ void MessageWriter::Write(const double& value)
 
 void MessageWriter::Write(const std::string& value)
 {
+#ifdef IDL_SIZED_STRINGS
+    message_->write_byte_buffer(message_, reinterpret_cast<const uint8_t*>(value.data()), value.size());
+#else
     message_->write_string(message_, value.c_str());
+#endif
 }
 
 void MessageWriter::Write(const BytesBuffer& value)
@@ -312,7 +404,7 @@ void MessageWriter::Write(const BytesBuffer& value)
     message_->write_byte_buffer(message_, value.data.data(), value.data.size());
 }
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
 
 
@@ -1,30 +1,157 @@
 import logging
 import sys
+import concurrent.futures
 sys.path.append("..")
 import common.jsonIr_parser
+import common.profiler as profiler
+import common.output_sink as output_sink
+from . import cpp_gen_protocol
 from . import cpp_common_header_gen
 from . import cpp_common_impl_gen
 from . import cpp_service_header_gen
 from . import cpp_service_impl_gen
 from . import cpp_proxy_header_gen
 from . import cpp_proxy_impl_gen
+from . import cpp_shard
+from . import cpp_unity_gen
+from . import cpp_name_table
+
+# generators of one module, in the order serial mode runs them
+kGeneratorClasses = [
+    cpp_common_header_gen.CppCommonHeaderGenerator,
+    cpp_common_impl_gen.CppCommonImplGenerator,
+    cpp_service_header_gen.CppServiceHeaderGenerator,
+    cpp_service_impl_gen.CppServiceImplGenerator,
+    cpp_proxy_header_gen.CppProxyHeaderGenerator,
+    cpp_proxy_impl_gen.CppProxyImplGenerator,
+]
+
+# generators split into shards when sharding, with the generator of the header their shards share
+kShardedGenerators = {
+    cpp_service_impl_gen.CppServiceImplGenerator: cpp_service_impl_gen.CppServiceShardHeaderGenerator,
+    cpp_proxy_impl_gen.CppProxyImplGenerator: cpp_proxy_impl_gen.CppProxyShardHeaderGenerator,
+}
+
+# (generator class, shard or None) of every file of module. methods_per_shard None does not shard,
+# unity puts the .cpp files into one
+def _generatorSpecs(module, methods_per_shard, unity):
+    if unity:
+        specs = [(generator_class, None) for generator_class in kGeneratorClasses
+                 if not generator_class in cpp_unity_gen.kUnityParts]
+        specs.append((cpp_unity_gen.CppUnityImplGenerator, None))
+        return specs
+
+    shards = []
+    if methods_per_shard is not None:
+        shards = cpp_shard.planShards(module, methods_per_shard)
+
+    specs = []
+    for generator_class in kGeneratorClasses:
+        if len(shards) == 0 or not generator_class in kShardedGenerators:
+            specs.append((generator_class, None))
+            continue
+        specs.append((kShardedGenerators[generator_class], None))
+        specs.extend([(generator_class, shard) for shard in shards])
+    return specs
+
+def _newGenerator(spec, path, base_name, module, type_resolver):
+    generator_class, shard = spec
+    if shard is None:
+        return generator_class(path, base_name, module, type_resolver)
+    return generator_class(path, base_name, module, type_resolver, shard=shard)
+
+# state shared by every generator in a worker process, set once by _initWorker
+_worker_args = None
+
+def _initWorker(path, base_name, module, specs, profile, render=False, views=False):
+    global _worker_args
+    # a forked worker starts with a copy of the parent's records, which the parent already has
+    profiler.disable()
+    if profile:
+        profiler.enable()
+    _worker_args = (path, base_name, module, specs,
+                    cpp_gen_protocol.CppGeneratorProtocol.newTypeResolver(module, views), render)
+
+# returns the file name, its content when rendering in memory or else None, and the profiler
+# records of the worker, or None when not profiling
+def _runGenerator(index):
+    path, base_name, module, specs, type_resolver, render = _worker_args
+    generator = _newGenerator(specs[index], path, base_name, module, type_resolver)
+    files = None
+    if render:
+        files = {}
+        generator.setSink(output_sink.MemorySink(generator.fileName(), files))
+    _genOne(generator)
+    content = None if files is None else files[generator.fileName()]
+    if not profiler.enabled():
+        return generator.fileName(), content, None
+    return generator.fileName(), content, profiler.current().takeRecords()
+
+def _genOne(generator):
+    with profiler.span("gen " + generator.fileName(), "gen", track_peak=True):
+        generator.gen()
 
 class CppGenerator():
-    def gen(self, path, base_name, ir_dict):
-        common_header_gen = cpp_common_header_gen.CppCommonHeaderGenerator(path, base_name, ir_dict)
-        common_header_gen.gen()
+    # options are the utils.CommandOptions of the run, only shard, unity and views are used here
+    def __init__(self, options=None):
+        self._methods_per_shard = None if options is None else options.shard
+        self._unity = False if options is None else options.unity
+        self._views = False if options is None else options.views
 
-        common_impl_gen = cpp_common_impl_gen.CppCommonImplGenerator(path, base_name, ir_dict)
-        common_impl_gen.gen()
+    # returns the names of the generated files
+    # an ir the generated code can not be made for raises ValueError before any file is written
+    def gen(self, path, base_name, module, jobs=1):
+        cpp_name_table.checkModule(module)
+        specs = _generatorSpecs(module, self._methods_per_shard, self._unity)
+        if jobs > 1:
+            return [file_name for file_name, content in self.__genParallel(path, base_name, module, specs, jobs, False)]
+        return self.__genSerial(path, base_name, module, specs)
 
-        service_header_gen = cpp_service_header_gen.CppServiceHeaderGenerator(path, base_name, ir_dict)
-        service_header_gen.gen()
-   
-        service_impl_gen = cpp_service_impl_gen.CppServiceImplGenerator(path, base_name, ir_dict)
-        service_impl_gen.gen()
+    # renders the files of module without touching disk, returns {file name: content} in
+    # generation order. on_chunk(file_name, content) sees the text of each file as it is
+    # generated, with jobs > 1 once per file with all of it
+    def render(self, base_name, module, jobs=1, on_chunk=None):
+        cpp_name_table.checkModule(module)
+        specs = _generatorSpecs(module, self._methods_per_shard, self._unity)
+        if jobs > 1:
+            files = {}
+            for file_name, content in self.__genParallel(".", base_name, module, specs, jobs, True):
+                files[file_name] = content
+                if on_chunk is not None:
+                    on_chunk(file_name, content)
+            return files
+        files = {}
+        self.__genSerial(".", base_name, module, specs, files, on_chunk)
+        return files
 
-        proxy_header_gen = cpp_proxy_header_gen.CppProxyHeaderGenerator(path, base_name, ir_dict)
-        proxy_header_gen.gen()
+    # returns the names of the generated files, which are rendered into files when it is given
+    def __genSerial(self, path, base_name, module, specs, files=None, on_chunk=None):
+        # types are resolved once and shared by all generators
+        type_resolver = cpp_gen_protocol.CppGeneratorProtocol.newTypeResolver(module, self._views)
+        file_names = []
+        for spec in specs:
+            generator = _newGenerator(spec, path, base_name, module, type_resolver)
+            if files is not None:
+                generator.setSink(output_sink.MemorySink(generator.fileName(), files, on_chunk))
+            _genOne(generator)
+            file_names.append(generator.fileName())
+        return file_names
 
-        proxy_impl_gen = cpp_proxy_impl_gen.CppProxyImplGenerator(path, base_name, ir_dict)
-        proxy_impl_gen.gen()
+    # returns (file name, content) of every generated file, the content is None unless rendering
+    def __genParallel(self, path, base_name, module, specs, jobs, render):
+        # every generator renders its own file from the same read-only ir,
+        # so running them in separate processes keeps the output byte-identical
+        workers = min(jobs, len(specs))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers,
+                                                    initializer=_initWorker,
+                                                    initargs=(path, base_name, module, specs,
+                                                              profiler.enabled(), render,
+                                                              self._views)) as executor:
+            futures = [executor.submit(_runGenerator, i) for i in range(len(specs))]
+            results = []
+            for future in futures:
+                file_name, content, records = future.result()
+                results.append((file_name, content))
+                if records is not None:
+                    profiler.current().addRecords(records)
+            return results
@@ -5,6 +5,11 @@ from string import Template
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.output_sink as output_sink
+import common.ir_model as ir_model
+import common.profiler as profiler
+import common.code_model as code_model
+from . import cpp_type_resolver
 
 class CppGeneratorProtocol(object):
     type_mapping = {
@@ -23,8 +28,18 @@ class CppGeneratorProtocol(object):
         "string":"std::string",
     }
 
-    def __init__(self, path, base_name, file, ir_dict):
-        self._ir_dict = ir_dict
+    # module is a common.ir_model.Module, a raw ir dict is converted on the fly.
+    # generators of the same module should share one type_resolver, see newTypeResolver.
+    # a generator given the sink of another one writes into that file, which its owner closes
+    def __init__(self, path, base_name, file, module, type_resolver=None, sink=None):
+        if isinstance(module, dict):
+            module = ir_model.Module.fromDict(module)
+        if type_resolver is None:
+            type_resolver = CppGeneratorProtocol.newTypeResolver(module)
+
+        self._module = module
+        self._type_resolver = type_resolver
+        self._snippets = type_resolver.snippets
         self._path = path
         self._base_name = base_name
         self._file = file
@@ -32,46 +47,58 @@ class CppGeneratorProtocol(object):
         self._head_include_prefix = ""
         self._full_name_space = ""
 
-        if ir_parser.kModule in ir_dict.keys():
-            self._moudle_list = ir_dict[ir_parser.kModule]
-            for item in self._moudle_list:
-                if not self._head_include_prefix == "":
-                    self._head_include_prefix += "_"
-                self._head_include_prefix += item.upper()
+        self._moudle_list = module.module_name
+        for item in self._moudle_list:
+            if not self._head_include_prefix == "":
+                self._head_include_prefix += "_"
+            self._head_include_prefix += item.upper()
 
-                if not self._full_name_space == "": 
-                    self._full_name_space += "."
-                self._full_name_space += item
+            if not self._full_name_space == "": 
+                self._full_name_space += "."
+            self._full_name_space += item
 
-        utils.Utils.createGenFile(self._path, self._file)
+        self._owns_sink = sink is None
+        self._sink = output_sink.FileSink(self._path, self._file) if sink is None else sink
 
-    def _genNameSpaceStart(self):
-        content_lines = ""
-        for item in self._moudle_list:
-            content_lines += """
-namespace %s {""" % (item)
+    # resolver with every type of module already resolved, views see cpp_type_resolver.kViewTypes
+    @staticmethod
+    def newTypeResolver(module, views=False):
+        type_resolver = cpp_type_resolver.CppTypeResolver(CppGeneratorProtocol.type_mapping, views)
+        with profiler.span("resolve types"):
+            type_resolver.resolveModule(module)
+        logging.debug("resolved %d distinct types" % (type_resolver.internedCount()))
+        return type_resolver
 
-        content_lines += "\n"
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+    def fileName(self):
+        return self._file
 
-    def _genNameSpaceEnd(self):
-        content_lines = ""
-        for item in self._moudle_list:
-            content_lines += """
-}  // namespace %s""" % (item)
+    # write into sink instead of the file, for rendering in memory (see output_sink.MemorySink).
+    # must be called before gen()
+    def setSink(self, sink):
+        self._sink = sink
+
+    def _writeGenFile(self, content):
+        self._sink.write(content)
+
+    def _flushGenFile(self):
+        if self._owns_sink:
+            self._sink.close()
+
+    def _genNameSpaceStart(self):
+        self._writeGenFile(code_model.Namespace(self._moudle_list).beginText())
 
-        content_lines += "\n"
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+    def _genNameSpaceEnd(self):
+        self._writeGenFile(code_model.Namespace(self._moudle_list).endText())
 
     def _genHeadFileStart(self, tail):
         content = """#ifndef %s_%s_%s_H_
 #define %s_%s_%s_H_
         """ % (self._head_include_prefix, self._base_name.upper(), tail, self._head_include_prefix, self._base_name.upper(), tail)
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
     def _genHeadFileEnd(self, tail):
         content = """\n\n#endif  // %s_%s_%s_H_""" % (self._head_include_prefix, self._base_name.upper(), tail)
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
     def _isArgsListEmpty(self, args_list):
         if len(args_list) == 0:
@@ -83,128 +110,56 @@ namespace %s {""" % (item)
         return False
 
     def _isArgEmpty(self, arg):
-        if not ir_parser.kType in arg.keys():
+        if arg.type is None:
             utils.ColorsPrint.PrintE("there is no key of type")
             return True
-        type = self._typeConvert(arg[ir_parser.kType])
-
-        if type == "void":
-            return True
-
-        return False
+        return self._type_resolver.resolve(arg.type).is_void
 
     # if type is empty, return void
     def _typeConvert(self, type):
-        #has not subtype with 'sequence'
-        if isinstance (type, list):
-            idl_type = ""
-            for item in type:
-                if idl_type == "":
-                    idl_type = item
-                else:
-                    idl_type += " " + item
-                
-            if item in CppGeneratorProtocol.type_mapping.keys():
-                basic_type = CppGeneratorProtocol.type_mapping[idl_type]
-            else:
-                basic_type = idl_type
-
-            if basic_type == "":
-                return "void"
-
-            return basic_type 
-        #has subtype with 'sequence'            
-        else:
-            if not ir_parser.kTypeName in type.keys():
-                print("invalid format")
-                print(type)
-                sys.exit(1)
-
-            sequence_size = 0
-            if ir_parser.kSequenceSize in type.keys():
-                # it's a vector or array  
-                sequence_size = type[ir_parser.kSequenceSize]
-
-            if sequence_size > 0:
-                type_str = """std::array<%s, %d>""" % (self._typeConvert(type[ir_parser.kTypeName]), sequence_size)
-            elif sequence_size == -1:
-                type_str = """std::vector<%s>""" % (self._typeConvert(type[ir_parser.kTypeName]))
-            else:
-                type_str = self._typeConvert(type[ir_parser.kTypeName])
+        return self._type_resolver.resolve(type).spelling
 
-        return  type_str
+    def _getArgName(self, direction, arg, index):
+        if arg.name is not None:
+            return arg.name
+        # if arg name is not provided, use arg name as in_arg_N, or out_arg_N
+        # for exammple, out_arg_0
+        return "%s_arg_%d" %(direction, index)
 
+    # the same arg list is rendered the same way by several files, so it is rendered once per module
     def _getArgListStr(self, direction, arg_list, begin, middle, end):
-        args_str = ""
-
-        i = 0
-        for arg in arg_list:
-            arg_name = ""
-            if ir_parser.kName in arg.keys():
-                arg_name = arg[ir_parser.kName]
-            else:
-                 # if arg name is not provided, use arg name as in_arg_N, or out_arg_N
-                # for exammple, out_arg_0
-                arg_name = "%s_arg_%d" %(direction, i)
-
-            arg_type = self._typeConvert(arg[ir_parser.kType])
-            if arg_type == "void":
-                return ""
-            if args_str == "":
-                args_str += begin + arg_type + middle + " " + arg_name
-            else:
-                args_str += end + begin + arg_type + middle + " " + arg_name   
-            i += 1
-        return args_str
+        return self._snippets.get(arg_list, ("args", direction, begin, middle, end),
+                    lambda: self.__renderArgList(direction, arg_list, begin, middle, end))
+
+    # the arg list as a handler or callback receives it, with the view types in view mode
+    def _getReceivedArgListStr(self, direction, arg_list, begin, middle, end):
+        if not self._type_resolver.views:
+            return self._getArgListStr(direction, arg_list, begin, middle, end)
+        return self._snippets.get(arg_list, ("received", direction, begin, middle, end),
+                    lambda: self.__renderArgList(direction, arg_list, begin, middle, end, True))
+
+    # reads the view arg_name of arg_type (whose view is not None) from reader, into a holder
+    # that lives as long as the view: to the end of the handler the lines are part of
+    def _getReadViewArgStr(self, arg_type, arg_name, indent):
+        view, holder = arg_type.view
+        return "%s%s %s_holder;\n%sreader.Read(&%s_holder);\n%s%s %s = %s_holder.View();\n" % (
+            indent, holder, arg_name, indent, arg_name, indent, view, arg_name, arg_name)
 
     def _getNoTypeArgListStr(self, direction, arg_list, begin, end):
-        args_str = ""
-
-        i = 0
-        for arg in arg_list:
-            arg_name = ""
-            if ir_parser.kName in arg.keys():
-                arg_name = arg[ir_parser.kName]
-            else:
-                # if arg name is not provided, use arg name as IN_arg_N, or in_arg_N
-                # for exammple, out_arg_0
-                arg_name = "%s_arg_%d" %(direction, i)
-
-            arg_type = self._typeConvert(arg[ir_parser.kType])
-            if arg_type == "void":
+        return self._snippets.get(arg_list, ("names", direction, begin, end),
+                    lambda: self.__renderArgList(direction, arg_list, begin, None, end))
+
+    # middle None renders the names only
+    def __renderArgList(self, direction, arg_list, begin, middle, end, received=False):
+        items = []
+        for i, arg in enumerate(arg_list):
+            arg_type = self._type_resolver.resolve(arg.type)
+            if arg_type.is_void:
                 return ""
-            
-            if args_str == "":
-                args_str += begin + arg_name
+            arg_name = self._getArgName(direction, arg, i)
+            if middle is None:
+                items.append(begin + arg_name)
             else:
-                args_str += end + begin + arg_name 
-            i += 1
-        return args_str
-
-    def _getMethodEventNamesStr(self, interface_info, begin, end):
-        result = ""
-        if ir_parser.kMethodList in interface_info.keys():
-            for method in interface_info[ir_parser.kMethodList]:
-                if result == "":
-                    result += begin + "\"" + method[ir_parser.kMethodName] + "\""
-                else:
-                    result += end + begin + "\"" + method[ir_parser.kMethodName] + "\""
-                
-        if ir_parser.kEventList in interface_info.keys():
-            for event in interface_info[ir_parser.kEventList]:
-                if result == "":
-                    result += begin + "\"" + event[ir_parser.kEventName] + "\""
-                else:
-                    result += end + begin + "\"" + event[ir_parser.kEventName] + "\""
-        return result
-
-
-
-
-
-
-
-   
-
-
-
+                spelling = arg_type.view[0] if received and arg_type.view is not None else arg_type.spelling
+                items.append(begin + spelling + middle + " " + arg_name)
+        return end.join(items)
@@ -0,0 +1,102 @@
+import sys
+sys.path.append("..")
+
+# the method and event names of an interface are known when generating, so the name to id
+# lookup the runtime does for every message is a table computed here: a perfect hash (hash and
+# displace) emitted as constant data that NameIdTable::FindId in XCommon.h reads. the hash
+# functions below and those in the generated header must stay the same
+
+# slots per name, more slots find displacements sooner
+kSlotsPerName = 1.25
+# names per bucket of the first level hash
+kNamesPerBucket = 4
+kMaxDisplacement = 1 << 24
+# ids are emitted as uint16_t
+kMaxNames = 0xffff
+
+# ids of an interface's names: methods first, its first event id is one past the last method id.
+# NameTable below and the switch of the generated service dispatch both number them this way
+def interfaceNames(interface_info):
+    return [method.name for method in interface_info.methods] + [event.name for event in interface_info.events]
+
+
+# 32 bit fnv-1a of the utf-8 bytes of name
+def nameHash(name):
+    value = 2166136261
+    for byte in name.encode("utf-8"):
+        value = ((value ^ byte) * 16777619) & 0xffffffff
+    return value
+
+
+# murmur3 finalizer, spreads hash ^ displacement over all bits
+def mixHash(value):
+    value ^= value >> 16
+    value = (value * 0x85ebca6b) & 0xffffffff
+    value ^= value >> 13
+    value = (value * 0xc2b2ae35) & 0xffffffff
+    value ^= value >> 16
+    return value
+
+
+# raises ValueError when the names of interface_name can not be put into a table: too many of
+# them, or two distinct names with the same hash, which no displacement can separate
+def checkNames(interface_name, names):
+    if len(names) > kMaxNames:
+        raise ValueError("interface %s has %d methods and events, at most %d are supported"
+                         % (interface_name, len(names), kMaxNames))
+    hashes = {}
+    for name in names:
+        other = hashes.setdefault(nameHash(name), name)
+        if other != name:
+            raise ValueError("the names %s and %s of interface %s have the same hash, rename one of them"
+                             % (other, name, interface_name))
+
+
+# every interface of module, before anything is generated
+def checkModule(module):
+    for interface_info in module.interfaces:
+        checkNames(interface_info.name, interfaceNames(interface_info))
+
+
+class NameTable:
+    __slots__ = ("names", "bucket_count", "slot_count", "displacements", "slots")
+
+    # names[id] is the name of id. a name listed twice keeps its first id.
+    # raises ValueError like checkNames
+    def __init__(self, names, interface_name=""):
+        checkNames(interface_name, names)
+        self.names = names
+        unique = {}
+        for name_id, name in enumerate(names):
+            unique.setdefault(name, name_id)
+
+        self.bucket_count = max(1, (len(unique) + kNamesPerBucket - 1) // kNamesPerBucket)
+        self.slot_count = max(1, int(len(unique) * kSlotsPerName) + 1)
+        self.displacements = [0] * self.bucket_count
+        # unused slots hold id 0, a lookup landing there fails the name compare
+        self.slots = [0] * self.slot_count
+        self.__place(unique)
+
+    def __place(self, unique):
+        buckets = [[] for i in range(self.bucket_count)]
+        for name, name_id in unique.items():
+            value = nameHash(name)
+            buckets[value % self.bucket_count].append((value, name_id))
+
+        used = [False] * self.slot_count
+        # the biggest buckets are placed first, while most slots are still free
+        for bucket_index in sorted(range(self.bucket_count), key=lambda index: -len(buckets[index])):
+            bucket = buckets[bucket_index]
+            if len(bucket) == 0:
+                continue
+            for displacement in range(kMaxDisplacement):
+                slots = [mixHash(value ^ displacement) % self.slot_count for value, name_id in bucket]
+                if len(set(slots)) == len(slots) and not any(used[slot] for slot in slots):
+                    break
+            else:
+                raise ValueError("no perfect hash for %d names" % (len(unique)))
+
+            self.displacements[bucket_index] = displacement
+            for slot, (value, name_id) in zip(slots, bucket):
+                used[slot] = True
+                self.slots[slot] = name_id
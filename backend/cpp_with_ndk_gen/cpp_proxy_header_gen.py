@@ -1,42 +1,41 @@
 import logging
-from string import Template
 import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.template_registry as template_registry
+import common.code_model as code_model
 from . import cpp_gen_protocol
 
 
 class CppProxyHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppProxyHeaderGenerator, self).__init__(path, base_name, base_name + "Proxy.h", ir_dict)
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppProxyHeaderGenerator, self).__init__(path, base_name, base_name + "Proxy.h", module, type_resolver)
 
     def gen(self):
-        print("start to gen proxy header")
+        logging.info("start to gen proxy header")
         self._genHeadFileStart("PROXY")
         self.__genIncAndTypeDefs()
         self._genNameSpaceStart() 
         self.__genDeclarations()
         self._genNameSpaceEnd()
         self._genHeadFileEnd("PROXY")
+        self._flushGenFile()
 
     def __genIncAndTypeDefs(self):
         content_lines = """
 #include <functional>
 #include "%sCommon.h"
 """ %(self._base_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genDeclarations(self):
         self.__genStableDecls()
         self.__genForwardDecls()       
 
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
-            return
-
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kInterface:
-                self.__genInterfaceDecl(order_item[ir_parser.kName])
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                self.__genInterfaceDecl(item)
 
     def __genStableDecls(self):
         content_lines = """
@@ -57,27 +56,23 @@ enum class WaitResult {
 
 using ServiceStatusCallback = std::function<void(bool available)>;
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genForwardDecls(self):
-        member_str = ""
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            member_str += """
+        member_str = code_model.Fragment()
+        for item in self._module.interfaces:
+            member_str.add("""
 class %sProxy;
 class %sProxyImpl;
-""" % (item[ir_parser.kName], item[ir_parser.kName])
-        utils.Utils.writeGenFile(self._path, self._file, member_str)
-
+""" % (item.name, item.name))
+        self._writeGenFile(member_str.render())
 
-    def __genInterfaceDecl(self, name):
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
 
-            self.__genProxyInterfaceDecl(item)
+    def __genInterfaceDecl(self, item):
+        self.__genProxyInterfaceDecl(item)
 
     def __genProxyInterfaceDecl(self, interface_info):
-        temp = Template("""
+        temp = template_registry.get("""
 class ${interface}Proxy final
 {
 public:
@@ -103,32 +98,30 @@ private:
 };
 """)     
 
-        content = temp.substitute(interface = interface_info[ir_parser.kName],
+        content = temp.substitute(interface = interface_info.name,
                         method_str = self.__getProxyMethodsStr(interface_info),
                         event_str = self.__getProxyEventsStr(interface_info))
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
     def __getProxyMethodsStr(self, interface_info):
-        result = ""        
+        result = code_model.Fragment()        
 
-        for method_item in interface_info[ir_parser.kMethodList]:
+        for method_item in interface_info.methods:
             in_args_str = ""
-            method_name = method_item[ir_parser.kMethodName]
-
-            if ir_parser.kMethodParameter in method_item.keys():
-                in_args_str = self._getArgListStr("in", method_item[ir_parser.kMethodParameter],
-                                                            "\n            const ", "&", ",")
-            if ir_parser.kMethodReturn in method_item.keys():      
-                out_args_str = self._getArgListStr("in", method_item[ir_parser.kMethodReturn],
-                                                            "\n            ", "*", ",")
+            method_name = method_item.name
+
+            in_args_str = self._getArgListStr("in", method_item.params,
+                                                        "\n            const ", "&", ",")
+            out_args_str = self._getArgListStr("in", method_item.returns,
+                                                        "\n            ", "*", ",")
             if out_args_str == "":
-                temp = Template("""
+                temp = template_registry.get("""
     ErrorCode ${method}(${in_args});
 """)
             else:
                 if not in_args_str == "":
                     in_args_str += ","
-                temp = Template("""
+                temp = template_registry.get("""
     using ${method}Callback = std::function<void(
             ErrorCode,${out_args}
             )>;
@@ -139,21 +132,20 @@ private:
     void ${method}Async(${in_args}
             const ${method}Callback& callback);
 """)
-            result += temp.substitute(method = method_name, in_args = in_args_str, 
-                                    out_args = out_args_str)
-        return result
+            result.add(temp.substitute(method = method_name, in_args = in_args_str, 
+                                    out_args = out_args_str))
+        return result.render()
 
     def __getProxyEventsStr(self, interface_info):
-        result = ""        
+        result = code_model.Fragment()        
 
-        for event_item in interface_info[ir_parser.kEventList]:
+        for event_item in interface_info.events:
             in_args_str = ""
-            event_name = event_item[ir_parser.kEventName]
+            event_name = event_item.name
 
-            if ir_parser.kMembers in event_item.keys():
-                in_args_str = self._getArgListStr("in", event_item[ir_parser.kMembers],
-                                                            "const ", "&", ",")
-            temp = Template("""
+            in_args_str = self._getReceivedArgListStr("in", event_item.members,
+                                                        "const ", "&", ",")
+            temp = template_registry.get("""
     using ${event}Callback =
         std::function<void(${in_args})>;
 
@@ -161,6 +153,6 @@ private:
 
     void Off${event}();
 """)
-            result += temp.substitute(event = event_name, in_args = in_args_str)
-        return result
+            result.add(temp.substitute(event = event_name, in_args = in_args_str))
+        return result.render()
 
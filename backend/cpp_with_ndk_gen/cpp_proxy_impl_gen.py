@@ -1,50 +1,17 @@
 import logging
-from string import Template
 import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.template_registry as template_registry
+import common.code_model as code_model
 from . import cpp_gen_protocol
 
 
-class CppProxyImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppProxyImplGenerator, self).__init__(path, base_name, base_name + "Proxy.cpp", ir_dict)
-
-    def gen(self):
-        print("start to gen proxy impl")
-        self.__genIncAndTypeDefs()
-        self._genNameSpaceStart()
-        self.__genStableLines()
-        self.__genImpl()
-        self._genNameSpaceEnd()
-
-
-    def __genIncAndTypeDefs(self):
-        content_lines = '''
-#include "%sProxy.h"
-#include <mutex>
-''' % (self._base_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
-
-    def __genStableLines(self):
-        content_lines = """
-using std::shared_ptr;
-using std::string;
-
-static bool NameToId(void* user_data, const char* name, uint16_t* id)
-{
-    NameIdMapper* object =
-        reinterpret_cast<NameIdMapper*>(user_data);
-
-    if (object == nullptr) {
-        return false;
-    }
-
-    return object->FindId(name, id);
-}
-
-static ErrorCode convert(PolarisErrorCode error)
+# helpers of every proxy impl, in the shard header they are inline so an unused one does not warn.
+# the own helpers are the ones a service impl does not have too
+kProxyOwnHelpersText = """
+${linkage} ErrorCode convert(PolarisErrorCode error)
 {
     if (error == kSuccess) {
         return ErrorCode::SUCCESS;
@@ -61,7 +28,7 @@ static ErrorCode convert(PolarisErrorCode error)
     return ErrorCode::INTERNAL_ERROR;
 }
 
-static void Service_status_handler(void* user_data, bool status)
+${linkage} void Service_status_handler(void* user_data, bool status)
 {
     ServiceStatusCallback* callback =
         reinterpret_cast<ServiceStatusCallback*>(user_data);
@@ -73,25 +40,96 @@ static void Service_status_handler(void* user_data, bool status)
     (*callback)(status);
 }
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines) 
+kProxyOwnHelpers = template_registry.get(kProxyOwnHelpersText)
+kProxyHelpers = template_registry.get("""
+using std::shared_ptr;
+using std::string;
 
-    def __genImpl(self):
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
-            print("no key of " + ir_parser.kDeclarationsOrder)
+${linkage} bool NameToId(void* user_data, const char* name, uint16_t* id)
+{
+    const NameIdTable* object =
+        reinterpret_cast<const NameIdTable*>(user_data);
+
+    if (object == nullptr) {
+        return false;
+    }
+
+    return object->FindId(name, id);
+}
+""" + kProxyOwnHelpersText)
+
+
+# XProxyImpl.h, the part of XProxy.cpp every shard of it includes
+class CppProxyShardHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppProxyShardHeaderGenerator, self).__init__(path, base_name, base_name + "ProxyImpl.h", module, type_resolver)
+
+    def gen(self):
+        logging.info("start to gen proxy shard header")
+        self._genHeadFileStart("PROXY_IMPL")
+        self._writeGenFile('''
+#include "%sProxy.h"
+#include <mutex>
+''' % (self._base_name))
+        self._genNameSpaceStart()
+        self._writeGenFile(kProxyHelpers.substitute(linkage="static inline"))
+        self._genNameSpaceEnd()
+        self._genHeadFileEnd("PROXY_IMPL")
+        self._flushGenFile()
+
+
+class CppProxyImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
+    # with a cpp_shard.Shard only the interfaces of that shard are generated, into their own file.
+    # with unity_sink the impl is a part of the unity file, see cpp_service_impl_gen
+    def __init__(self, path, base_name, module, type_resolver=None, shard=None, unity_sink=None):
+        file = base_name + "Proxy.cpp" if shard is None else shard.fileName(base_name, "Proxy")
+        super(CppProxyImplGenerator, self).__init__(path, base_name, file, module, type_resolver, unity_sink)
+        self._shard = shard
+        self._codec = "Codec" if unity_sink is None else "ProxyCodec"
+
+    def gen(self):
+        if self._shard is None:
+            logging.info("start to gen proxy impl")
+        else:
+            logging.info("start to gen proxy impl shard " + self._shard.name)
+        if self._owns_sink:
+            self.__genIncAndTypeDefs()
+        self._genNameSpaceStart()
+        if self._shard is None and self._owns_sink:
+            self.__genStableLines()
+        self.__genImpl()
+        self._genNameSpaceEnd()
+        self._flushGenFile()
+
+
+    def __genIncAndTypeDefs(self):
+        if self._shard is not None:
+            self._writeGenFile('''#include "%sProxyImpl.h"\n''' % (self._base_name))
             return
+        content_lines = '''
+#include "%sProxy.h"
+#include <mutex>
+''' % (self._base_name)
+        self._writeGenFile(content_lines)
 
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kInterface:
-                self.__genInterfaceImpl(order_item[ir_parser.kName])
+    def __genStableLines(self):
+        self._writeGenFile(kProxyHelpers.substitute(linkage="static"))
+
+    def __genImpl(self):
+        if self._shard is not None:
+            for item in self._shard.interfaces(self._module):
+                self.__genInterfaceImpl(item)
+            return
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                self.__genInterfaceImpl(item)
     
-    def __genInterfaceImpl(self, name):
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
-            self.__genImplUserDataDecl(name)
-            self.__genCodec(item)
-            self.__genImplClass(item)
-            self.__genProxyClass(item)
+    def __genInterfaceImpl(self, item):
+        name = item.name
+        self.__genImplUserDataDecl(name)
+        self.__genCodec(item)
+        self.__genImplClass(item)
+        self.__genProxyClass(item)
 
     def __genImplUserDataDecl(self, name):
         content_lines = """
@@ -102,47 +140,43 @@ struct %sProxyImplUserData {
     void* inner = nullptr;
 };
 """ %(name, name, name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genCodec(self, interface_info):
-        interface_name = interface_info[ir_parser.kName]
+        interface_name = interface_info.name
         method_str = self.__getCodecMethodsStr(interface_info)
         content_lines = """
-class %sCodec
+class %s%s
 {
 public:
 %s
 };
-""" %(interface_name, method_str)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+""" %(interface_name, self._codec, method_str)
+        self._writeGenFile(content_lines)
 
     def __getCodecMethodsStr(self, interface_info):
-        result = ""
-        if not ir_parser.kMethodList in interface_info.keys():
-            return result
-        
-        for method_item in interface_info[ir_parser.kMethodList]:
-            method_name = method_item[ir_parser.kMethodName]   
-            method_body = self.__getCodecMethodBodyStr(interface_info[ir_parser.kName], method_item)                
-            result += """
+        result = code_model.Fragment()
+        for method_item in interface_info.methods:
+            method_name = method_item.name   
+            method_body = self.__getCodecMethodBodyStr(interface_info.name, method_item)                
+            result.add("""
     static void %s_message_decorator(
         void* user_data, PolarisWritableMessage* message)
     {
 %s
     }
-""" %(method_name, method_body)           
-        return result
+""" %(method_name, method_body))           
+        return result.render()
 
     def __getCodecMethodBodyStr(self, interface_name, method_info):
-        args_str = ""
-        if not ir_parser.kMethodParameter in method_info.keys() \
-            or self._isArgsListEmpty(method_info[ir_parser.kMethodParameter]):
+        args_str = code_model.Fragment()
+        if self._isArgsListEmpty(method_info.params):
             return ""
 
-        for arg in method_info[ir_parser.kMethodParameter]:
-             args_str += "        writer.Write(argument->%s);\n" %(arg[ir_parser.kName])
+        for arg in method_info.params:
+             args_str.add("        writer.Write(argument->%s);\n" %(arg.name))
 
-        temp = Template("""
+        temp = template_registry.get("""
         ${interface}_${method}_Req* argument = reinterpret_cast<${interface}_${method}_Req*>(user_data);
 
         if (argument == nullptr) {
@@ -155,47 +189,43 @@ ${args_content}
         message->serialize_end(message);
 """)
         return temp.substitute(interface = interface_name, 
-                                method = method_info[ir_parser.kMethodName],
-                                num = len(method_info[ir_parser.kMethodParameter]),
-                                args_content = args_str)
+                                method = method_info.name,
+                                num = len(method_info.params),
+                                args_content = args_str.render())
 
     def __genImplClass(self, interface_info):
-        interface_name = interface_info[ir_parser.kName]
-        call_backs_str = ""
-        if ir_parser.kMethodList in interface_info.keys():
-            for method in interface_info[ir_parser.kMethodList]:
-                name = method[ir_parser.kMethodName]
-
-                if ir_parser.kMethodReturn in method.keys() \
-                    and not self._isArgsListEmpty(method[ir_parser.kMethodReturn]):
-                    call_backs_str += "    std::vector<std::shared_ptr<%sProxy::%sCallback>> %s_callbacks_;\n"\
-                            %(interface_name, name, name)
-
-        if ir_parser.kEventList in interface_info.keys():
-            for event in interface_info[ir_parser.kEventList]:
-                name = event[ir_parser.kEventName]
-                call_backs_str += "    std::vector<std::shared_ptr<%sProxy::%sCallback>> %s_callbacks_;\n"\
-                         %(interface_name, name, name)
-
-        temp = Template("""
+        interface_name = interface_info.name
+        call_backs_str = code_model.Fragment()
+        for method in interface_info.methods:
+            name = method.name
+
+            if not self._isArgsListEmpty(method.returns):
+                call_backs_str.add("    std::vector<std::shared_ptr<%sProxy::%sCallback>> %s_callbacks_;\n"\
+                        %(interface_name, name, name))
+
+        for event in interface_info.events:
+            name = event.name
+            call_backs_str.add("    std::vector<std::shared_ptr<%sProxy::%sCallback>> %s_callbacks_;\n"\
+                     %(interface_name, name, name))
+
+        temp = template_registry.get("""
 class ${interface}ProxyImpl final
 {
 public:
     ${interface}ProxyImpl(const std::string& app_name)
     {
         runtime_ = PolarisCreateRuntime();
-        name_id_map_ = std::make_shared<NameIdMapper>();
 
-        if (runtime_ == nullptr || name_id_map_ == nullptr) {
+        if (runtime_ == nullptr) {
             return;
         }
 
-        initNameIdMapping();
-
+        // the runtime only reads the table, NameToId takes it as const again
         PolarisServiceIdentifier identifier;
         identifier.service_name = "${namespace}.${interface}";
         client_ = PolarisCreateClient(runtime_, &identifier, POLARIS_CHANNEL_DDS,
-                                     app_name.c_str(), NameToId, &name_id_map_);
+                                     app_name.c_str(), NameToId,
+                                     const_cast<NameIdTable*>(&k${interface}NameIds));
     }
 
     ~${interface}ProxyImpl()
@@ -268,18 +298,6 @@ ${methods_str}
 ${events_str}
 
 private:
-    void initNameIdMapping()
-    {
-        std::vector<std::string> all_names = {${method_event_names}
-                                             };
-
-        for(size_t i = 0; i < all_names.size(); i++) {
-            name_id_map_->InsertNameId(all_names[i], i);
-        }
-    }
-
-private:
-    std::shared_ptr<NameIdMapper> name_id_map_;
     PolarisRuntime* runtime_ = nullptr;
     PolarisClient* client_ = nullptr;
     std::recursive_mutex mutex_;
@@ -289,70 +307,61 @@ ${call_backs}
 };  
 """)        
         content_lines = temp.substitute(namespace = self._full_name_space,
-                                        interface = interface_info[ir_parser.kName],
+                                        interface = interface_info.name,
                                         methods_str = self.__getImplClassMethodsStr(interface_info),
                                         events_str = self.__getImplClassEventsStr(interface_info),
-                                        call_backs = call_backs_str,
-                                        method_event_names = self._getMethodEventNamesStr(interface_info,
-                                                            "\n                                             ", ","))
+                                        call_backs = call_backs_str.render())
 
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
         
     def __getImplClassMethodsStr(self, interface_info):
-        result = ""
-        interface_name = interface_info[ir_parser.kName]
-        if not ir_parser.kMethodList in interface_info.keys():
-            return ""
-
-        for method in interface_info[ir_parser.kMethodList]:
-            if ir_parser.kMethodReturn in method.keys()\
-                and not self._isArgsListEmpty(method[ir_parser.kMethodReturn]):
-                result += self.__getImplClassMethodSync(interface_name, method)
-                result += self.__getImplClassMethodAsync(interface_name, method)
+        result = code_model.Fragment()
+        interface_name = interface_info.name
+        for method in interface_info.methods:
+            if not self._isArgsListEmpty(method.returns):
+                result.add(self.__getImplClassMethodSync(interface_name, method))
+                result.add(self.__getImplClassMethodAsync(interface_name, method))
             else:
-                result += self.__getImplClassMethod(interface_name, method)
+                result.add(self.__getImplClassMethod(interface_name, method))
 
-        return result
+        return result.render()
 
     def __getImplClassEventsStr(self, interface_info):
-        result = ""
-        interface_name = interface_info[ir_parser.kName]
-        if not ir_parser.kEventList in interface_info.keys():
-            return ""
-        for event in interface_info[ir_parser.kEventList]:  
-            result += self.__getImplClassEvent(interface_name, event)
+        result = code_model.Fragment()
+        interface_name = interface_info.name
+        for event in interface_info.events:  
+            result.add(self.__getImplClassEvent(interface_name, event))
 
-        return result
+        return result.render()
 
     def __getImplClassMethodSync(self, interface_name, method_info):
         no_type_in_args_str = ""
         in_args_str = ""
         req_arg_define_str = ""
         req_arg_str = "nullptr"
-        method_name = method_info[ir_parser.kMethodName]
-        out_args_str = self._getArgListStr("out", method_info[ir_parser.kMethodReturn],
+        method_name = method_info.name
+        out_args_str = self._getArgListStr("out", method_info.returns,
                                             "", "*", ",")
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
-
-            if not self._isArgsListEmpty(args_list):
-                req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
-                                                    method_name, no_type_in_args_str)
-                req_arg_str = "&inner_argument"
-                in_args_str += ","
-
-        reader_content_str = ""
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+
+        if not self._isArgsListEmpty(args_list):
+            req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
+                                                method_name, no_type_in_args_str)
+            req_arg_str = "&inner_argument"
+            in_args_str += ","
+
+        reader_content_str = code_model.Fragment()
         i = 0
-        for out_arg in method_info[ir_parser.kMethodReturn]:
-            if ir_parser.kName in out_arg.keys():
-                reader_content_str += "        reader.Read(%s);\n" % (out_arg[ir_parser.kName])
+        for out_arg in method_info.returns:
+            if out_arg.name is not None:
+                reader_content_str.add("        reader.Read(%s);\n" % (out_arg.name))
             else:
-                reader_content_str += "        reader.Read(out_arg_%d);\n" % (i)
+                reader_content_str.add("        reader.Read(out_arg_%d);\n" % (i))
             i += 1
 
-        temp = Template("""
+        temp = template_registry.get("""
     ErrorCode ${method}Sync(
             ${in_args}
             ${out_args},
@@ -365,7 +374,7 @@ ${call_backs}
         ${req_arg_define}
         auto inner_result = client_->request_sync(
                                 client_, "${method}", timeout_msec,
-                                 ${interface}Codec::${method}_message_decorator, ${req_arg});
+                                 ${interface}${codec}::${method}_message_decorator, ${req_arg});
 
         PolarisErrorCode inner_error = inner_result.error_code;
 
@@ -386,51 +395,51 @@ ${reader_content}
     }
 """)
         return temp.substitute(interface = interface_name,
+                               codec = self._codec,
                                 method = method_name,
                                 in_args = in_args_str,
                                 out_args = out_args_str,
                                 req_arg_define = req_arg_define_str,
                                 req_arg = req_arg_str,
-                                reader_content = reader_content_str)
+                                reader_content = reader_content_str.render())
 
     def __getImplClassMethodAsync(self, interface_name, method_info):
-        method_name = method_info[ir_parser.kMethodName]
+        method_name = method_info.name
         in_args_str = ""
         no_type_in_args_str = ""
         req_arg_define_str = ""
         req_arg_str = "nullptr"
 
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
         
-            if not self._isArgsListEmpty(args_list):
-                req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
-                                                    method_name, no_type_in_args_str)
-                req_arg_str = "&inner_argument"
-                in_args_str += ","
-
-        reader_content_str = ""
-        out_args_str = ""
-        out_null_str = ""
+        if not self._isArgsListEmpty(args_list):
+            req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
+                                                method_name, no_type_in_args_str)
+            req_arg_str = "&inner_argument"
+            in_args_str += ","
+
+        reader_content_str = code_model.Fragment()
+        out_args_str = code_model.Fragment()
+        out_null_str = code_model.Fragment()
         i = 0
-        for out_arg_item in method_info[ir_parser.kMethodReturn]:
-            out_null_str += ", nullptr"
-            out_arg_type = self._typeConvert(out_arg_item[ir_parser.kType])
+        for out_arg_item in method_info.returns:
+            out_null_str.add(", nullptr")
+            out_arg_type = self._typeConvert(out_arg_item.type)
 
-            if ir_parser.kName in out_arg_item.keys():
-                out_arg_name = out_arg_item[ir_parser.kName]
+            if out_arg_item.name is not None:
+                out_arg_name = out_arg_item.name
             else:
                 out_arg_name = "out_arg_%d" %(i)
-            reader_content_str += """
+            reader_content_str.add("""
         %s %s;
         reader.Read(&%s);
-""" % (out_arg_type, out_arg_name, out_arg_name)               
-            out_args_str += " ,&" + out_arg_name
+""" % (out_arg_type, out_arg_name, out_arg_name))               
+            out_args_str.add(" ,&" + out_arg_name)
             i += 1
 
-        temp = Template("""
+        temp = template_registry.get("""
 void ${method}Async(${in_args}
                            const ${interface}Proxy::${method}Callback& callback)
     {
@@ -456,7 +465,7 @@ void ${method}Async(${in_args}
         ${req_arg_define}
         client_->request_async(
             client_, "${method}",
-            ${interface}Codec::${method}_message_decorator, ${req_arg},
+            ${interface}${codec}::${method}_message_decorator, ${req_arg},
             ${method}_result_handler, inner_user_data.get());
 
     }
@@ -533,32 +542,32 @@ ${reader_content}
 
 """)
         return temp.substitute(interface = interface_name,
+                               codec = self._codec,
                                 method = method_name,
                                 in_args = in_args_str,
-                                out_args = out_args_str,
+                                out_args = out_args_str.render(),
                                 req_arg_define = req_arg_define_str,
                                 req_arg = req_arg_str,
-                                reader_content = reader_content_str,
-                                out_null = out_null_str)
+                                reader_content = reader_content_str.render(),
+                                out_null = out_null_str.render())
 
     def __getImplClassMethod(self, interface_name, method_info):
         no_type_in_args_str = ""
         in_args_str = ""
         req_arg_define_str = ""
         req_arg_str = "nullptr"
-        method_name = method_info[ir_parser.kMethodName]
+        method_name = method_info.name
 
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
         
-            if not self._isArgsListEmpty(args_list):
-                req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
-                                                    method_name, no_type_in_args_str)
-                req_arg_str = "&inner_argument"
+        if not self._isArgsListEmpty(args_list):
+            req_arg_define_str = "%s_%s_Req inner_argument = {%s};" %(interface_name,
+                                                method_name, no_type_in_args_str)
+            req_arg_str = "&inner_argument"
                 
-        temp = Template("""
+        temp = template_registry.get("""
     ErrorCode ${method}(${in_args}) const
     {
         if (client_ == nullptr) {
@@ -568,7 +577,7 @@ ${reader_content}
         ${req_arg_define}
         auto inner_result = client_->send(
                                 client_, "${method}",
-                                ${interface}Codec::${method}_message_decorator, ${req_arg});
+                                ${interface}${codec}::${method}_message_decorator, ${req_arg});
 
         PolarisErrorCode inner_error = inner_result;
 
@@ -580,36 +589,41 @@ ${reader_content}
     }
 """)
         return temp.substitute(interface = interface_name,
+                               codec = self._codec,
                                 method = method_name,
                                 in_args = in_args_str,
                                 req_arg_define = req_arg_define_str,
                                 req_arg = req_arg_str)
 
     def __getImplClassEvent(self, interface_name, event_info):
-        event_name = event_info[ir_parser.kEventName]
-        reader_content_str = ""
+        event_name = event_info.name
+        reader_content_str = code_model.Fragment()
         reader_args_str = ""
 
-        if ir_parser.kMembers in event_info.keys() \
-            and not self._isArgsListEmpty(event_info[ir_parser.kMembers]):
-            reader_args_str = self._getNoTypeArgListStr("out", event_info[ir_parser.kMembers], "", ",")
-            reader_content_str += "        MessageReader reader(message);\n"
+        if not self._isArgsListEmpty(event_info.members):
+            reader_args_str = self._getNoTypeArgListStr("out", event_info.members, "", ",")
+            reader_content_str.add("        MessageReader reader(message);\n")
 
             i = 0
-            for arg in event_info[ir_parser.kMembers]:
-                arg_type = self._typeConvert(arg[ir_parser.kType])
+            for arg in event_info.members:
+                cpp_type = self._type_resolver.resolve(arg.type)
+                arg_type = cpp_type.spelling
 
-                if ir_parser.kName in arg.keys():
-                    arg_name = arg[ir_parser.kName]
+                if arg.name is not None:
+                    arg_name = arg.name
                 else:
                     arg_name = "out_arg_%s" %(i)
-                reader_content_str += """
+                if cpp_type.view is not None:
+                    reader_content_str.add("\n" + self._getReadViewArgStr(cpp_type, arg_name, "        "))
+                    i += 1
+                    continue
+                reader_content_str.add("""
         %s %s;
         reader.Read(&%s);
-""" %(arg_type, arg_name, arg_name)
+""" %(arg_type, arg_name, arg_name))
                 i += 1
 
-        temp = Template("""
+        temp = template_registry.get("""
     void On${event}(const ${interface}Proxy::${event}Callback& callback)
     {
         if (client_ == nullptr) {
@@ -655,13 +669,13 @@ ${reader_content}
 """)
         return temp.substitute(interface = interface_name,
                                 event = event_name,
-                                reader_content = reader_content_str,
+                                reader_content = reader_content_str.render(),
                                 reader_args = reader_args_str)
 
     def __genProxyClass(self, interface_info):
         methods_content_str = self.__getProxyClassMethodsStr(interface_info)
         events_content_str = self.__getProxyClassEventsStr(interface_info)
-        temp = Template("""
+        temp = template_registry.get("""
 ${interface}Proxy::${interface}Proxy(const std::string& app_name)
     : impl_(std::make_shared<${interface}ProxyImpl>(app_name)) {}
 
@@ -705,33 +719,28 @@ void ${interface}Proxy::Unwatch(const std::string& event_name)
 ${methods_content}
 ${events_content}
         """)
-        content_lines = temp.substitute(interface = interface_info[ir_parser.kName],
+        content_lines = temp.substitute(interface = interface_info.name,
                                     methods_content = methods_content_str,
                                     events_content = events_content_str)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __getProxyClassMethodsStr(self, interface_info):
-        result = ""
-        interface_name = interface_info[ir_parser.kName]
+        result = code_model.Fragment()
+        interface_name = interface_info.name
 
-        if not ir_parser.kMethodList in interface_info.keys():
-            return ""
-        for method in interface_info[ir_parser.kMethodList]:
-            if ir_parser.kMethodReturn in method.keys() \
-                and not self._isArgsListEmpty(method[ir_parser.kMethodReturn]):
-                result += self.__getProxyClassMethodSync(interface_name, method)
-                result += self.__getProxyClassMethodAsync(interface_name, method)
+        for method in interface_info.methods:
+            if not self._isArgsListEmpty(method.returns):
+                result.add(self.__getProxyClassMethodSync(interface_name, method))
+                result.add(self.__getProxyClassMethodAsync(interface_name, method))
             else:
-                result += self.__getProxyClassMethod(interface_name, method)
+                result.add(self.__getProxyClassMethod(interface_name, method))
 
-        return result
+        return result.render()
 
     def __getProxyClassEventsStr(self, interface_info):
-        result = ""
-        if not ir_parser.kEventList in interface_info.keys():
-            return ""
-        for event in interface_info[ir_parser.kEventList]:
-            temp = Template("""
+        result = code_model.Fragment()
+        for event in interface_info.events:
+            temp = template_registry.get("""
 void ${interface}Proxy::On${event}(
     const ${event}Callback& callback)
 {
@@ -751,27 +760,26 @@ void ${interface}Proxy::Off${event}()
     impl_->Off${event}();
 }
 """)
-            result += temp.substitute(interface = interface_info[ir_parser.kName],
-                                    event = event[ir_parser.kEventName])
-        return result
+            result.add(temp.substitute(interface = interface_info.name,
+                                    event = event.name))
+        return result.render()
 
     def __getProxyClassMethodSync(self, interface_name, method_info):
         no_type_in_args_str = ""
         in_args_str = ""
-        args_list = method_info[ir_parser.kMethodReturn]        
+        args_list = method_info.returns        
         out_args_str = self._getArgListStr("out", args_list, "\n        ", "*", ",")
         no_type_out_args_str = self._getNoTypeArgListStr("out", args_list, "", ",")    
 
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "\n        const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
-            if not in_args_str == "":
-                in_args_str += ","
-            if not no_type_in_args_str == "":
-                no_type_in_args_str += ","
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "\n        const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+        if not in_args_str == "":
+            in_args_str += ","
+        if not no_type_in_args_str == "":
+            no_type_in_args_str += ","
 
-        temp = Template("""
+        temp = template_registry.get("""
 ErrorCode ${interface}Proxy::${method}Sync(${in_args}${out_args},
         int timeout_msec)
 {
@@ -783,7 +791,7 @@ ErrorCode ${interface}Proxy::${method}Sync(${in_args}${out_args},
 }
 """)
         return temp.substitute(interface = interface_name,
-                                method = method_info[ir_parser.kMethodName],
+                                method = method_info.name,
                                 in_args = in_args_str,
                                 out_args = out_args_str,
                                 no_type_in_args = no_type_in_args_str,
@@ -793,16 +801,15 @@ ErrorCode ${interface}Proxy::${method}Sync(${in_args}${out_args},
         no_type_in_args_str = ""
         in_args_str = ""
         
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "\n        const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
-            if not in_args_str == "":
-                in_args_str += ","
-            if not no_type_in_args_str == "":
-                no_type_in_args_str += ","
-
-        temp = Template("""
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "\n        const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+        if not in_args_str == "":
+            in_args_str += ","
+        if not no_type_in_args_str == "":
+            no_type_in_args_str += ","
+
+        temp = template_registry.get("""
 void ${interface}Proxy::${method}Async(${in_args}
         const ${interface}Proxy::${method}Callback& callback)
 {
@@ -814,7 +821,7 @@ void ${interface}Proxy::${method}Async(${in_args}
 }
 """)
         return temp.substitute(interface = interface_name,
-                                method = method_info[ir_parser.kMethodName],
+                                method = method_info.name,
                                 in_args = in_args_str,
                                 no_type_in_args = no_type_in_args_str)
 
@@ -822,12 +829,11 @@ void ${interface}Proxy::${method}Async(${in_args}
         no_type_in_args_str = ""
         in_args_str = ""
         
-        if ir_parser.kMethodParameter in method_info.keys():
-            args_list = method_info[ir_parser.kMethodParameter]
-            in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
-            no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
+        args_list = method_info.params
+        in_args_str = self._getArgListStr("in", args_list, "const ", "&", ",")
+        no_type_in_args_str = self._getNoTypeArgListStr("in", args_list, "", ",")
 
-        temp = Template("""
+        temp = template_registry.get("""
 ErrorCode ${interface}Proxy::${method}(${in_args})
 {
     if (impl_ == nullptr) {
@@ -838,6 +844,6 @@ ErrorCode ${interface}Proxy::${method}(${in_args})
 }
 """)
         return temp.substitute(interface = interface_name,
-                                method = method_info[ir_parser.kMethodName],
+                                method = method_info.name,
                                 in_args = in_args_str,
                                 no_type_in_args = no_type_in_args_str)
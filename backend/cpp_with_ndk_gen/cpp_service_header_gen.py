@@ -1,42 +1,41 @@
 import logging
-from string import Template
 import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.template_registry as template_registry
+import common.code_model as code_model
 from . import cpp_gen_protocol
 
 
 class CppServiceHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppServiceHeaderGenerator, self).__init__(path, base_name, base_name + "Service.h", ir_dict)
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppServiceHeaderGenerator, self).__init__(path, base_name, base_name + "Service.h", module, type_resolver)
 
     def gen(self):
-        print("start to gen service header")
+        logging.info("start to gen service header")
         self._genHeadFileStart("SERVICE")
         self.__genIncAndTypeDefs()
         self._genNameSpaceStart() 
         self.__genDeclarations()
         self._genNameSpaceEnd()
         self._genHeadFileEnd("SERVICE")
+        self._flushGenFile()
 
     def __genIncAndTypeDefs(self):
         content_lines = """
 #include <functional>
 #include "%sCommon.h"
 """ %(self._base_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genDeclarations(self):
         self.__genSessionAndFunc()
         self.__genForwardDecl()       
 
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
-            return
-
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kInterface:
-                self.__genInterfaceDecl(order_item[ir_parser.kName])
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                self.__genInterfaceDecl(item)
 
     def __genSessionAndFunc(self):
         content_lines = """
@@ -64,70 +63,66 @@ using SessionHandler =
 using CommunicationHandler =
     std::function<void(bool available)>;
 """
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genForwardDecl(self):
-        member_str = ""
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            member_str += """
+        member_str = code_model.Fragment()
+        for item in self._module.interfaces:
+            member_str.add("""
 class %sService;
 class %sServiceImpl;
-""" % (item[ir_parser.kName], item[ir_parser.kName])
-        utils.Utils.writeGenFile(self._path, self._file, member_str)
-
-    def __genInterfaceDecl(self, name):
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
+""" % (item.name, item.name))
+        self._writeGenFile(member_str.render())
 
-            self.__genServiceDecl(item)
-            self.__genAbstractServiceDecl(item)
+    def __genInterfaceDecl(self, item):
+        self.__genServiceDecl(item)
+        self.__genAbstractServiceDecl(item)
 
     def __genServiceDecl(self, info):
-        methods_str = ""
-        interface_name = info[ir_parser.kName]
-        for method_item in info[ir_parser.kMethodList]:
-            method_name = method_item[ir_parser.kMethodName]
+        methods_str = code_model.Fragment()
+        interface_name = info.name
+        for method_item in info.methods:
+            method_name = method_item.name
             # idl may support multi return value in future, bug currently only support one
-            if ir_parser.kMethodReturn in method_item.keys():
-                return_type = self._typeConvert(method_item[ir_parser.kMethodReturn][0][ir_parser.kType])
+            return_type = "void"
+            if len(method_item.returns) > 0:
+                return_type = self._typeConvert(method_item.returns[0].type)
 
             args_str = ""
-            if ir_parser.kMethodParameter in method_item.keys():
-                args_str = self._getArgListStr(method_name, method_item[ir_parser.kMethodParameter],
-                                                            "    const ", "&", ",\n")
+            args_str = self._getReceivedArgListStr(method_name, method_item.params,
+                                                        "    const ", "&", ",\n")
 
             # for using XxxReplyer declaration
             if not return_type == "void":
-                methods_str += """
+                methods_str.add("""
     using %sReplyer = std::function<void (const %s& data)>;
-""" % (method_name, return_type)
+""" % (method_name, return_type))
 
             # for using XxxHandler declaration
-            methods_str += """
-    using %sHandler = std::function<void(const SessionContext& ctx""" % (method_name)
+            methods_str.add("""
+    using %sHandler = std::function<void(const SessionContext& ctx""" % (method_name))
 
             if not args_str == "":
-                methods_str += """,
-                            %s""" % (args_str)
+                methods_str.add(""",
+                            %s""" % (args_str))
 
             if not return_type == "void":
-                methods_str += """,
-                            const %sReplyer& replyer""" % (method_name)
-            methods_str += ")>;"
+                methods_str.add(""",
+                            const %sReplyer& replyer""" % (method_name))
+            methods_str.add(")>;")
 
             # for RegisterXxxHandler declaration
-            methods_str += """
+            methods_str.add("""
     void Register%sHandler(const %sHandler& handler);
-""" % (method_name, method_name)
+""" % (method_name, method_name))
 
-        events_str = ""
-        for event_item in info[ir_parser.kEventList]:
-            event_name = event_item[ir_parser.kEventName]
-            args_str = self._getArgListStr(event_name, event_item[ir_parser.kMembers], "\n        const ", "&", ",")
-            events_str += """
+        events_str = code_model.Fragment()
+        for event_item in info.events:
+            event_name = event_item.name
+            args_str = self._getArgListStr(event_name, event_item.members, "\n        const ", "&", ",")
+            events_str.add("""
     void Notify%s(%s);
-""" % (event_name, args_str)
+""" % (event_name, args_str))
 
         content_lines = """
 class %sService final
@@ -152,12 +147,12 @@ private:
     std::shared_ptr<%sServiceImpl> impl_;
 };
 """ %(interface_name, interface_name, interface_name, interface_name, interface_name,
-        interface_name, methods_str, events_str, interface_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)             
+        interface_name, methods_str.render(), events_str.render(), interface_name)
+        self._writeGenFile(content_lines)             
 
     def __genAbstractServiceDecl(self, info):
         replyer_str, handler_str, v_method_api = self.__getAbstractServiceMethod(info)
-        temp = Template("""
+        temp = template_registry.get("""
 class ${interface}AbstractService
 {
 public:
@@ -195,77 +190,66 @@ private:
     void onRequest(PolarisReadableMessage* request);
 
 ${method_handler}
-    void initNameIdMapping();
 private:
     PolarisRuntime* runtime_ = nullptr;
     PolarisService* service_ = nullptr;
-    std::shared_ptr<NameIdMapper> name_id_map_;
 };
 """)
 
-        content = temp.substitute(interface = info[ir_parser.kName],
+        content = temp.substitute(interface = info.name,
                                     replyer = replyer_str,
                                     method_handler = handler_str,
                                     v_method_api = v_method_api,
                                     event = self.__getAbstractServiceEvent(info))
 
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
     def __getAbstractServiceMethod(self, info):
-        replyer = ""
-        handler = ""
-        virtual_api = ""
-
-        if not ir_parser.kMethodList in info.keys():
-            return "", "", ""
+        replyer = code_model.Fragment()
+        handler = code_model.Fragment()
+        virtual_api = code_model.Fragment()
 
-        for method_item in info[ir_parser.kMethodList]:
-            method_name = method_item[ir_parser.kMethodName]
+        for method_item in info.methods:
+            method_name = method_item.name
 
-            handler += """
+            handler.add("""
     void on%s(PolarisReadableMessage* request, const std::string& permission);
-""" %(method_name)
+""" %(method_name))
             in_args_str = ""
-            if ir_parser.kMethodParameter in method_item.keys():
-                in_args_str =  self._getArgListStr(method_name, method_item[ir_parser.kMethodParameter],
-                                                                "\n            const ", "&", ",")
-                if not in_args_str == "":
-                    in_args_str = "," + in_args_str
-            if ir_parser.kMethodReturn in method_item.keys()\
-                and not self._isArgsListEmpty(method_item[ir_parser.kMethodReturn]):
-                out_args_str = self._getArgListStr(method_name, method_item[ir_parser.kMethodReturn],
+            in_args_str =  self._getReceivedArgListStr(method_name, method_item.params,
                                                             "\n            const ", "&", ",")
-                replyer += """
+            if not in_args_str == "":
+                in_args_str = "," + in_args_str
+            if not self._isArgsListEmpty(method_item.returns):
+                out_args_str = self._getArgListStr(method_name, method_item.returns,
+                                                            "\n            const ", "&", ",")
+                replyer.add("""
     using %sReplyer = std::function<void(%s)>; 
-""" %(method_name, out_args_str)
+""" %(method_name, out_args_str))
 
-                virtual_api += """
+                virtual_api.add("""
     virtual void handle%s(
             const SessionContext& ctx%s,
             const %sReplyer& replyer) {}
-""" %(method_name, in_args_str, method_name)
+""" %(method_name, in_args_str, method_name))
             else:
-                virtual_api += """
+                virtual_api.add("""
     virtual void handle%s(
             const SessionContext& ctx%s) {}
-""" %(method_name, in_args_str)
+""" %(method_name, in_args_str))
 
-        return replyer, handler, virtual_api
+        return replyer.render(), handler.render(), virtual_api.render()
 
     def __getAbstractServiceEvent(self, info):
-        result = ""
-        if not ir_parser.kEventList in info.keys():
-            return ""
-
-        for event_item in info[ir_parser.kEventList]:
+        result = code_model.Fragment()
+        for event_item in info.events:
             args_str = ""
-            if ir_parser.kMembers in event_item.keys():
-                event_name = event_item[ir_parser.kEventName]
-                args_str = self._getArgListStr(event_name, event_item[ir_parser.kMembers],
-                                                            "\n            const ", "&", ",")
-                result += """
+            event_name = event_item.name
+            args_str = self._getArgListStr(event_name, event_item.members,
+                                                        "\n            const ", "&", ",")
+            result.add("""
     void Notify%s(%s); 
-""" %(event_name, args_str)
+""" %(event_name, args_str))
 
-        return result
+        return result.render()
   
@@ -1,37 +1,21 @@
 import logging
-from string import Template
 import sys
 sys.path.append("..")
 import common.jsonIr_parser as ir_parser
 import common.utils as utils
+import common.template_registry as template_registry
+import common.code_model as code_model
 from . import cpp_gen_protocol
 
-
-class CppServiceImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
-    def __init__(self, path, base_name, ir_dict):
-        super(CppServiceImplGenerator, self).__init__(path, base_name, base_name + "Service.cpp", ir_dict)
-
-    def gen(self):
-        print("start to gen service impl")
-        self.__genIncAndTypeDefs()
-        self._genNameSpaceStart()
-        self.__genNameIdMapper()
-        self.__genImpl()
-        self._genNameSpaceEnd()
-
-    def __genIncAndTypeDefs(self):
-        content_lines = '''#include "%sService.h"\n''' % (self._base_name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
-
-    def __genNameIdMapper(self, ):
-        content_lines = """
+# helpers of every service impl, in the shard header they are inline so an unused one does not warn
+kNameIdHelpers = template_registry.get("""
 using std::shared_ptr;
 using std::string;
 
-static bool NameToId(void* user_data, const char* name, uint16_t* id)
+${linkage} bool NameToId(void* user_data, const char* name, uint16_t* id)
 {
-    NameIdMapper* object =
-        reinterpret_cast<NameIdMapper*>(user_data);
+    const NameIdTable* object =
+        reinterpret_cast<const NameIdTable*>(user_data);
 
     if (object == nullptr) {
         return false;
@@ -40,10 +24,10 @@ static bool NameToId(void* user_data, const char* name, uint16_t* id)
     return object->FindId(name, id);
 }
 
-static bool IdToName(void* user_data, uint16_t id, const char** name, uint32_t* size)
+${linkage} bool IdToName(void* user_data, uint16_t id, const char** name, uint32_t* size)
 {
-    NameIdMapper* object =
-        reinterpret_cast<NameIdMapper*>(user_data);
+    const NameIdTable* object =
+        reinterpret_cast<const NameIdTable*>(user_data);
 
     if (object == nullptr) {
         return false;
@@ -51,27 +35,74 @@ static bool IdToName(void* user_data, uint16_t id, const char** name, uint32_t*
 
     return object->FindName(id, name, size);
 }
-"""
-        utils.Utils.writeGenFile(self._path, self._file, content_lines) 
+""")
+
+
+# XServiceImpl.h, the part of XService.cpp every shard of it includes
+class CppServiceShardHeaderGenerator(cpp_gen_protocol.CppGeneratorProtocol):
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppServiceShardHeaderGenerator, self).__init__(path, base_name, base_name + "ServiceImpl.h", module, type_resolver)
+
+    def gen(self):
+        logging.info("start to gen service shard header")
+        self._genHeadFileStart("SERVICE_IMPL")
+        self._writeGenFile('''\n#include "%sService.h"\n''' % (self._base_name))
+        self._genNameSpaceStart()
+        self._writeGenFile(kNameIdHelpers.substitute(linkage="static inline"))
+        self._genNameSpaceEnd()
+        self._genHeadFileEnd("SERVICE_IMPL")
+        self._flushGenFile()
+
+
+class CppServiceImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
+    # with a cpp_shard.Shard only the interfaces of that shard are generated, into their own file.
+    # with unity_sink the impl is a part of the unity file, which has the helpers and includes
+    # already, and its codec classes are renamed apart from the proxy's, see cpp_unity_gen
+    def __init__(self, path, base_name, module, type_resolver=None, shard=None, unity_sink=None):
+        file = base_name + "Service.cpp" if shard is None else shard.fileName(base_name, "Service")
+        super(CppServiceImplGenerator, self).__init__(path, base_name, file, module, type_resolver, unity_sink)
+        self._shard = shard
+        self._codec = "Codec" if unity_sink is None else "ServiceCodec"
+
+    def gen(self):
+        if self._shard is None:
+            logging.info("start to gen service impl")
+        else:
+            logging.info("start to gen service impl shard " + self._shard.name)
+        if self._owns_sink:
+            self.__genIncAndTypeDefs()
+        self._genNameSpaceStart()
+        if self._shard is None and self._owns_sink:
+            self.__genNameIdHelpers()
+        self.__genImpl()
+        self._genNameSpaceEnd()
+        self._flushGenFile()
+
+    def __genIncAndTypeDefs(self):
+        header = "Service.h" if self._shard is None else "ServiceImpl.h"
+        content_lines = '''#include "%s%s"\n''' % (self._base_name, header)
+        self._writeGenFile(content_lines)
+
+    def __genNameIdHelpers(self):
+        self._writeGenFile(kNameIdHelpers.substitute(linkage="static"))
 
     def __genImpl(self):
-        if not ir_parser.kDeclarationsOrder in self._ir_dict.keys():
+        if self._shard is not None:
+            for item in self._shard.interfaces(self._module):
+                self.__genInterfaceImpl(item)
             return
-
-        for order_item in self._ir_dict[ir_parser.kDeclarationsOrder]:
-            if order_item[ir_parser.kCategory] == ir_parser.kInterface:
-                self.__genInterfaceImpl(order_item[ir_parser.kName])
+        for item in self._module.declarations_order:
+            if item.category == ir_parser.kInterface:
+                self.__genInterfaceImpl(item)
     
-    def __genInterfaceImpl(self, name):
-        for item in self._ir_dict[ir_parser.kInterfaceDeclarations]:
-            if not item[ir_parser.kName] == name:
-                continue
-            self.__genStaticHandlerDecl(name)
-            self.__genCodec(item)
-            self.__genImplClass(item)
-            self.__genStaticHandlerImpl(name)
-            self.__genServiceClass(item)
-            self.__genAbstractServiceImpl(item)
+    def __genInterfaceImpl(self, item):
+        name = item.name
+        self.__genStaticHandlerDecl(name)
+        self.__genCodec(item)
+        self.__genImplClass(item)
+        self.__genStaticHandlerImpl(name)
+        self.__genServiceClass(item)
+        self.__genAbstractServiceImpl(item)
 
     def __genStaticHandlerDecl(self, name):
         content_lines = """
@@ -82,10 +113,10 @@ static void %sSessionHandler(
 static void %sCommHandler(
             void* user_data, bool available);
 """ %(name, name, name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genStaticHandlerImpl(self, name):
-        temp = Template("""
+        temp = template_registry.get("""
 static void ${interface_name}RequestHandler(
     void* user_data, PolarisReadableMessage* message)
 {
@@ -133,35 +164,31 @@ static void ${interface_name}CommHandler(
 
 """)
         content_lines = temp.substitute(interface_name = name)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+        self._writeGenFile(content_lines)
 
     def __genCodec(self, interface_info):
-        interface_name = interface_info[ir_parser.kName]
+        interface_name = interface_info.name
         method_str = self.__getCodecMethodStr(interface_info)
         event_str = self.__getCodecEventStr(interface_info)
         content_lines = """
-class %sCodec
+class %s%s
 {
 public:
 %s
 %s
 };
-""" %(interface_name, method_str, event_str)
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+""" %(interface_name, self._codec, method_str, event_str)
+        self._writeGenFile(content_lines)
 
     def __getCodecMethodStr(self, interface_info):
-        result = ""
-        if not ir_parser.kMethodList in interface_info.keys():
-            return result
-
-        for method_item in interface_info[ir_parser.kMethodList]:
-            method_name = method_item[ir_parser.kMethodName]
+        result = code_model.Fragment()
+        for method_item in interface_info.methods:
+            method_name = method_item.name
 
-            if not ir_parser.kMethodReturn in method_item.keys()\
-                or self._isArgsListEmpty(method_item[ir_parser.kMethodReturn]):
+            if self._isArgsListEmpty(method_item.returns):
                 continue
             # idl may support multi return value in future, bug currently only support one
-            temp = Template("""
+            temp = template_registry.get("""
     static void ${method}ReplyDecorator(
         void* user_data, PolarisWritableMessage* message)
     {
@@ -177,25 +204,21 @@ public:
         message->serialize_end(message);
     }
 """)
-            result += temp.substitute(method=method_name, interface=interface_info[ir_parser.kName])
-        return result
+            result.add(temp.substitute(method=method_name, interface=interface_info.name))
+        return result.render()
 
     def __getCodecEventStr(self, interface_info):
-        result = ""
-        if not ir_parser.kEventList in interface_info.keys():
-            return result
-
-        for event_item in interface_info[ir_parser.kEventList]:
-            event_name = event_item[ir_parser.kEventName]
-            event_data = ""
-            if not ir_parser.kMembers in event_item.keys() \
-                or self._isArgsListEmpty(event_item[ir_parser.kMembers]):
+        result = code_model.Fragment()
+        for event_item in interface_info.events:
+            event_name = event_item.name
+            event_data = code_model.Fragment()
+            if self._isArgsListEmpty(event_item.members):
                 continue
             
-            for member in event_item[ir_parser.kMembers]:                    
-                event_data += "        writer.Write(argument->%s);\n" %(member[ir_parser.kName])
+            for member in event_item.members:                    
+                event_data.add("        writer.Write(argument->%s);\n" %(member.name))
 
-            temp = Template("""
+            temp = template_registry.get("""
     static void ${event}NotifyDecorator(
         void* user_data, PolarisWritableMessage* message)
     {
@@ -212,31 +235,30 @@ ${event_data}
 
     }    
 """)
-            result += temp.substitute(event=event_name, interface=interface_info[ir_parser.kName], 
-            event_data = event_data, num = len(event_item[ir_parser.kMembers]))
-        return result
+            result.add(temp.substitute(event=event_name, interface=interface_info.name, 
+            event_data = event_data.render(), num = len(event_item.members)))
+        return result.render()
 
     def __genImplClass(self, interface_info):
-        temp = Template("""
+        temp = template_registry.get("""
 class ${interface_name}ServiceImpl final
 {
 public:
     ${interface_name}ServiceImpl()
     {
         runtime_ = PolarisCreateRuntime();
-        name_id_map_ = std::make_shared<NameIdMapper>();
 
-        if (runtime_ == nullptr || name_id_map_ == nullptr) {
+        if (runtime_ == nullptr) {
             return;
         }
 
-        initNameIdMapping();
-
+        // the runtime only reads the table, the callbacks take it as const again
+        void* name_ids = const_cast<NameIdTable*>(&k${interface_name}NameIds);
         PolarisServiceIdentifier identifier;
         identifier.service_name = "${namespace}.${interface_name}";
         service_ = PolarisCreateService(runtime_, &identifier, POLARIS_CHANNEL_DDS,
-                                       IdToName, &name_id_map_,
-                                       NameToId,  &name_id_map_);
+                                       IdToName, name_ids,
+                                       NameToId,  name_ids);
     }
 
     ~${interface_name}ServiceImpl()
@@ -303,19 +325,6 @@ ${method}
 ${event}
 
 private:
-    void initNameIdMapping()
-    {
-        std::vector<std::string> all_names = {${method_event_names}
-                                             };
-
-        for(size_t i = 0; i < all_names.size(); i++) {
-            name_id_map_->InsertNameId(all_names[i], i);
-            name_id_map_->InsertIdName(i, all_names[i]);
-        }
-    }
-
-private:
-    std::shared_ptr<NameIdMapper> name_id_map_;
     PolarisRuntime* runtime_ = nullptr;
     PolarisService* service_ = nullptr;
 
@@ -326,54 +335,57 @@ ${member_variable_handler}
 """)
         method_str, member_variable_handler_str = self.__getImplClassMethodStr(interface_info)
         content_lines = temp.substitute(namespace = self._full_name_space,
-                                        interface_name=interface_info[ir_parser.kName],
+                                        interface_name=interface_info.name,
                                         method = method_str,
                                         member_variable_handler = member_variable_handler_str,
-                                        event = self.__getImplClassEventStr(interface_info),
-                                        method_event_names = self._getMethodEventNamesStr(interface_info,
-                                                            "\n                                    ", ","))
-        utils.Utils.writeGenFile(self._path, self._file, content_lines)
+                                        event = self.__getImplClassEventStr(interface_info))
+        self._writeGenFile(content_lines)
         
     def __getImplClassMethodStr(self, interface_info):
-        method_str = ""
-        interface_name = interface_info[ir_parser.kName]
-        request_str = ""
-        register_str = ""
-        handler_str = ""
-        member_variable_handler_str = ""
-
-        if ir_parser.kMethodList in interface_info.keys():
-            for method in interface_info[ir_parser.kMethodList]:
-                method_name = method[ir_parser.kMethodName]
-                request_str += self.__getImplClassMethodReqStr(request_str=="", method_name)
-                register_str += self.__getImplClassMethodRegStr(interface_name, method_name)
-                handler_str += self.__getImplClassMethodHandlerStr(interface_name, method)
-                member_variable_handler_str += "\n    %sService::%sHandler %s_handler_;" % (interface_name, method_name, method_name)
-        method_str += """
+        method_str = code_model.Fragment()
+        interface_name = interface_info.name
+        request_str = code_model.Fragment()
+        register_str = code_model.Fragment()
+        handler_str = code_model.Fragment()
+        member_variable_handler_str = code_model.Fragment()
+
+        for method_id, method in enumerate(interface_info.methods):
+            method_name = method.name
+            request_str.add(self.__getImplClassMethodReqStr(method_id, method_name))
+            register_str.add(self.__getImplClassMethodRegStr(interface_name, method_name))
+            handler_str.add(self.__getImplClassMethodHandlerStr(interface_name, method))
+            member_variable_handler_str.add("\n    %sService::%sHandler %s_handler_;" % (interface_name, method_name, method_name))
+        method_str.add("""
     void OnRequest(PolarisReadableMessage* request)
     {
-        std::string request_name = request->get_name(request);
-%s
+        uint16_t request_id = 0;
+
+        if (!k%sNameIds.FindId(request->get_name(request), &request_id)) {
+            return;
+        }
+
+        switch (request_id) {%s
+        default:
+            break;
+        }
     }
 %s
 %s    
-""" % (request_str, register_str, handler_str)
-        return method_str, member_variable_handler_str
+""" % (interface_name, request_str.render(), register_str.render(), handler_str.render()))
+        return method_str.render(), member_variable_handler_str.render()
 
     def __getImplClassEventStr(self, interface_info):
-        result = ""
+        result = code_model.Fragment()
     
-        if ir_parser.kEventList in interface_info.keys():            
-            no_type_in_args = ""
-            for item in interface_info[ir_parser.kEventList]:
-                in_args = ""
-                event_name = item[ir_parser.kEventName]
-                if ir_parser.kMembers in item \
-                    and not self._isArgsListEmpty(item[ir_parser.kMembers]):
-                    args_list = item[ir_parser.kMembers]
-                    no_type_in_args = self._getNoTypeArgListStr("in", args_list, "", ",")
-                    in_args = self._getArgListStr("in", args_list, "const ", "&", ",")
-                    temp = Template("""
+        no_type_in_args = ""
+        for item in interface_info.events:
+            in_args = ""
+            event_name = item.name
+            if not self._isArgsListEmpty(item.members):
+                args_list = item.members
+                no_type_in_args = self._getNoTypeArgListStr("in", args_list, "", ",")
+                in_args = self._getArgListStr("in", args_list, "const ", "&", ",")
+                temp = template_registry.get("""
     void Notify${event}(${in_args})
     {
         if (service_ == nullptr) {
@@ -382,11 +394,11 @@ ${member_variable_handler}
 
         ${interface}_${event}_Notify argument = {${no_type_in_args}};
         service_->notify(service_, "${event}",
-                        ${interface}Codec::${event}NotifyDecorator, &argument);
+                        ${interface}${codec}::${event}NotifyDecorator, &argument);
     }  
 """)
-                else:
-                    temp = Template("""
+            else:
+                temp = template_registry.get("""
     void Notify${event}(${in_args})
     {
         if (service_ == nullptr) {
@@ -396,29 +408,20 @@ ${member_variable_handler}
         service_->notify(service_, "${event}", nullptr, nullptr);
     }  
 """) 
-                result += temp.substitute(interface = interface_info[ir_parser.kName],
-                                            event = event_name, in_args = in_args,
-                                            no_type_in_args = no_type_in_args)
-        return result
-
-    def __getImplClassMethodReqStr(self, is_first, method_name):
-        result = ""
-        if is_first:
-            result = """
-        if (request_name == "%s") {
-            std::string permission = "";
-            Handle%s(request, permission);
-        }
-""" %(method_name, method_name)
-        else:
-            result = """
-        else if (request_name == "%s") {
+            result.add(temp.substitute(interface = interface_info.name,
+                                        event = event_name, in_args = in_args,
+                                        codec = self._codec,
+                                        no_type_in_args = no_type_in_args))
+        return result.render()
+
+    # a method has the id of its place in the method list, see cpp_name_table.interfaceNames
+    def __getImplClassMethodReqStr(self, method_id, method_name):
+        return """
+        case %d: {  // %s
             std::string permission = "";
             Handle%s(request, permission);
-        }
-""" %(method_name, method_name)
-
-        return result
+            break;
+        }""" %(method_id, method_name, method_name)
 
     def __getImplClassMethodRegStr(self, interface_name, method_name):
         return """
@@ -429,49 +432,51 @@ ${member_variable_handler}
 """ % (method_name, interface_name, method_name, method_name)
 
     def __getImplClassMethodHandlerStr(self, interface_name, method_info):
-        method_name = method_info[ir_parser.kMethodName]
-        reader_str = ""
+        method_name = method_info.name
+        reader_str = code_model.Fragment()
         in_args_str = ""
 
-        if ir_parser.kMethodParameter in method_info.keys()\
-            and not self._isArgsListEmpty(method_info[ir_parser.kMethodParameter]):
-            args_list = method_info[ir_parser.kMethodParameter]
+        if not self._isArgsListEmpty(method_info.params):
+            args_list = method_info.params
             in_args_str = "," + self._getNoTypeArgListStr("in", args_list, "", ",")
 
-            for arg in method_info[ir_parser.kMethodParameter]:
-                arg_type = self._typeConvert(arg[ir_parser.kType])
-                arg_name = arg[ir_parser.kName]
+            for arg in method_info.params:
+                cpp_type = self._type_resolver.resolve(arg.type)
+                arg_type = cpp_type.spelling
+                arg_name = arg.name
                 if arg_type == "void":
-                    reader_str = ""
+                    reader_str = code_model.Fragment()
                     break
-                reader_str += """                
+                if cpp_type.view is not None:
+                    reader_str.add("\n" + self._getReadViewArgStr(cpp_type, arg_name, "        "))
+                    continue
+                reader_str.add("""                
         %s %s;
         reader.Read(&%s);                
-""" %(arg_type, arg_name, arg_name)
+""" %(arg_type, arg_name, arg_name))
 
-        reply_str = ""
+        reply_str = code_model.Fragment()
         out_args_str = ""
         no_type_out_args_str = ""
         reply_handler_str = ""
-        if ir_parser.kMethodReturn in method_info.keys() \
-            and not self._isArgsListEmpty(method_info[ir_parser.kMethodReturn]):
-            args_list = method_info[ir_parser.kMethodReturn]
+        if not self._isArgsListEmpty(method_info.returns):
+            args_list = method_info.returns
             no_type_out_args_str = self._getNoTypeArgListStr("out", args_list, "", ",")
             out_args_str = self._getArgListStr("out", args_list, "const ", "&", ",")            
             reply_handler_str = "," + "handler"
-            temp = Template("""
+            temp = template_registry.get("""
         auto handler = [this, cloned_request](${out_args})
         {
             ${interface}_${method}_Resp argument = {${no_type_out_args}};
             service_->reply(service_, cloned_request,
-                            ${interface}Codec::${method}ReplyDecorator, &argument);
+                            ${interface}${codec}::${method}ReplyDecorator, &argument);
             PolarisDestroySyncReplyMessage(cloned_request);
         };
 """)
-            reply_str += temp.substitute(method=method_name, interface=interface_name, out_args = out_args_str,
-                                            no_type_out_args = no_type_out_args_str)
+            reply_str.add(temp.substitute(method=method_name, interface=interface_name, out_args = out_args_str,
+                                            no_type_out_args = no_type_out_args_str, codec = self._codec))
 
-        temp = Template("""
+        temp = template_registry.get("""
     void Handle${method}(PolarisReadableMessage* request, const std::string& permission)
     {
         if (${method}_handler_ == nullptr) {
@@ -501,12 +506,12 @@ ${reply_content}
     }
 """)
         return temp.substitute(method=method_name, interface=interface_name, 
-                                in_args = in_args_str, reader_content = reader_str,
+                                in_args = in_args_str, reader_content = reader_str.render(),
                                 reply_handler = reply_handler_str,
-                                reply_content = reply_str)
+                                reply_content = reply_str.render())
 
     def __genServiceClass(self, interface_info):
-        temp = Template("""
+        temp = template_registry.get("""
 ${interface}Service::${interface}Service()
     : impl_(std::make_shared<${interface}ServiceImpl>()) {}
 void ${interface}Service::RegisterSessionHandler(const SessionHandler& handler)
@@ -542,29 +547,28 @@ void ${interface}Service::Stop()
 ${register_handler}
 ${notify}
 """)
-        content = temp.substitute(interface = interface_info[ir_parser.kName],
+        content = temp.substitute(interface = interface_info.name,
                                     register_handler = self.__getServiceClassRegHandlerStr(interface_info),
                                     notify = self.__getServiceClassNotifyStr(interface_info))
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
     def __genAbstractServiceImpl(self, interface_info):
-        temp = Template("""
+        temp = template_registry.get("""
 ${interface}AbstractService::${interface}AbstractService()
 {
     runtime_ = PolarisCreateRuntime();
-    name_id_map_ = std::make_shared<NameIdMapper>();
 
-    if (runtime_ == nullptr || name_id_map_ == nullptr) {
+    if (runtime_ == nullptr) {
         return;
     }
 
-    initNameIdMapping();
-
+    // the runtime only reads the table, the callbacks take it as const again
+    void* name_ids = const_cast<NameIdTable*>(&k${interface}NameIds);
     PolarisServiceIdentifier identifier;
     identifier.service_name = "${namespace}.${interface}";
     service_ = PolarisCreateService(runtime_, &identifier, POLARIS_CHANNEL_DDS,
-                                   IdToName, &name_id_map_,
-                                   NameToId,  &name_id_map_);
+                                   IdToName, name_ids,
+                                   NameToId,  name_ids);
 }
 
 ${interface}AbstractService::~${interface}AbstractService()
@@ -606,8 +610,16 @@ void ${interface}AbstractService::Stop()
 
 void ${interface}AbstractService::onRequest(PolarisReadableMessage* request)
 {
-    std::string request_name = request->get_name(request);
-${request_case}
+    uint16_t request_id = 0;
+
+    if (!k${interface}NameIds.FindId(request->get_name(request), &request_id)) {
+        return;
+    }
+
+    switch (request_id) {${request_case}
+    default:
+        break;
+    }
 }
 
 void ${interface}AbstractService::${interface}RequestHandler(
@@ -654,114 +666,87 @@ void ${interface}AbstractService::${interface}CommHandler(
     bool status = available > 0 ? true : false;
     service->handleCommStatus(status);
 }
-
-void ${interface}AbstractService::initNameIdMapping()
-{
-    std::vector<std::string> all_names = {${method_event_names}
-                                         };
-
-    for(size_t i = 0; i < all_names.size(); i++) {
-        name_id_map_->InsertNameId(all_names[i], i);
-        name_id_map_->InsertIdName(i, all_names[i]);
-    }
-}
 ${on_methods}
 ${notifys}
 """)
 
 
-        content = temp.substitute(interface = interface_info[ir_parser.kName],
+        content = temp.substitute(interface = interface_info.name,
                                     request_case = self.__getAbstractServiceReqCase(interface_info),
                                     namespace = self._full_name_space,
-                                    method_event_names = self._getMethodEventNamesStr(interface_info,
-                                                            "\n                                    ", ","),
                                     on_methods = self.__getAbstractServiceMethods(interface_info),
                                     notifys = self.__getAbstractServiceEvents(interface_info))
-        utils.Utils.writeGenFile(self._path, self._file, content)
+        self._writeGenFile(content)
 
+    # a method has the id of its place in the method list, see cpp_name_table.interfaceNames
     def __getAbstractServiceReqCase(self, interface_info):
-        is_first = True
-        result = ""
-
-        if not ir_parser.kMethodList in interface_info.keys():
-            return ""
+        result = code_model.Fragment()
 
-        for method in interface_info[ir_parser.kMethodList]:
-            method_name = method[ir_parser.kMethodName]
-
-            if is_first:
-                is_first = False
-                result += """
-    if (request_name == "%s") {
-        std::string permission = "";
-        on%s(request, permission);
-    }
-""" %(method_name, method_name)
-            else:
-                result += """
-    else if (request_name == "%s") {
+        for method_id, method in enumerate(interface_info.methods):
+            result.add("""
+    case %d: {  // %s
         std::string permission = "";
         on%s(request, permission);
-    }
-""" %(method_name, method_name)
+        break;
+    }""" %(method_id, method.name, method.name))
 
-        return result
+        return result.render()
 
     def __getAbstractServiceMethods(self, interface_info):
-        result = ""
+        result = code_model.Fragment()
         in_args_str = ""
 
-        if not ir_parser.kMethodList in interface_info.keys():
-            return ""
-
-        for item in interface_info[ir_parser.kMethodList]:
+        for item in interface_info.methods:
             in_args_str = ""
             out_args_str = ""
             no_type_out_args_str = ""
-            reader_str = ""
+            reader_str = code_model.Fragment()
 
-            if ir_parser.kMethodParameter in item.keys()\
-                and not self._isArgsListEmpty(item[ir_parser.kMethodParameter]):
-                args_list = item[ir_parser.kMethodParameter]
+            if not self._isArgsListEmpty(item.params):
+                args_list = item.params
                 in_args_str = "," + self._getNoTypeArgListStr("in", args_list, "", ",")
 
                 for arg in args_list:
-                    arg_type = self._typeConvert(arg[ir_parser.kType])
-                    arg_name = arg[ir_parser.kName]
+                    cpp_type = self._type_resolver.resolve(arg.type)
+                    arg_type = cpp_type.spelling
+                    arg_name = arg.name
                     if arg_type == "void":
-                        reader_str = ""
+                        reader_str = code_model.Fragment()
                         break
-                    reader_str += """                
+                    if cpp_type.view is not None:
+                        reader_str.add("\n" + self._getReadViewArgStr(cpp_type, arg_name, "    "))
+                        continue
+                    reader_str.add("""                
     %s %s;
     reader.Read(&%s);                
-""" %(arg_type, arg_name, arg_name)
+""" %(arg_type, arg_name, arg_name))
 
-            if ir_parser.kMethodReturn in item.keys()\
-                and not self._isArgsListEmpty(item[ir_parser.kMethodReturn]):
-                args_list = item[ir_parser.kMethodReturn]
+            if not self._isArgsListEmpty(item.returns):
+                args_list = item.returns
                 out_args_str = self._getArgListStr("out", args_list, "\n            const ", "&", ",")
                 no_type_out_args_str = self._getNoTypeArgListStr("out", args_list, "\n                ", ",")
-                temp = Template("""
+                temp = template_registry.get("""
     auto handler = [this, cloned_request](${out_args_str}) {
         ${interface}_${method}_Resp argument = {${no_type_out_args_str}
                                                        };
         service_->reply(service_, cloned_request,
-                        ${interface}Codec::${method}ReplyDecorator, &argument);
+                        ${interface}${codec}::${method}ReplyDecorator, &argument);
         PolarisDestroySyncReplyMessage(cloned_request);
     };
     handle${method}(ctx${in_args_str}, handler); 
 """)
             else:
-                temp = Template("""
+                temp = template_registry.get("""
     handle${method}(ctx${in_args_str}); 
 """)
-            handler_str = temp.substitute(interface = interface_info[ir_parser.kName],
-                                            method = item[ir_parser.kMethodName],
+            handler_str = temp.substitute(interface = interface_info.name,
+                                            method = item.name,
+                                            codec = self._codec,
                                             out_args_str = out_args_str,
                                             in_args_str = in_args_str,
                                             no_type_out_args_str = no_type_out_args_str)
                 
-            temp = Template("""
+            temp = template_registry.get("""
 void ${interface}AbstractService::on${method}(PolarisReadableMessage* request, const std::string& permission)
 {
     MessageReader reader(request);
@@ -785,29 +770,25 @@ ${reader_str}
 ${handler_str}
 }
 """)
-            result += temp.substitute(interface = interface_info[ir_parser.kName],
-                                  method = item[ir_parser.kMethodName],
-                                  reader_str = reader_str,
-                                  handler_str = handler_str)
+            result.add(temp.substitute(interface = interface_info.name,
+                                  method = item.name,
+                                  reader_str = reader_str.render(),
+                                  handler_str = handler_str))
 
-        return result
+        return result.render()
 
     def __getAbstractServiceEvents(self, interface_info):
-        result = ""
-        if not ir_parser.kMethodList in interface_info.keys():
-            return ""
-
-        for item in interface_info[ir_parser.kEventList]:
+        result = code_model.Fragment()
+        for item in interface_info.events:
             args = ""
             no_type_args = ""
 
-            if ir_parser.kMembers in item \
-                and not self._isArgsListEmpty(item[ir_parser.kMembers]):
-                args_list = item[ir_parser.kMembers]
+            if not self._isArgsListEmpty(item.members):
+                args_list = item.members
                 args = self._getArgListStr("in", args_list, "\n        const ", "&", ",")
                 no_type_args = self._getNoTypeArgListStr("in", args_list, "", ",")
 
-                temp = Template("""
+                temp = template_registry.get("""
 void ${interface}AbstractService::Notify${event}(${args})
 {
     if (service_ == nullptr) {
@@ -816,12 +797,12 @@ void ${interface}AbstractService::Notify${event}(${args})
 
     ${interface}_${event}_Notify argument = {${no_type_args}};
     service_->notify(service_, "${event}",
-                     ${interface}Codec::${event}NotifyDecorator, &argument);
+                     ${interface}${codec}::${event}NotifyDecorator, &argument);
 }
 
 """)
             else:
-                temp = Template("""
+                temp = template_registry.get("""
 void ${interface}AbstractService::Notify${event}()
 {
     if (service_ == nullptr) {
@@ -832,19 +813,17 @@ void ${interface}AbstractService::Notify${event}()
                      nullptr, nullptr);
 }
 """)  
-            result += temp.substitute(interface = interface_info[ir_parser.kName],
-                                        event = item[ir_parser.kEventName],
+            result.add(temp.substitute(interface = interface_info.name,
+                                        event = item.name,
+                                        codec = self._codec,
                                         args = args,
-                                        no_type_args = no_type_args)
-        return result
+                                        no_type_args = no_type_args))
+        return result.render()
 
     def __getServiceClassRegHandlerStr(self, interface_info):
-        result = ""
-        if not ir_parser.kMethodList in interface_info.keys():
-            return result
-
-        for item in interface_info[ir_parser.kMethodList]:
-            temp = Template("""
+        result = code_model.Fragment()
+        for item in interface_info.methods:
+            temp = template_registry.get("""
 void ${interface}Service::Register${method}Handler(
     const ${method}Handler& handler)
 {
@@ -853,21 +832,18 @@ void ${interface}Service::Register${method}Handler(
     }
 }
 """)
-            result += temp.substitute(interface = interface_info[ir_parser.kName],
-                                        method = item[ir_parser.kMethodName])
+            result.add(temp.substitute(interface = interface_info.name,
+                                        method = item.name))
 
 
-        return result
+        return result.render()
 
     def __getServiceClassNotifyStr(self, interface_info):
-        result = ""
-        if not ir_parser.kEventList in interface_info.keys():
-            return result
-
-        for item in interface_info[ir_parser.kEventList]:
-            event_name = item[ir_parser.kEventName]
-            args_list = item[ir_parser.kMembers]
-            temp = Template("""
+        result = code_model.Fragment()
+        for item in interface_info.events:
+            event_name = item.name
+            args_list = item.members
+            temp = template_registry.get("""
 void ${interface}Service::Notify${event}(
 ${out_args})
 {
@@ -878,6 +854,6 @@ ${out_args})
 """)
             out_args_str = self._getArgListStr("out", args_list, "    const ", "&", ",")
             no_type_out_args_str = self._getNoTypeArgListStr("out", args_list, "", ",")
-            result += temp.substitute(interface = interface_info[ir_parser.kName], event = event_name,
-                                    out_args = out_args_str, no_type_out_args = no_type_out_args_str)
-        return result
\ No newline at end of file
+            result.add(temp.substitute(interface = interface_info.name, event = event_name,
+                                    out_args = out_args_str, no_type_out_args = no_type_out_args_str))
+        return result.render()
\ No newline at end of file
@@ -0,0 +1,47 @@
+import sys
+sys.path.append("..")
+import common.jsonIr_parser as ir_parser
+
+# sharding splits the service and proxy implementation of a module into one .cpp per group of
+# interfaces, so a large idl compiles on several cores and a change recompiles only its shard.
+# an interface is never split, its impl class has to be in one translation unit
+
+# shard every interface on its own
+kShardPerInterface = 0
+
+
+class Shard:
+    __slots__ = ("name", "interface_names")
+
+    # name is the first interface of the shard, so the file of an unchanged interface keeps
+    # its name when interfaces are added elsewhere
+    def __init__(self, name, interface_names):
+        self.name = name
+        self.interface_names = interface_names
+
+    def fileName(self, base_name, kind):
+        return "%s%s_%s.cpp" % (base_name, kind, self.name)
+
+    def interfaces(self, module):
+        return [module.findDeclaration(ir_parser.kInterface, name) for name in self.interface_names]
+
+
+# interfaces of module in declaration order, packed into shards of about methods_per_shard
+# methods and events. an interface bigger than that gets a shard of its own
+def planShards(module, methods_per_shard=kShardPerInterface):
+    shards = []
+    names = []
+    weight = 0
+    for item in module.declarations_order:
+        if item.category != ir_parser.kInterface:
+            continue
+        item_weight = max(1, len(item.methods) + len(item.events))
+        if len(names) > 0 and weight + item_weight > methods_per_shard:
+            shards.append(Shard(names[0], names))
+            names = []
+            weight = 0
+        names.append(item.name)
+        weight += item_weight
+    if len(names) > 0:
+        shards.append(Shard(names[0], names))
+    return shards
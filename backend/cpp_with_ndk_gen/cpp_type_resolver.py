@@ -0,0 +1,112 @@
+import sys
+sys.path.append("..")
+import common.code_model as code_model
+
+# --views: spelling -> (view type a handler or callback receives, holder type the generated code
+# reads into). the view borrows the buffer of the holder, see MessageReader in XCommon.h
+kViewTypes = {
+    "std::string": ("std::string_view", "BorrowedString"),
+    "BytesBuffer": ("ByteView", "BorrowedBytes"),
+}
+
+# resolved c++ spelling of one idl type, interned so equal types share one instance
+class CppType:
+    __slots__ = ("spelling", "is_void", "is_sequence", "sequence_size", "element", "view")
+
+    def __init__(self, spelling, sequence_size=0, element=None, view=None):
+        self.spelling = spelling
+        self.is_void = spelling == "void"
+        self.is_sequence = sequence_size != 0
+        self.sequence_size = sequence_size
+        self.element = element
+        # (view spelling, holder spelling) when received as a view, None when received as is
+        self.view = view
+
+
+# resolves ir_model.TypeRef nodes to CppType once, so every generator of a module can share the result
+class CppTypeResolver:
+    # views makes top level strings and byte buffers received by handlers and callbacks views,
+    # elements of sequences and members of structs stay owning
+    def __init__(self, type_mapping, views=False):
+        self._type_mapping = type_mapping
+        self.views = views
+        # (leaf name, 0) or (element CppType, sequence_size) -> CppType
+        self._interned = {}
+        # id(TypeRef) -> (TypeRef, CppType), the node is kept so its id is never reused
+        self._nodes = {}
+        # rendered snippets of the module, shared by its generators just like the types
+        self.snippets = code_model.SnippetCache()
+
+    def resolve(self, type_ref):
+        entry = self._nodes.get(id(type_ref))
+        if entry is not None:
+            return entry[1]
+
+        cpp_type = self.__resolveNode(type_ref)
+        self._nodes[id(type_ref)] = (type_ref, cpp_type)
+        return cpp_type
+
+    # resolve every type node of the module up front
+    def resolveModule(self, module):
+        for item in module.consts:
+            self.resolve(item.type)
+        for item in module.structs:
+            self.__resolveArgs(item.members)
+        for item in module.unions:
+            if item.select_type is not None:
+                self.resolve(item.select_type)
+            self.__resolveArgs(item.members)
+        for item in module.interfaces:
+            for method in item.methods:
+                self.__resolveArgs(method.returns)
+                self.__resolveArgs(method.params)
+            for event in item.events:
+                self.__resolveArgs(event.members)
+
+    def internedCount(self):
+        return len(self._interned)
+
+    def __resolveArgs(self, args):
+        for arg in args:
+            if arg.type is not None:
+                self.resolve(arg.type)
+
+    def __resolveNode(self, type_ref):
+        # has subtype with 'sequence'
+        if type_ref.element is not None:
+            element = self.resolve(type_ref.element)
+            if type_ref.sequence_size == 0:
+                return element
+            return self.__intern(element, type_ref.sequence_size)
+
+        # has not subtype with 'sequence'
+        leaf = self.__internLeaf(type_ref.name)
+        if type_ref.sequence_size == 0:
+            return leaf
+        return self.__intern(leaf, type_ref.sequence_size)
+
+    def __internLeaf(self, name):
+        key = (name, 0)
+        cpp_type = self._interned.get(key)
+        if cpp_type is None:
+            # if type is empty, it is void
+            spelling = self._type_mapping.get(name, name)
+            if spelling == "":
+                spelling = "void"
+            cpp_type = CppType(spelling, view=kViewTypes.get(spelling) if self.views else None)
+            self._interned[key] = cpp_type
+        return cpp_type
+
+    def __intern(self, element, sequence_size):
+        key = (element, sequence_size)
+        cpp_type = self._interned.get(key)
+        if cpp_type is None:
+            if sequence_size > 0:
+                # it's an array
+                spelling = """std::array<%s, %d>""" % (element.spelling, sequence_size)
+            else:
+                # it's a vector
+                spelling = """std::vector<%s>""" % (element.spelling)
+            cpp_type = CppType(spelling, sequence_size, element)
+            self._interned[key] = cpp_type
+        return cpp_type
@@ -0,0 +1,45 @@
+import logging
+import sys
+sys.path.append("..")
+from . import cpp_gen_protocol
+from . import cpp_common_impl_gen
+from . import cpp_service_impl_gen
+from . import cpp_proxy_impl_gen
+
+# parts of XUnity.cpp, in this order. each writes what its own .cpp would have, without the
+# includes and helpers the unity file has once at its top
+kUnityParts = [
+    cpp_common_impl_gen.CppCommonImplGenerator,
+    cpp_service_impl_gen.CppServiceImplGenerator,
+    cpp_proxy_impl_gen.CppProxyImplGenerator,
+]
+
+
+# XUnity.cpp, XCommon.cpp, XService.cpp and XProxy.cpp as one translation unit, so the
+# headers are parsed once instead of three times. it has an include guard, so a bundle of
+# several idls (see common/batch.py) may include it like a header
+class CppUnityImplGenerator(cpp_gen_protocol.CppGeneratorProtocol):
+    def __init__(self, path, base_name, module, type_resolver=None):
+        super(CppUnityImplGenerator, self).__init__(path, base_name, base_name + "Unity.cpp", module, type_resolver)
+
+    def gen(self):
+        logging.info("start to gen unity impl")
+        guard = "%s_%s_UNITY_CPP_" % (self._head_include_prefix, self._base_name.upper())
+        self._writeGenFile('''#ifndef %s
+#define %s
+
+#include "%sService.h"
+#include "%sProxy.h"
+#include <mutex>
+''' % (guard, guard, self._base_name, self._base_name))
+        self._genNameSpaceStart()
+        self._writeGenFile(cpp_service_impl_gen.kNameIdHelpers.substitute(linkage="static"))
+        self._writeGenFile(cpp_proxy_impl_gen.kProxyOwnHelpers.substitute(linkage="static"))
+        self._genNameSpaceEnd()
+
+        for part_class in kUnityParts:
+            part_class(self._path, self._base_name, self._module, self._type_resolver,
+                       unity_sink=self._sink).gen()
+
+        self._writeGenFile("\n#endif  // %s\n" % (guard))
+        self._flushGenFile()
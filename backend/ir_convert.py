@@ -0,0 +1,40 @@
+import sys
+import json
+import logging
+import argparse
+sys.path.append("..")
+import common.ir_binary as ir_binary
+import common.output_sink as output_sink
+
+# converts an ir between the json and the binary format (see common/ir_binary.py), the
+# direction follows from the input. json is written in the layout idlc writes
+
+
+def convert(input_path, output_path):
+    if ir_binary.isBinaryIR(input_path):
+        with ir_binary.BinaryIRReader(input_path) as reader:
+            value = reader.value()
+        content = (json.dumps(value, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+    else:
+        with open(input_path, 'rb') as f:
+            content = ir_binary.encode(json.load(f))
+
+    output_sink.writeIfChanged(output_path, content)
+
+
+def main(argv):
+    arg_parser = argparse.ArgumentParser(description="convert an ir between the json and the binary format")
+    arg_parser.add_argument("input", help="json or binary ir")
+    arg_parser.add_argument("output", help="the ir in the other format")
+    args = arg_parser.parse_args(argv)
+
+    try:
+        convert(args.input, args.output)
+    except (OSError, ValueError, TypeError) as e:
+        logging.error("failed to convert %s: %s" % (args.input, e))
+        return 1
+    return 0
+
+
+if __name__=="__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,39 @@
+import os
+import sys
+import json
+
+kBackendDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(kBackendDir)
+sys.path.append(os.path.join(kBackendDir, "benchmark"))
+import synth_ir
+
+# irs and helpers shared by the tests of the ir readers
+
+# synthetic irs covering every declaration kind and nested sequences
+kIRParams = {
+    "small": synth_ir.kWorkloads["small"],
+    "mixed": synth_ir.WorkloadParams(interfaces=3, methods=12, events=4, params=4, structs=12, struct_width=6,
+                                     sequence_depth=3, unions=4, union_width=6, enums=3, enum_width=5, seed=7),
+}
+
+
+# writes the synthetic ir name into dir_path as json, returns its path
+def writeSynthIR(dir_path, name):
+    ir_path = os.path.join(dir_path, name + ".json")
+    with open(ir_path, 'w') as f:
+        json.dump(synth_ir.IRSynthesizer(kIRParams[name]).build(), f, indent=2)
+    return ir_path
+
+
+# an ir_model node tree as plain python values, for comparing modules loaded in different ways
+def plain(value):
+    if isinstance(value, (list, tuple)):
+        return [plain(item) for item in value]
+    slots = getattr(type(value), "__slots__", None)
+    if slots is None:
+        return value
+    result = {"class": type(value).__name__}
+    for slot in slots:
+        if not slot.startswith("_"):
+            result[slot] = plain(getattr(value, slot))
+    return result
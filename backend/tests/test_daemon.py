@@ -0,0 +1,73 @@
+import os
+import sys
+import types
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import common.daemon as daemon
+
+# run from backend/: python -m unittest discover tests
+
+
+class DaemonRequestTest(unittest.TestCase):
+    def setUp(self):
+        self._work_dir = tempfile.mkdtemp()
+        with open(os.path.join(self._work_dir, "demo.json"), 'w') as f:
+            f.write("{}")
+        self._gen_options = []
+        base_options = types.SimpleNamespace(daemon_path=None, depfile_path=None, manifest_path=None)
+        self._daemon = daemon.CodegenDaemon(os.path.join(self._work_dir, "daemon.sock"), base_options,
+                                            self.__gen)
+
+    def tearDown(self):
+        shutil.rmtree(self._work_dir)
+
+    def __gen(self, options):
+        self._gen_options.append(options)
+        return 0, []
+
+    def __genRequest(self, **kwargs):
+        request = {"command": daemon.kCommandGen, "ir_path": "demo.json", "base_name": "Demo",
+                   "dst_path": "gen", "gen_types": ["ndk_cpp"], "depfile": "gen/Demo.d"}
+        request.update(kwargs)
+        return self._daemon.handleRequest(request)
+
+    # the daemon's own directory is not the client's
+    def testRelativePathsJoinCwd(self):
+        self.assertEqual(self.__genRequest(cwd=self._work_dir)["ret"], 0)
+        options = self._gen_options[-1]
+        self.assertEqual(options.ir_path, os.path.join(self._work_dir, "demo.json"))
+        self.assertEqual(options.dst_path, os.path.join(self._work_dir, "gen"))
+        self.assertEqual(options.depfile_path, os.path.join(self._work_dir, "gen", "Demo.d"))
+        self.assertIsNone(options.manifest_path)
+
+        reply = self._daemon.handleRequest({"command": daemon.kCommandUnwatch, "ir_path": "demo.json",
+                                            "base_name": "Demo", "dst_path": "gen", "cwd": self._work_dir})
+        self.assertEqual(reply["ret"], 0)
+
+    def testRelativePathsWithoutCwdFail(self):
+        for cwd in (None, "relative"):
+            with self.assertRaises(ValueError):
+                self.__genRequest(cwd=cwd)
+        self.assertEqual(self._gen_options, [])
+
+        ir_path = os.path.join(self._work_dir, "demo.json")
+        self.assertEqual(self.__genRequest(ir_path=ir_path, dst_path=self._work_dir, depfile=None)["ret"], 0)
+
+    def testUnknownGenTypeKeepsWatchedJob(self):
+        self.assertEqual(self.__genRequest(cwd=self._work_dir)["ret"], 0)
+        reply = self.__genRequest(cwd=self._work_dir, gen_types=["no_such_backend"])
+        self.assertEqual(reply["ret"], -1)
+        self.assertIn("no_such_backend", reply["error"])
+
+        jobs = self._daemon.handleRequest({"command": daemon.kCommandStatus})["jobs"]
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(jobs[0]["ret"], 0)
+        self.assertEqual(len(self._gen_options), 1)
+        self.assertEqual(self._gen_options[0].gen_types, ["ndk_cpp"])
+
+
+if __name__ == "__main__":
+    unittest.main()
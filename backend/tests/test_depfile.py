@@ -0,0 +1,85 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+kBackendDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(kBackendDir)
+sys.path.append(os.path.join(kBackendDir, "benchmark"))
+import synth_ir
+
+# run from backend/: python -m unittest discover tests
+
+
+# the entries of a depfile, escapes undone
+def _depfileEntries(depfile_path):
+    with open(depfile_path) as f:
+        text = f.read().replace("\\\n", " ")
+    entries = []
+    for item in text.replace("\\ ", "\0").split():
+        item = item.replace("\0", " ").replace("\\#", "#").replace("$$", "$")
+        entries.append(item[:-1] if item.endswith(":") else item)
+    return entries
+
+
+class DepfileTest(unittest.TestCase):
+    def setUp(self):
+        self._work_dir = tempfile.mkdtemp()
+        with open(os.path.join(self._work_dir, "small.json"), 'w') as f:
+            json.dump(synth_ir.IRSynthesizer(synth_ir.kWorkloads["small"]).build(), f)
+
+    def tearDown(self):
+        shutil.rmtree(self._work_dir)
+
+    def __runCodegen(self):
+        subprocess.run([sys.executable, os.path.join(kBackendDir, "codegen.py"), "-t", "ndk_cpp", "-b", "Small",
+                        "-i", "small.json", "-p", "gen", "-d", "gen/Small.d", "--manifest", "gen/Small.json"],
+                       cwd=self._work_dir, check=True, stdout=subprocess.DEVNULL)
+
+    # make and ninja read the depfile in the build directory, not where codegen ran
+    def testRelativePathsResolveFromAnotherDirectory(self):
+        self.__runCodegen()
+
+        entries = _depfileEntries(os.path.join(self._work_dir, "gen", "Small.d"))
+        # the target is named as -d names it
+        self.assertEqual(entries[0], "gen/Small.stamp")
+        entries = entries[1:]
+        self.assertIn(os.path.join(self._work_dir, "small.json"), entries)
+        with open(os.path.join(self._work_dir, "gen", "Small.json")) as f:
+            manifest = json.load(f)
+        self.assertIn(os.path.join(self._work_dir, "gen", "SmallCommon.h"), manifest["outputs"])
+        entries += [manifest["ir_path"], manifest["stamp"]] + manifest["outputs"] + manifest["inputs"]
+
+        other_dir = tempfile.mkdtemp()
+        try:
+            for entry in entries:
+                self.assertTrue(os.path.isabs(entry), entry)
+                self.assertTrue(os.path.isfile(os.path.join(other_dir, entry)), entry)
+        finally:
+            shutil.rmtree(other_dir)
+
+    # unchanged outputs keep their mtime, the target of the depfile must still be newer than
+    # the ir afterwards or make reruns codegen on every build
+    def testTouchedIrLeavesTargetUpToDate(self):
+        self.__runCodegen()
+        ir_path = os.path.join(self._work_dir, "small.json")
+        stamp_path = os.path.join(self._work_dir, "gen", "Small.stamp")
+        header_path = os.path.join(self._work_dir, "gen", "SmallCommon.h")
+        # the first run as if it was a minute ago, then the ir is touched
+        for path in (stamp_path, header_path):
+            mtime = os.stat(path).st_mtime_ns - 60 * 1000000000
+            os.utime(path, ns=(mtime, mtime))
+        header_mtime = os.stat(header_path).st_mtime_ns
+        os.utime(ir_path)
+        self.__runCodegen()
+
+        self.assertGreaterEqual(os.stat(stamp_path).st_mtime_ns, os.stat(ir_path).st_mtime_ns)
+        self.assertEqual(os.stat(header_path).st_mtime_ns, header_mtime)
+        self.assertEqual(_depfileEntries(os.path.join(self._work_dir, "gen", "Small.d"))[0], "gen/Small.stamp")
+
+
+if __name__ == "__main__":
+    unittest.main()
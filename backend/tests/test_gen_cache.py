@@ -0,0 +1,51 @@
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import common.gen_cache as gen_cache
+
+# run from backend/: python -m unittest discover tests
+
+
+class GenCacheTest(unittest.TestCase):
+    def setUp(self):
+        self._work_dir = tempfile.mkdtemp()
+        self._cache = gen_cache.GenCache(os.path.join(self._work_dir, "cache"))
+        self._src_dir = os.path.join(self._work_dir, "src")
+        os.makedirs(self._src_dir)
+        for name in ("DemoCommon.h", "DemoCommon.cpp"):
+            with open(os.path.join(self._src_dir, name), 'w') as f:
+                f.write("// %s\n" % (name))
+        self._key = "ab" + "0" * 62
+        self._cache.store(self._key, self._src_dir, ["DemoCommon.h", "DemoCommon.cpp"])
+
+    def tearDown(self):
+        shutil.rmtree(self._work_dir)
+
+    def testRestore(self):
+        dst_path = os.path.join(self._work_dir, "dst")
+        self.assertEqual(self._cache.restore(self._key, dst_path), ["DemoCommon.h", "DemoCommon.cpp"])
+        with open(os.path.join(dst_path, "DemoCommon.cpp")) as f:
+            self.assertEqual(f.read(), "// DemoCommon.cpp\n")
+
+    # a prune of another process removes the entry between reading its manifest and copying
+    def testEntryRemovedDuringRestoreIsMiss(self):
+        copyfile = shutil.copyfile
+
+        def pruneAndCopy(src, dst):
+            self._cache.prune(0)
+            return copyfile(src, dst)
+
+        dst_path = os.path.join(self._work_dir, "dst")
+        with unittest.mock.patch.object(gen_cache.shutil, "copyfile", pruneAndCopy):
+            self.assertIsNone(self._cache.restore(self._key, dst_path))
+        self.assertEqual(self._cache.entries(), [])
+        self.assertEqual([name for name in os.listdir(dst_path) if name.endswith(".tmp")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import ir_fixtures
+import common.ir_model as ir_model
+import common.ir_binary as ir_binary
+
+# run from backend/: python -m unittest discover tests
+# with $IDLC naming a built idlc, its --binary output is compared with the encoder's as well
+
+kIDL = """module demo.check {
+  struct Point { float x; float y; sequence<long> ids; sequence<double, 4> cov; };
+  @service
+  interface Sensor {
+    Point GetPoint(in long id, in string tag);
+    void Reset();
+    eventtype OnPoint { attr Point point; attr long seq; };
+  };
+};
+"""
+
+
+class BinaryIRTest(unittest.TestCase):
+    def setUp(self):
+        self._work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._work_dir)
+
+    def __write(self, name, content):
+        path = os.path.join(self._work_dir, name)
+        with open(path, 'wb') as f:
+            f.write(content)
+        return path
+
+    # varints of every length, zigzag of both signs, all tags, repeated containers
+    def testValuesRoundTrip(self):
+        shared = {"name": ["long"], "sequence_size": 0}
+        value = {
+            "ints": [0, 1, -1, 63, -64, 64, 127, 128, -129, 300, 2 ** 31, -2 ** 31, 2 ** 62, -2 ** 62],
+            "floats": [0.0, -1.5, 1e300, 3.25],
+            "literals": [None, True, False],
+            "strings": ["", "a", "événement", "x" * 200],
+            "empty": [[], {}],
+            "nested": {"a": [shared, shared, [shared]], "b": shared},
+            "many": ["s%d" % (i) for i in range(300)],
+        }
+        path = self.__write("values.idlb", ir_binary.encode(value))
+        self.assertTrue(ir_binary.isBinaryIR(path))
+
+        with ir_binary.BinaryIRReader(path) as reader:
+            decoded = reader.value()
+            self.assertEqual(decoded, value)
+            # a repeated container is stored and decoded once
+            self.assertIs(decoded["nested"]["a"][0], decoded["nested"]["b"])
+
+            root = reader.root()
+            self.assertEqual(list(root.keys()), list(value.keys()))
+            self.assertIn("ints", root)
+            self.assertEqual(root["strings"], value["strings"])
+            self.assertEqual(root.get("missing", 7), 7)
+            self.assertEqual(list(root.iterArray("many")), value["many"])
+            self.assertEqual(list(root.iterArray("missing")), [])
+
+    def testSharedContainersAreStoredOnce(self):
+        single = ir_binary.encode({"items": [{"type": {"name": ["long"]}}]})
+        repeated = ir_binary.encode({"items": [{"type": {"name": ["long"]}}] * 1000})
+        # one more reference per item, not one more object
+        self.assertLess(len(repeated) - len(single), 1000 * 3)
+
+    def testInvalidFilesFail(self):
+        self.assertFalse(ir_binary.isBinaryIR(self.__write("ir.json", b"{}")))
+        for content in (b"", b"IDLB", b"XXXX" + ir_binary.encode({})[4:]):
+            with self.assertRaises(ValueError):
+                ir_binary.BinaryIRReader(self.__write("bad.idlb", content))
+
+    def testSynthIRRoundTrip(self):
+        for name in ir_fixtures.kIRParams:
+            json_path = ir_fixtures.writeSynthIR(self._work_dir, name)
+            with open(json_path) as f:
+                ir_dict = json.load(f)
+            binary_path = self.__write(name + ".idlb", ir_binary.encode(ir_dict))
+
+            with ir_binary.BinaryIRReader(binary_path) as reader:
+                self.assertEqual(reader.value(), ir_dict, name)
+            self.assertEqual(ir_fixtures.plain(ir_binary.loadModule(binary_path)),
+                             ir_fixtures.plain(ir_model.Module.fromDict(ir_dict)), name)
+
+    @unittest.skipUnless(os.environ.get("IDLC"), "$IDLC names no idlc")
+    def testIdlcBinaryMatchesEncoder(self):
+        idl_path = self.__write("check.idl", kIDL.encode("utf-8"))
+        json_path = os.path.join(self._work_dir, "check.json")
+        binary_path = os.path.join(self._work_dir, "check.idlb")
+        subprocess.run([os.environ["IDLC"], "-o", json_path, "-f", idl_path], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        subprocess.run([os.environ["IDLC"], "--binary", "-o", binary_path, "-f", idl_path], check=True,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        with open(json_path) as f:
+            ir_dict = json.load(f)
+        with open(binary_path, 'rb') as f:
+            self.assertEqual(f.read(), ir_binary.encode(ir_dict))
+
+
+if __name__ == "__main__":
+    unittest.main()
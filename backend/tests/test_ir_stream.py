@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+import ir_fixtures
+import common.ir_model as ir_model
+import common.ir_stream as ir_stream
+
+# run from backend/: python -m unittest discover tests
+
+
+# codegen streams only irs of kStreamThreshold and up, tiny chunks make every refill boundary
+# of the reader fall somewhere inside a small ir
+class IRStreamTest(unittest.TestCase):
+    def setUp(self):
+        self._work_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self._work_dir)
+
+    def __checkSame(self, ir_path):
+        with open(ir_path) as f:
+            expected = ir_fixtures.plain(ir_model.Module.fromDict(json.load(f)))
+        for chunk_size in (1, 7, 64):
+            self.assertEqual(ir_fixtures.plain(ir_stream.loadModule(ir_path, chunk_size)), expected,
+                             "%s, chunk size %d" % (ir_path, chunk_size))
+
+    def testSynthIR(self):
+        for name in ir_fixtures.kIRParams:
+            self.__checkSame(ir_fixtures.writeSynthIR(self._work_dir, name))
+
+    # compact json, the order before the declarations and escapes in strings
+    def testLayouts(self):
+        ir_path = ir_fixtures.writeSynthIR(self._work_dir, "small")
+        with open(ir_path) as f:
+            ir_dict = json.load(f)
+        ir_dict["module_name"] = ["a\"b", "é\\n"]
+        reordered = {"declarations_order": ir_dict.pop("declarations_order")}
+        reordered.update(ir_dict)
+
+        compact_path = os.path.join(self._work_dir, "compact.json")
+        with open(compact_path, 'w') as f:
+            json.dump(reordered, f, separators=(",", ":"), ensure_ascii=False)
+        self.__checkSame(compact_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import os
+import re
+import sys
+import unittest
+
+kBackendDir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(kBackendDir)
+sys.path.append(os.path.join(kBackendDir, "benchmark"))
+import codegen
+import synth_ir
+import cpp_with_ndk_gen.cpp_name_table as cpp_name_table
+
+# run from backend/: python -m unittest discover tests
+
+
+# NameIdTable::FindId of the generated XCommon.h, written out again rather than calling
+# cpp_name_table, so the two can not drift apart unnoticed
+def _findId(names, sizes, displacements, slots, bucket_count, slot_count, name):
+    if len(names) == 0:
+        return None
+    data = name.encode("utf-8")
+    value = 2166136261
+    for byte in data:
+        value = ((value ^ byte) * 16777619) & 0xffffffff
+
+    mixed = value ^ displacements[value % bucket_count]
+    mixed ^= mixed >> 16
+    mixed = (mixed * 0x85ebca6b) & 0xffffffff
+    mixed ^= mixed >> 13
+    mixed = (mixed * 0xc2b2ae35) & 0xffffffff
+    mixed ^= mixed >> 16
+
+    found = slots[mixed % slot_count]
+    if sizes[found] != len(data) or names[found].encode("utf-8") != data:
+        return None
+    return found
+
+
+def _tableFindId(table, name):
+    return _findId(table.names, [len(item.encode("utf-8")) for item in table.names], table.displacements,
+                   table.slots, table.bucket_count, table.slot_count, name)
+
+
+class NameTableTest(unittest.TestCase):
+    def __checkTable(self, names, table):
+        for name in set(names):
+            self.assertEqual(_tableFindId(table, name), names.index(name), name)
+        for name in ("", "Missing", names[0] + "x" if len(names) > 0 else "x", "method0"):
+            if not name in names:
+                self.assertIsNone(_tableFindId(table, name), name)
+
+    def testEveryNameFindsItsId(self):
+        for count in (0, 1, 2, 5, 17, 64, 300, 2000):
+            names = ["Method%d" % (i) for i in range(count)]
+            self.__checkTable(names, cpp_name_table.NameTable(names))
+
+    def testDuplicateNameKeepsFirstId(self):
+        names = ["Get", "Set", "Get", "OnChanged", "Set", "événement"]
+        table = cpp_name_table.NameTable(names)
+        self.assertEqual(_tableFindId(table, "Get"), 0)
+        self.assertEqual(_tableFindId(table, "Set"), 1)
+        self.__checkTable(names, table)
+
+    def testEqualHashesFail(self):
+        self.assertEqual(cpp_name_table.nameHash("M2498b"), cpp_name_table.nameHash("M678b8"))
+        with self.assertRaises(ValueError):
+            cpp_name_table.NameTable(["Get", "M2498b", "M678b8"], "Sensor")
+
+    def testTooManyNamesFail(self):
+        with self.assertRaises(ValueError):
+            cpp_name_table.checkNames("Sensor", ["Method%d" % (i) for i in range(cpp_name_table.kMaxNames + 1)])
+
+    # the tables as the generated XCommon.cpp spells them
+    def testGeneratedTables(self):
+        params = synth_ir.WorkloadParams(interfaces=3, methods=40, events=9)
+        ret, files = codegen.renderFiles(synth_ir.IRSynthesizer(params).build(), "Synth", ["ndk_cpp"])
+        self.assertEqual(ret, 0)
+        content = files["SynthCommon.cpp"]
+
+        def array(name):
+            match = re.search(r"k%s\[\] = \{(.*?)\};" % (name), content)
+            return [item.strip() for item in match.group(1).split(",")]
+
+        interfaces = re.findall(r"constexpr NameIdTable k(\w+)NameIds = \{\s*k\w+, k\w+, k\w+, k\w+, "
+                                r"(\d+), (\d+), (\d+)\};", content)
+        self.assertEqual(len(interfaces), 3)
+        for interface_name, count, bucket_count, slot_count in interfaces:
+            names = [item.strip('"') for item in array(interface_name + "Names")]
+            sizes = [int(item) for item in array(interface_name + "NameSizes")]
+            displacements = [int(item) for item in array(interface_name + "NameDisplacements")]
+            slots = [int(item) for item in array(interface_name + "NameSlots")]
+            self.assertEqual(len(names), int(count))
+            for name_id, name in enumerate(names):
+                self.assertEqual(_findId(names, sizes, displacements, slots, int(bucket_count), int(slot_count),
+                                         name), name_id)
+            self.assertIsNone(_findId(names, sizes, displacements, slots, int(bucket_count), int(slot_count),
+                                      "Method40"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+#ifndef _ONE_IDLC_BINARY_GENERATOR_H_
+#define _ONE_IDLC_BINARY_GENERATOR_H_
+
+#include <sstream>
+#include <string>
+#include <vector>
+
+#include "binary_writer.h"
+#include "json_generator.h"
+#include "compiled_ast.h"
+namespace idlc {
+
+// Writes the ir of |JSONGenerator| in the binary format, member for member.
+class IRBinaryGenerator:public utils::BinaryWriter<IRBinaryGenerator>{
+ public:
+  using utils::BinaryWriter<IRBinaryGenerator>::Generate;
+  using utils::BinaryWriter<IRBinaryGenerator>::GenerateArray;
+
+  IRBinaryGenerator(CompiledAST* compiled_ast)
+    : BinaryWriter(binary_file_), compiled_ast_(compiled_ast) {}
+
+  std::ostringstream Produce();
+
+  void GenerateTypeName(int index, const raw::TypeConstructor& type);
+
+  void Generate(const raw::TypeConstructor& value);
+  void Generate(const raw::ConstDeclaration& value);
+  void Generate(const raw::EnumDeclaration& value);
+  void Generate(const raw::EnumMember& value);
+  void Generate(const raw::StructDeclaration& value);
+  void Generate(const raw::StructMember& value);
+  void Generate(const raw::UnionDeclaration& value);
+  void Generate(const raw::UnionMember& value);
+  void Generate(const raw::InterfaceDeclaration& value);
+  void Generate(const raw::MethodDeclaration& value);
+  void Generate(const raw::MethodReturn& value);
+  void Generate(const raw::MethodParameter& value);
+  void Generate(const raw::EventDeclaration& value);
+  void Generate(const raw::EventMember& value);
+  void Generate(const JSONGenerator::DeclaNameAndType& value);
+
+  void Generate(const raw::Constant* value);
+
+ private:
+
+  const CompiledAST* compiled_ast_;
+  std::ostringstream binary_file_;
+};
+
+}  // namespace idlc
+
+#endif  // _ONE_IDLC_BINARY_GENERATOR_H_
@@ -0,0 +1,230 @@
+#ifndef _ONE_IDLC_BINARY_WRITER_H_
+#define _ONE_IDLC_BINARY_WRITER_H_
+
+#include <cstdint>
+#include <cstring>
+#include <ostream>
+#include <string>
+#include <string_view>
+#include <unordered_map>
+#include <vector>
+#include <memory>
+#include <functional>
+
+#include "log.h"
+
+namespace idlc {
+namespace utils {
+
+// |BinaryWriter| writes the same value tree as |JsonWriter| in the compact
+// binary ir format the backend reads (backend/common/ir_binary.py describes
+// the layout). It takes the same Generate... calls, so a generator can be
+// written against either of them.
+
+// Every distinct string and every distinct array or object is stored once and
+// referred to by its index, the ir repeats the same types and parameters all
+// the time.
+
+// Like |JsonWriter|, |BinaryWriter| requires the derived type as a template
+// parameter so it can match methods declared with parameter overrides in the
+// derived class.
+template <typename DerivedT>
+class BinaryWriter {
+ public:
+  BinaryWriter(std::ostream& os) : os_(os) {}
+
+  ~BinaryWriter() = default;
+
+  template <typename Iterator>
+  void GenerateArray(Iterator begin, Iterator end) {
+    EmitContainerBegin(kTagArray);
+    for (Iterator it = begin; it != end; ++it) {
+      self.Generate(*it);
+    }
+    EmitContainerEnd();
+  }
+
+  template <typename Collection>
+  void GenerateArray(const Collection& collection) {
+    self.GenerateArray(collection.begin(), collection.end());
+  }
+
+  template <typename T>
+  void Generate(const std::unique_ptr<T>& value) {
+    self.Generate(*value);
+  }
+
+  template <typename T>
+  void Generate(const std::vector<T>& value) {
+    self.GenerateArray(value);
+  }
+
+  void Generate(bool value) { EmitItemTag(value ? kTagTrue : kTagFalse); }
+
+  void Generate(std::string_view value) { EmitString(value); }
+
+  void Generate(std::string value) { EmitString(value); }
+
+  void Generate(uint32_t value) { EmitNumeric(static_cast<int64_t>(value)); }
+  void Generate(int64_t value) { EmitNumeric(value); }
+  void Generate(uint64_t value) { EmitNumeric(static_cast<int64_t>(value)); }
+
+  // See |JsonWriter::self|.
+  DerivedT& self = *static_cast<DerivedT*>(this);
+
+ protected:
+  // Kept so generators can pass the same arguments as to |JsonWriter|, the
+  // binary format has no punctuation.
+  enum class Position {
+    kFirst,
+    kSubsequent,
+  };
+
+  void GenerateObject(std::function<void()> callback) {
+    EmitContainerBegin(kTagObject);
+    callback();
+    EmitContainerEnd();
+  }
+
+  template <typename Type>
+  void GenerateObjectMember(std::string_view key, const Type& value,
+                            Position position = Position::kSubsequent) {
+    EmitObjectKey(key);
+    self.Generate(value);
+  }
+
+  // Writes the header and both tables. Every container has to be closed.
+  void GenerateEOF() {
+    if (!frames_.empty()) {
+      ALOGE("binary ir has %zu unclosed containers", frames_.size());
+    }
+    std::string strings = Table(strings_);
+    std::string values = Table(values_);
+
+    std::string header(kMagic, 4);
+    PutFixed(header, kFormatVersion, 2);
+    PutFixed(header, 0, 2);
+    PutFixed(header, kHeaderSize, 4);
+    PutFixed(header, kHeaderSize + strings.size(), 4);
+    PutFixed(header, root_, 4);
+
+    os_.rdbuf()->sputn(header.data(), header.size());
+    os_.rdbuf()->sputn(strings.data(), strings.size());
+    os_.rdbuf()->sputn(values.data(), values.size());
+  }
+
+  void EmitString(std::string_view value) {
+    EmitItemTag(kTagString);
+    PutVarint(frames_.back().items, Intern(string_index_, strings_, std::string(value)));
+  }
+
+  void EmitNumeric(int64_t value) {
+    EmitItemTag(kTagInt);
+    PutVarint(frames_.back().items, (static_cast<uint64_t>(value) << 1) ^ static_cast<uint64_t>(value >> 63));
+  }
+
+  void EmitObjectKey(std::string_view key) {
+    Frame& frame = frames_.back();
+    frame.count++;
+    PutVarint(frame.items, Intern(string_index_, strings_, std::string(key)));
+  }
+
+  void EmitContainerBegin(uint8_t tag) { frames_.push_back(Frame{tag, 0, std::string()}); }
+
+  void EmitContainerEnd() {
+    std::string entry(1, static_cast<char>(frames_.back().tag));
+    PutVarint(entry, frames_.back().count);
+    entry += frames_.back().items;
+    frames_.pop_back();
+
+    uint64_t index = Intern(value_index_, values_, std::move(entry));
+    if (frames_.empty()) {
+      root_ = index;
+      return;
+    }
+    EmitItemTag(kTagRef);
+    PutVarint(frames_.back().items, index);
+  }
+
+ private:
+  static constexpr const char* kMagic = "IDLB";
+  static constexpr uint64_t kFormatVersion = 1;
+  static constexpr uint64_t kHeaderSize = 20;
+
+  static constexpr uint8_t kTagFalse = 1;
+  static constexpr uint8_t kTagTrue = 2;
+  static constexpr uint8_t kTagInt = 3;
+  static constexpr uint8_t kTagString = 5;
+  static constexpr uint8_t kTagArray = 6;
+  static constexpr uint8_t kTagObject = 7;
+  static constexpr uint8_t kTagRef = 8;
+
+  struct Frame {
+    uint8_t tag;
+    uint64_t count;
+    std::string items;
+  };
+
+  // Array elements are counted by their tag, object members by their key.
+  void EmitItemTag(uint8_t tag) {
+    Frame& frame = frames_.back();
+    if (frame.tag == kTagArray) {
+      frame.count++;
+    }
+    frame.items.push_back(static_cast<char>(tag));
+  }
+
+  static uint64_t Intern(std::unordered_map<std::string, uint64_t>& index,
+                         std::vector<std::string>& entries, std::string entry) {
+    auto it = index.find(entry);
+    if (it != index.end()) {
+      return it->second;
+    }
+    uint64_t entry_index = entries.size();
+    index.emplace(entry, entry_index);
+    entries.push_back(std::move(entry));
+    return entry_index;
+  }
+
+  static void PutVarint(std::string& out, uint64_t value) {
+    while (value >= 0x80) {
+      out.push_back(static_cast<char>((value & 0x7f) | 0x80));
+      value >>= 7;
+    }
+    out.push_back(static_cast<char>(value));
+  }
+
+  static void PutFixed(std::string& out, uint64_t value, int size) {
+    for (int i = 0; i < size; ++i) {
+      out.push_back(static_cast<char>((value >> (8 * i)) & 0xff));
+    }
+  }
+
+  static std::string Table(const std::vector<std::string>& entries) {
+    std::string table;
+    PutFixed(table, entries.size(), 4);
+    uint64_t offset = 0;
+    for (const auto& entry : entries) {
+      PutFixed(table, offset, 4);
+      offset += entry.size();
+    }
+    PutFixed(table, offset, 4);
+    for (const auto& entry : entries) {
+      table += entry;
+    }
+    return table;
+  }
+
+  std::ostream& os_;
+  std::vector<Frame> frames_;
+  std::unordered_map<std::string, uint64_t> string_index_;
+  std::vector<std::string> strings_;
+  std::unordered_map<std::string, uint64_t> value_index_;
+  std::vector<std::string> values_;
+  uint64_t root_ = 0;
+};
+
+}  // namespace utils
+}  // namespace idlc
+
+#endif  // _ONE_IDLC_BINARY_WRITER_H_
@@ -46,6 +46,7 @@ class JSONGenerator:public utils::JsonWriter<JSONGenerator>{
 
   void Generate(const raw::Constant* value);
   std::vector<DeclaNameAndType> GetDeclaNameAndType();
+  static std::vector<DeclaNameAndType> GetDeclaNameAndType(const CompiledAST* compiled_ast);
 
  private:
 
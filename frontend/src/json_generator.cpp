@@ -173,8 +173,12 @@ void JSONGenerator::Generate(const JSONGenerator::DeclaNameAndType& value) {
 }
 
 std::vector<JSONGenerator::DeclaNameAndType> JSONGenerator::GetDeclaNameAndType() {
+  return GetDeclaNameAndType(compiled_ast_);
+}
+
+std::vector<JSONGenerator::DeclaNameAndType> JSONGenerator::GetDeclaNameAndType(const CompiledAST* compiled_ast) {
   std::vector<JSONGenerator::DeclaNameAndType> decla_name_and_type_list;
-  for (auto& decl : compiled_ast_->declaration_order_) {
+  for (auto& decl : compiled_ast->declaration_order_) {
     switch (decl->kind_) {
       case raw::SourceElement::Kind::kEnum: {
         auto enum_decl = static_cast<const raw::EnumDeclaration*>(decl);
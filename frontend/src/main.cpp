@@ -15,6 +15,7 @@
 #include "parser.h"
 #include "compiled_ast.h"
 #include "json_generator.h"
+#include "binary_generator.h"
 
 class ArgvArguments {
  public:
@@ -43,7 +44,8 @@ class ArgvArguments {
 };
 
 void Usage() {
-  ALOGI("usage: idlc -o [OUTPUT_PATH] -f [[FIDL_FILE...]...]");
+  ALOGI("usage: idlc [--binary] -o [OUTPUT_PATH] -f [[FIDL_FILE...]...]");
+  ALOGI("  --binary  write the ir in the compact binary format instead of json");
   return;
 }
 
@@ -94,7 +96,7 @@ void Write(const std::ostringstream& output_stream, const std::string file_path)
     if (current_size == contents.size()) {
       // Lengths match.
       std::string current_contents(current_size, '\0');
-      std::fstream current_file = Open(file_path, std::ios::in);
+      std::fstream current_file = Open(file_path, std::ios::in | std::ios::binary);
       current_file.read(current_contents.data(), current_size);
       if (current_contents == contents) {
         // Contents match, no need to write the file.
@@ -102,7 +104,7 @@ void Write(const std::ostringstream& output_stream, const std::string file_path)
       }
     }
   }
-  std::fstream file = Open(file_path, std::ios::out);
+  std::fstream file = Open(file_path, std::ios::out | std::ios::binary);
   file << output_stream.str();
   file.flush();
   if (file.fail()) {
@@ -124,7 +126,8 @@ std::unique_ptr<idlc::raw::File> Parse(const idlc::SourceFile& source_file) {
 
 int compile(const std::vector<std::string>& source_list,
             const std::vector<idlc::SourceManager>& source_managers,
-            const std::string output_path) {
+            const std::string output_path,
+            bool binary) {
   std::unique_ptr<idlc::raw::File> final_ast = nullptr;
   for (const auto& source_manager : source_managers) {
     for (const auto& source_file : source_manager.sources()) {
@@ -141,8 +144,13 @@ int compile(const std::vector<std::string>& source_list,
     return 1;
   };
 
-  idlc::JSONGenerator generator(&compiled_ast);
-  Write(generator.Produce(), output_path);
+  if (binary) {
+    idlc::IRBinaryGenerator generator(&compiled_ast);
+    Write(generator.Produce(), output_path);
+  } else {
+    idlc::JSONGenerator generator(&compiled_ast);
+    Write(generator.Produce(), output_path);
+  }
 
   return 0;
 }
@@ -160,6 +168,7 @@ int main(int argc, char* argv[]) {
     log_module_init();
 
     std::string output_path;
+    bool binary = false;
     while (args->Remaining()) {
       std::string behavior_argument = args->Claim();
       if ("-h" == behavior_argument) {
@@ -167,6 +176,8 @@ int main(int argc, char* argv[]) {
         exit(0);
       } else if ("-o" == behavior_argument) {
         output_path = args->Claim();
+      } else if ("--binary" == behavior_argument) {
+        binary = true;
       } else if ("-f" == behavior_argument) {
         break;
       }
@@ -194,5 +205,5 @@ int main(int argc, char* argv[]) {
         }
     }
 
-    auto status = compile(source_list, source_managers, output_path);
+    auto status = compile(source_list, source_managers, output_path, binary);
 }
\ No newline at end of file